@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import User, OTP, Course, CourseSubscription, TeacherProfile, StudentProfile,ClassSchedule,CourseEnrollment, ClassSession, CoursePricing 
+from .models import User, OTP, Course, CourseSubscription, TeacherProfile, StudentProfile,ClassSchedule,CourseEnrollment, ClassSession, CoursePricing, ClassChatMessage, ClassAttendance, RecordingUpload, MediaBlob, PlaybackProgress, PaymentWebhookEvent, TransactionExport, RevenueDaily
 # Register your models here.
 admin.site.register(User)
 admin.site.register(TeacherProfile)
@@ -10,4 +10,12 @@ admin.site.register(CourseSubscription)
 admin.site.register(ClassSchedule)
 admin.site.register(CourseEnrollment)
 admin.site.register(ClassSession)
-admin.site.register(CoursePricing)
\ No newline at end of file
+admin.site.register(CoursePricing)
+admin.site.register(ClassChatMessage)
+admin.site.register(ClassAttendance)
+admin.site.register(RecordingUpload)
+admin.site.register(MediaBlob)
+admin.site.register(PlaybackProgress)
+admin.site.register(PaymentWebhookEvent)
+admin.site.register(TransactionExport)
+admin.site.register(RevenueDaily)
@@ -1,23 +1,142 @@
 from django.apps import AppConfig
+import os
 import threading
 import time
 import logging
 
 logger = logging.getLogger(__name__)
 
+def create_postgres_extensions(sender, using, **kwargs):
+    """pg_trgm backs the trigram index on course names; create it before migrations need it."""
+    from django.db import connections
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
 class EduPlatformConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'edu_platform'
     def ready(self):
+        from .utility.media_dedup import connect_refcount_signals
+        from .utility.image_derivatives import connect_derivative_signals
+        from .utility.revenue_rollup import connect_revenue_signals
+        from .utility.course_pricing import connect_pricing_signals
+        from .utility.seat_inventory import connect_seat_signals
+        from .utility.recording_cache import connect_recording_cache_signals
+        connect_refcount_signals(self)
+        connect_derivative_signals()
+        connect_revenue_signals()
+        connect_pricing_signals()
+        connect_seat_signals()
+        connect_recording_cache_signals()
+        from django.db.models.signals import pre_migrate
+        pre_migrate.connect(create_postgres_extensions, sender=self)
+
         # Start background thread for trial cleanup
         # Only start if not in migration or other management commands
         import sys
-        # Don’t run during migrations or shell
-        if any(cmd in sys.argv for cmd in ['migrate', 'makemigrations', 'createsuperuser', 'shell']):
+        # Don’t run during migrations, shell, benchmarks or one-off commands; only runserver serves requests
+        if os.path.basename(sys.argv[0]) in ('manage.py', 'django-admin', '__main__.py') and sys.argv[1:2] != ['runserver']:
             return
 
         # Start thread for any ASGI/WSGI server (runserver, daphne, uvicorn, gunicorn, etc.)
         self.start_cleanup_thread()
+        self.start_classroom_jobs()
+
+    def start_periodic_job(self, name, interval, job):
+        """Start a daemon thread that runs `job` every `interval` seconds.
+
+        Every web worker starts the thread, but each run first takes a Redis lock
+        that lives for the interval, so only one process runs the job per interval.
+        """
+        def job_loop():
+            # Wait 10 seconds for Django to fully start
+            time.sleep(10)
+
+            while True:
+                try:
+                    from django.db import connection
+                    from .utility.redis_services import get_redis
+
+                    if get_redis().set(f"jobs:lock:{name}", f"{os.getpid()}", nx=True, ex=max(int(interval), 1)):
+                        # Ensure database connection is active
+                        connection.ensure_connection()
+                        job()
+                except Exception as e:
+                    logger.error(f"Error in {name} job: {e}")
+                time.sleep(interval)
+
+        thread = threading.Thread(target=job_loop, daemon=True, name=name)
+        thread.start()
+        logger.info(f"Started background {name} thread (every {interval} seconds)")
+
+    def start_classroom_jobs(self):
+        """Start background jobs for classrooms and recordings"""
+        from django.conf import settings
+        from .utility.classroom_events import archive_closed_streams
+        from .utility.classroom_presence import sweep_stale_participants
+        from .utility.classroom_attendance import flush_attendance
+        from .utility.recording_uploads import purge_stale_uploads
+        from .utility.recording_processing import process_pending_recordings
+        from .utility.media_dedup import collect_media_garbage
+        from .utility.playback_progress import flush_progress
+        from .utility.payment_webhooks import process_webhook_events
+        from .utility.payment_reconciliation import reconcile_payments
+        from .utility.transaction_exports import process_transaction_exports
+
+        classroom_settings = getattr(settings, 'CLASSROOM_SETTINGS', {})
+        self.start_periodic_job(
+            'ClassroomStreamArchiver',
+            classroom_settings.get('ARCHIVE_INTERVAL_SECONDS', 300),
+            archive_closed_streams
+        )
+        self.start_periodic_job(
+            'ClassroomPresenceSweeper',
+            classroom_settings.get('PRESENCE_SWEEP_INTERVAL_SECONDS', 15),
+            sweep_stale_participants
+        )
+        self.start_periodic_job(
+            'ClassroomAttendanceFlusher',
+            classroom_settings.get('ATTENDANCE_FLUSH_INTERVAL_SECONDS', 60),
+            flush_attendance
+        )
+        self.start_periodic_job(
+            'RecordingUploadPurger',
+            3600,
+            purge_stale_uploads
+        )
+        self.start_periodic_job(
+            'RecordingProcessor',
+            getattr(settings, 'RECORDING_PROCESSING_SETTINGS', {}).get('SWEEP_INTERVAL_SECONDS', 60),
+            process_pending_recordings
+        )
+        self.start_periodic_job(
+            'PlaybackProgressFlusher',
+            getattr(settings, 'RECORDING_PLAYBACK_SETTINGS', {}).get('PROGRESS_FLUSH_INTERVAL_SECONDS', 30),
+            flush_progress
+        )
+        self.start_periodic_job(
+            'PaymentWebhookProcessor',
+            getattr(settings, 'PAYMENT_WEBHOOK_SETTINGS', {}).get('PROCESS_INTERVAL_SECONDS', 5),
+            process_webhook_events
+        )
+        self.start_periodic_job(
+            'PaymentReconciler',
+            getattr(settings, 'PAYMENT_RECONCILIATION_SETTINGS', {}).get('INTERVAL_SECONDS', 900),
+            reconcile_payments
+        )
+        self.start_periodic_job(
+            'TransactionExporter',
+            getattr(settings, 'TRANSACTION_EXPORT_SETTINGS', {}).get('PROCESS_INTERVAL_SECONDS', 10),
+            process_transaction_exports
+        )
+        if getattr(settings, 'MEDIA_DEDUP', False):
+            self.start_periodic_job(
+                'MediaBlobCollector',
+                getattr(settings, 'MEDIA_BLOB_GC_INTERVAL_SECONDS', 6 * 3600),
+                collect_media_garbage
+            )
     
     def start_cleanup_thread(self):
         """Start a background thread to cleanup expired trials"""
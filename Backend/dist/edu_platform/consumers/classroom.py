@@ -1,12 +1,19 @@
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.core.exceptions import PermissionDenied
-import redis.asyncio as redis
 from django.utils import timezone
+from edu_platform.utility.redis_services import get_async_redis
+from edu_platform.utility.classroom_events import append_event, iter_events_after, is_valid_sequence
+from edu_platform.utility.classroom_presence import mark_present, mark_absent, count_present
+from edu_platform.utility.classroom_attendance import record_join, record_leave
+from edu_platform.utility.classroom_events import get_classroom_setting
+from edu_platform.utility.rate_limit import MessageRateLimiter
+from edu_platform.utility.frame_codecs import select_codec, FrameDecodeError
+from edu_platform.middleware.websocket_auth import TOKEN_SUBPROTOCOL_PREFIX
+from collections import OrderedDict
 import asyncio
-import json
 import logging
-import os
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -52,15 +59,14 @@ class ClassRoomConsumer(AsyncWebsocketConsumer):
             await self.close(code=4004)
             return
 
-        self.redis_client = redis.Redis(
-            host=os.environ.get('REDIS_HOST', 'localhost'),
-            port=6379,
-            db=0,
-            decode_responses=True
-        )
+        self.redis_client = get_async_redis()
+        self.presence_client = get_async_redis('presence')
         try:
-            await asyncio.wait_for(self.redis_client.sadd(f'class:{self.class_id}:participants', user.id), timeout=5.0)
-            logger.debug("Redis sadd complete")
+            first_connection = await asyncio.wait_for(
+                mark_present(self.presence_client, self.class_id, user.id, self.channel_name), timeout=5.0
+            )
+            await record_join(self.redis_client, self.class_id, user.id)
+            logger.debug("Presence registered")
         except asyncio.TimeoutError:
             logger.error(f"Redis timeout for class_id={self.class_id}")
             await self.close(code=4002)
@@ -75,28 +81,48 @@ class ClassRoomConsumer(AsyncWebsocketConsumer):
         await self.channel_layer.group_add(self.group_name, self.channel_name)
         logger.debug("Group add complete")
 
-        await self.accept()
-        logger.debug("WebSocket accepted")
+        # Per-connection inbound budgets and outbound low-priority buffer
+        self.rate_limiter = MessageRateLimiter(get_classroom_setting('RATE_LIMITS', {}))
+        self.dropped_messages = 0
+        self.dropped_window_start = time.monotonic()
+        self.send_backlogged = False
+        self.throttle_notified = set()
+        self.low_priority_events = OrderedDict()
+        self.low_priority_task = None
+
+        # JSON text frames by default; msgpack binary frames if the client negotiated it
+        offered = self.scope.get('subprotocols') or []
+        self.codec, subprotocol = select_codec(offered)
+        if subprotocol is None:
+            # Browsers fail the handshake unless one offered subprotocol is echoed, so a client
+            # sending only its token subprotocol gets that one back (and JSON frames)
+            subprotocol = next((name for name in offered if name.startswith(TOKEN_SUBPROTOCOL_PREFIX)), None)
+
+        await self.accept(subprotocol=subprotocol)
+        logger.debug(f"WebSocket accepted (subprotocol={subprotocol})")
 
-        # Notify group
-        await self.channel_layer.group_send(
-            self.group_name,
-            {
+        # Notify group; another tab of a user already in the class is not a new join
+        if first_connection:
+            await self.publish_chat_event({
                 'type': 'chat_message',
                 'message': f'{user.email} joined the class',
                 'sender': 'system',
-            }
-        )
+            })
         logger.info(f"User {user.email} connected to class {self.class_id}")
 
     async def disconnect(self, close_code):
         user = self.scope['user']
 
+        if getattr(self, 'low_priority_task', None):
+            self.low_priority_task.cancel()
+
         if hasattr(self, 'group_name') and hasattr(self, 'redis_client'):
-            # Remove from Redis
+            # Remove from Redis; the user stays present while another of their sockets is open
+            last_connection = False
             try:
-                await self.redis_client.srem(f'class:{self.class_id}:participants', user.id)
-                await self.redis_client.close()
+                last_connection = await mark_absent(self.presence_client, self.class_id, user.id, self.channel_name)
+                if last_connection:
+                    await record_leave(self.redis_client, self.class_id, user.id)
             except Exception as e:
                 logger.error(f"Redis cleanup error: {e}")
 
@@ -104,35 +130,36 @@ class ClassRoomConsumer(AsyncWebsocketConsumer):
             await self.channel_layer.group_discard(self.group_name, self.channel_name)
 
             # Notify group
-            await self.channel_layer.group_send(
-                self.group_name,
-                {
+            if last_connection:
+                await self.publish_chat_event({
                     'type': 'chat_message',
                     'message': f'{user.email} left the class',
                     'sender': 'system',
-                }
-            )
-        logger.info(f"User {user.email} disconnected from class {self.class_id}, code={close_code}")
+                })
+        logger.info(f"User {getattr(user, 'email', user)} disconnected from class {getattr(self, 'class_id', None)}, code={close_code}")
 
-    async def receive(self, text_data):
+    async def receive(self, text_data=None, bytes_data=None):
         try:
-            data = json.loads(text_data)
+            data = self.codec.decode(bytes_data if bytes_data is not None else text_data)
+            if not isinstance(data, dict):
+                logger.warning(f"Invalid frame payload: class_id={self.class_id}")
+                return
             message_type = data.get('type')
             logger.debug(f"Received message: class_id={self.class_id}, type={message_type}")
 
+            if not await self.within_rate_limit(message_type):
+                return
+
             if message_type == 'chat':
                 message = data.get('message', '').strip()
                 if not message or len(message) > 500:
                     logger.warning(f"Invalid chat message: {message}")
                     return
-                await self.channel_layer.group_send(
-                    self.group_name,
-                    {
-                        'type': 'chat_message',
-                        'message': message,
-                        'sender': self.scope['user'].email,
-                    }
-                )
+                await self.publish_chat_event({
+                    'type': 'chat_message',
+                    'message': message,
+                    'sender': self.scope['user'].email,
+                })
 
             elif message_type == 'emoji':
                 emoji = data.get('emoji', '').strip()
@@ -140,15 +167,12 @@ class ClassRoomConsumer(AsyncWebsocketConsumer):
                 if emoji not in allowed_emojis:
                     logger.warning(f"Invalid emoji: {emoji}")
                     return
-                await self.channel_layer.group_send(
-                    self.group_name,
-                    {
-                        'type': 'chat_message',
-                        'message': emoji,
-                        'sender': self.scope['user'].email,
-                        'is_emoji': True,
-                    }
-                )
+                await self.publish_chat_event({
+                    'type': 'chat_message',
+                    'message': emoji,
+                    'sender': self.scope['user'].email,
+                    'is_emoji': True,
+                })
 
             elif message_type == 'signaling':
                 if not data.get('data'):
@@ -163,35 +187,153 @@ class ClassRoomConsumer(AsyncWebsocketConsumer):
                     }
                 )
 
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON decode error: {e}")
+            elif message_type == 'ping':
+                # Heartbeat keeps this participant's presence entry alive
+                await mark_present(self.presence_client, self.class_id, self.scope['user'].id, self.channel_name)
+                # Reopens attendance if the sweeper closed it
+                await record_join(self.redis_client, self.class_id, self.scope['user'].id)
+                await self.send_payload({
+                    'type': 'pong',
+                    'participants': await count_present(self.presence_client, self.class_id),
+                })
 
-    async def chat_message(self, event):
-        await self.send(text_data=json.dumps({
+            elif message_type == 'replay':
+                # Reconnecting client asks for everything after the last sequence it saw
+                last_seq = data.get('last_seq')
+                if last_seq is not None and not is_valid_sequence(last_seq):
+                    logger.warning(f"Invalid replay sequence: {last_seq}")
+                    return
+                await self.replay_events(last_seq)
+
+        except FrameDecodeError as e:
+            logger.error(f"Frame decode error: {e}")
+
+    async def send_payload(self, payload):
+        """Encodes a payload with the negotiated codec and sends it.
+
+        A send that waits on the server's write buffer means the client is not
+        keeping up; low-priority events are buffered until sends are fast again.
+        """
+        frame = self.codec.encode(payload)
+        started = time.monotonic()
+        if self.codec.binary:
+            await self.send(bytes_data=frame)
+        else:
+            await self.send(text_data=frame)
+        self.send_backlogged = time.monotonic() - started > get_classroom_setting('SLOW_SEND_MS', 50) / 1000
+
+    async def within_rate_limit(self, message_type):
+        """Applies the per-type token bucket; drops the message and tells the client once when over budget."""
+        if self.rate_limiter.allow(message_type):
+            self.throttle_notified.discard(message_type)
+            return True
+
+        # Throttled messages are counted per window: a flood closes the socket, a long session does not
+        now = time.monotonic()
+        if now - self.dropped_window_start >= get_classroom_setting('DROPPED_MESSAGES_WINDOW_SECONDS', 60):
+            self.dropped_window_start = now
+            self.dropped_messages = 0
+        self.dropped_messages += 1
+        if self.dropped_messages >= get_classroom_setting('MAX_DROPPED_MESSAGES', 500):
+            logger.warning(f"Closing flooding connection: user={self.scope['user'].email}, class_id={self.class_id}")
+            await self.close(code=4008)
+            return False
+        if message_type not in self.throttle_notified:
+            self.throttle_notified.add(message_type)
+            await self.send_payload({
+                'type': 'rate_limited',
+                'message_type': message_type,
+            })
+        return False
+
+    async def publish_chat_event(self, event):
+        """Appends a chat/system event to the class stream, then fans it out with its sequence."""
+        try:
+            event['seq'] = await append_event(self.redis_client, self.class_id, event)
+        except Exception as e:
+            # Live delivery must not depend on the event log
+            logger.error(f"Failed to append classroom event for class_id={self.class_id}: {e}")
+        await self.channel_layer.group_send(self.group_name, event)
+
+    async def replay_events(self, last_seq):
+        """Sends this connection the events it missed, oldest first."""
+        replayed = 0
+        try:
+            async for event in iter_events_after(self.redis_client, self.class_id, last_seq):
+                await self.send_payload(self.build_chat_payload(event))
+                replayed += 1
+        except Exception as e:
+            logger.error(f"Replay failed for class_id={self.class_id}: {e}")
+        await self.send_payload({
+            'type': 'replay_complete',
+            'count': replayed,
+        })
+
+    def build_chat_payload(self, event):
+        return {
             'type': 'chat',
             'message': event['message'],
             'sender': event['sender'],
             'is_emoji': event.get('is_emoji', False),
-        }))
+            'seq': event.get('seq'),
+        }
+
+    async def chat_message(self, event):
+        payload = self.build_chat_payload(event)
+        low_priority = event.get('is_emoji') or event['sender'] == 'system'
+        # Buffer only for a client that is behind (or while earlier buffered events are pending, to keep order)
+        if low_priority and (self.send_backlogged or self.low_priority_events):
+            self.queue_low_priority(payload)
+            return
+        await self.send_payload(payload)
+
+    def queue_low_priority(self, payload):
+        """Buffers emoji and join/leave events, coalescing repeats and dropping the oldest when full.
+
+        Used only while the client is backlogged. The buffer is flushed on a timer,
+        so a slow client only ever has a bounded number of these pending while chat
+        and signaling keep flowing.
+        """
+        if payload['is_emoji']:
+            key = ('emoji', payload['sender'], payload['message'])
+        else:
+            key = ('system', payload['message'])
+        self.low_priority_events.pop(key, None)
+        self.low_priority_events[key] = payload
+        while len(self.low_priority_events) > get_classroom_setting('LOW_PRIORITY_QUEUE_LIMIT', 50):
+            self.low_priority_events.popitem(last=False)
+
+        if self.low_priority_task is None or self.low_priority_task.done():
+            self.low_priority_task = asyncio.ensure_future(self.flush_low_priority())
+
+    async def flush_low_priority(self):
+        interval = get_classroom_setting('LOW_PRIORITY_FLUSH_MS', 250) / 1000
+        while self.low_priority_events:
+            await asyncio.sleep(interval)
+            pending = list(self.low_priority_events.values())
+            self.low_priority_events.clear()
+            for payload in pending:
+                await self.send_payload(payload)
 
     async def signaling_message(self, event):
-        await self.send(text_data=json.dumps({
+        await self.send_payload({
             'type': 'signaling',
             'data': event['data'],
             'sender': event['sender'],
-        }))
+        })
 
     @database_sync_to_async
     def is_eligible(self, user):
         from edu_platform.models import ClassSession, CourseSubscription
         try:
             session = ClassSession.objects.get(class_id=self.class_id, is_active=True)
+            # Compare by id: scope['user'] is a ClaimsUser built from the JWT, not a model instance
             if user.is_teacher:
-                return session.schedule.teacher == user
+                return session.schedule.teacher_id == user.id
             elif user.is_student:
                 return CourseSubscription.objects.filter(
-                    student=user,
-                    course=session.schedule.course,
+                    student_id=user.id,
+                    course_id=session.schedule.course_id,
                     payment_status='completed',
                     is_active=True
                 ).exists()
@@ -0,0 +1,35 @@
+"""
+Rebuilds the daily revenue rollup from course_subscriptions.
+
+Run once after deploying the rollup, and again for a range whenever rows were
+changed outside the payment flows (bulk SQL fixes, imports). Days outside the
+range are left as they are.
+
+Usage: python manage.py backfill_revenue [--start 2025-01-01] [--end 2025-12-31]
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from edu_platform.utility.revenue_rollup import rebuild_revenue
+import time
+
+
+class Command(BaseCommand):
+    help = 'Recomputes revenue_daily rows for a date range (all days by default).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', default=None, help='First day (YYYY-MM-DD), inclusive')
+        parser.add_argument('--end', default=None, help='Last day (YYYY-MM-DD), inclusive')
+
+    def handle(self, *args, **options):
+        bounds = {}
+        for key in ('start', 'end'):
+            if options[key]:
+                bounds[key] = parse_date(options[key])
+                if bounds[key] is None:
+                    raise CommandError(f"Invalid --{key} date: {options[key]}")
+        started = time.perf_counter()
+        written = rebuild_revenue(**bounds)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {written} revenue rows in {time.perf_counter() - started:.1f}s"
+        ))
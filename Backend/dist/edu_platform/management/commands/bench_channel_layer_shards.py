@@ -0,0 +1,85 @@
+"""
+Benchmark of group_send throughput on a sharded Redis channel layer.
+
+Starts N throwaway local redis-server processes and, for 1..N shards, fans
+messages out to many class groups (one receiving channel per group), reporting
+delivered messages per second.
+
+Usage: python manage.py bench_channel_layer_shards --shards 4 [--groups 200] [--messages 20000]
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from channels_redis.core import RedisChannelLayer
+import asyncio
+import shutil
+import subprocess
+import time
+
+
+class Command(BaseCommand):
+    help = 'Measures channel layer throughput from 1 to N local Redis shards.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shards', type=int, default=4)
+        parser.add_argument('--groups', type=int, default=200, help='Number of class groups')
+        parser.add_argument('--messages', type=int, default=20000, help='Messages sent per run')
+        parser.add_argument('--concurrency', type=int, default=64, help='Concurrent senders')
+        parser.add_argument('--port-base', type=int, default=6400)
+        parser.add_argument('--redis-server', default='redis-server')
+
+    def handle(self, *args, **options):
+        if not shutil.which(options['redis_server']):
+            raise CommandError(f"{options['redis_server']} not found on PATH")
+
+        ports = [options['port_base'] + i for i in range(options['shards'])]
+        servers = [
+            subprocess.Popen(
+                [options['redis_server'], '--port', str(port), '--save', '', '--appendonly', 'no'],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            for port in ports
+        ]
+        try:
+            time.sleep(0.5)  # Let the servers bind
+            self.stdout.write(f"{'shards':>6}{'messages':>10}{'seconds':>10}{'msg/s':>12}")
+            for count in range(1, len(ports) + 1):
+                hosts = [('127.0.0.1', port) for port in ports[:count]]
+                elapsed = asyncio.run(self.run_once(hosts, options))
+                self.stdout.write(
+                    f"{count:>6}{options['messages']:>10}{elapsed:>10.2f}{options['messages'] / elapsed:>12.0f}"
+                )
+        finally:
+            for server in servers:
+                server.terminate()
+            for server in servers:
+                server.wait()
+
+    async def run_once(self, hosts, options):
+        layer = RedisChannelLayer(hosts=hosts, capacity=options['messages'])
+        groups = [f"class_bench{i}" for i in range(options['groups'])]
+        channels = []
+        for group in groups:
+            channel = await layer.new_channel()
+            await layer.group_add(group, channel)
+            channels.append(channel)
+
+        total = options['messages']
+        expected = [total // len(groups) + (1 if i < total % len(groups) else 0) for i in range(len(groups))]
+
+        async def receive_all(channel, count):
+            for _ in range(count):
+                await layer.receive(channel)
+
+        async def send_range(worker):
+            for n in range(worker, total, options['concurrency']):
+                await layer.group_send(groups[n % len(groups)], {'type': 'chat_message', 'message': 'x' * 64, 'n': n})
+
+        started = time.perf_counter()
+        receivers = [asyncio.ensure_future(receive_all(c, e)) for c, e in zip(channels, expected)]
+        await asyncio.gather(*(send_range(w) for w in range(options['concurrency'])))
+        await asyncio.gather(*receivers)
+        elapsed = time.perf_counter() - started
+
+        await layer.flush()  # Also closes the connection pools
+        return elapsed
@@ -0,0 +1,97 @@
+"""
+Micro-benchmark of classroom frame codecs (JSON vs msgpack) on typical payloads.
+
+Usage: python manage.py bench_classroom_codecs [--iterations 20000]
+"""
+
+from django.core.management.base import BaseCommand
+from edu_platform.utility.frame_codecs import JSONCodec, MsgpackCodec
+import timeit
+
+
+def build_sdp(media_sections=3):
+    """Builds an SDP offer of realistic size (a few KB per video/audio section)."""
+    lines = [
+        'v=0',
+        'o=- 4611731400430051336 2 IN IP4 127.0.0.1',
+        's=-',
+        't=0 0',
+        'a=group:BUNDLE ' + ' '.join(str(i) for i in range(media_sections)),
+        'a=msid-semantic: WMS stream',
+    ]
+    for mid in range(media_sections):
+        lines += [
+            f'm=video 9 UDP/TLS/RTP/SAVPF 96 97 98 99 100 101 102 {mid}',
+            'c=IN IP4 0.0.0.0',
+            'a=rtcp:9 IN IP4 0.0.0.0',
+            'a=ice-ufrag:EsAw',
+            'a=ice-pwd:bP+XJMM09aR8AiX1jdukzR6Y',
+            'a=fingerprint:sha-256 DA:7B:57:DC:28:CE:04:4F:31:79:85:C4:31:67:EB:27:58:29:ED:77:2A:0D:24:AE:ED:D7:3A:A1:5B:60:AE:0B',
+            'a=setup:actpass',
+            f'a=mid:{mid}',
+            'a=sendrecv',
+            'a=rtcp-mux',
+            'a=rtcp-rsize',
+        ]
+        for pt in range(96, 103):
+            lines += [
+                f'a=rtpmap:{pt} VP8/90000',
+                f'a=rtcp-fb:{pt} goog-remb',
+                f'a=rtcp-fb:{pt} transport-cc',
+                f'a=rtcp-fb:{pt} ccm fir',
+                f'a=rtcp-fb:{pt} nack',
+                f'a=rtcp-fb:{pt} nack pli',
+                f'a=fmtp:{pt} level-asymmetry-allowed=1;packetization-mode=1;profile-level-id=42e01f',
+            ]
+        lines.append(f'a=ssrc:{1000 + mid} cname:4TOk42mSjXCkVIa6')
+    return '\r\n'.join(lines) + '\r\n'
+
+
+PAYLOADS = {
+    'sdp_offer': {
+        'type': 'signaling',
+        'sender': 'teacher@example.com',
+        'data': {'type': 'offer', 'sdp': build_sdp(), 'target': 'student@example.com'},
+    },
+    'ice_candidate': {
+        'type': 'signaling',
+        'sender': 'student@example.com',
+        'data': {
+            'type': 'candidate',
+            'candidate': 'candidate:842163049 1 udp 1677729535 203.0.113.7 46154 typ srflx raddr 0.0.0.0 rport 0 generation 0 ufrag EsAw network-cost 999',
+            'sdpMid': '0',
+            'sdpMLineIndex': 0,
+        },
+    },
+    'chat': {
+        'type': 'chat',
+        'message': 'Could you go over the last slide again please?',
+        'sender': 'student@example.com',
+        'is_emoji': False,
+        'seq': '1718000000000-0',
+    },
+}
+
+
+class Command(BaseCommand):
+    help = 'Compares JSON and msgpack encode/decode cost and frame size for classroom payloads.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20000)
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        codecs = [('json', JSONCodec()), ('msgpack', MsgpackCodec())]
+
+        self.stdout.write(f"{'payload':<15}{'codec':<10}{'bytes':>8}{'encode us':>12}{'decode us':>12}")
+        for name, payload in PAYLOADS.items():
+            for codec_name, codec in codecs:
+                frame = codec.encode(payload)
+                assert codec.decode(frame) == payload
+                size = len(frame.encode('utf-8')) if isinstance(frame, str) else len(frame)
+                encode_s = timeit.timeit(lambda: codec.encode(payload), number=iterations)
+                decode_s = timeit.timeit(lambda: codec.decode(frame), number=iterations)
+                self.stdout.write(
+                    f"{name:<15}{codec_name:<10}{size:>8}"
+                    f"{encode_s / iterations * 1e6:>12.2f}{decode_s / iterations * 1e6:>12.2f}"
+                )
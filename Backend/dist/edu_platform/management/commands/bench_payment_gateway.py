@@ -0,0 +1,86 @@
+"""
+Benchmark of the payment gateway adapters.
+
+Fetches order payments N times through the sync adapter on a thread pool and
+through the async adapter with bounded concurrency, and reports throughput and
+latency percentiles. Defaults to the fake gateway with simulated latency, so it
+runs offline; ``--gateway razorpay`` measures the real API with the configured
+keys (read-only calls).
+
+Usage: python manage.py bench_payment_gateway [--requests 500] [--concurrency 16]
+       [--latency 0.05] [--gateway fake|razorpay] [--order-id ORDER]
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from edu_platform.utility.payment_gateway import (
+    get_gateway, AsyncFakeGateway, AsyncRazorpayGateway, GatewayUnavailable
+)
+import asyncio
+import statistics
+import time
+
+
+class Command(BaseCommand):
+    help = 'Measures sync and async payment gateway adapter throughput.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--latency', type=float, default=0.05, help='Simulated seconds per fake gateway call')
+        parser.add_argument('--gateway', choices=['fake', 'razorpay'], default='fake')
+        parser.add_argument('--order-id', default='order_bench0000001', help='Order to read when using razorpay')
+
+    def report(self, label, durations, errors, elapsed):
+        durations.sort()
+        p95 = durations[int(len(durations) * 0.95) - 1] if durations else 0
+        self.stdout.write(
+            f"{label}: {len(durations)} ok, {errors} errors in {elapsed:.2f}s "
+            f"({len(durations) / elapsed:.0f} req/s), median {statistics.median(durations or [0]) * 1000:.1f} ms, "
+            f"p95 {p95 * 1000:.1f} ms"
+        )
+
+    def handle(self, *args, **options):
+        count, concurrency, order_id = options['requests'], options['concurrency'], options['order_id']
+        if options['gateway'] == 'fake':
+            gateway = get_gateway('fake', latency=options['latency'])
+            async_gateway = AsyncFakeGateway(latency=options['latency'])
+        else:
+            gateway = get_gateway('razorpay')
+            async_gateway = AsyncRazorpayGateway()
+
+        def timed_call(_):
+            started = time.perf_counter()
+            try:
+                gateway.fetch_order_payments(order_id)
+            except GatewayUnavailable:
+                return None
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(timed_call, range(count)))
+        durations = [result for result in results if result is not None]
+        self.report(f"sync x{concurrency} threads", durations, count - len(durations), time.perf_counter() - started)
+
+        async def run_async():
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def timed_async_call():
+                async with semaphore:
+                    call_started = time.perf_counter()
+                    try:
+                        await async_gateway.fetch_order_payments(order_id)
+                    except GatewayUnavailable:
+                        return None
+                    return time.perf_counter() - call_started
+
+            try:
+                return await asyncio.gather(*(timed_async_call() for _ in range(count)))
+            finally:
+                await async_gateway.close()
+
+        started = time.perf_counter()
+        results = asyncio.run(run_async())
+        durations = [result for result in results if result is not None]
+        self.report(f"async x{concurrency} tasks", durations, count - len(durations), time.perf_counter() - started)
@@ -0,0 +1,151 @@
+"""
+Benchmark of the admin payment records listing (AllPaymentRecordsAPIView).
+
+Seeds synthetic subscriptions (1M by default: students x courses, each with an
+enrollment, 90% completed), then times the endpoint at increasing page depths
+with keyset cursors, next to the OFFSET query the old page-number pagination
+ran for the same depth. Also reports the SQL statements per request. Seeded
+rows are tagged by the ``bench-pay-`` prefix and removed with ``--cleanup``.
+
+Usage: python manage.py bench_payment_records [--rows 1000000] [--depths 1,100,10000,49000]
+       [--repeat 5] [--skip-seed] [--cleanup]
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import F
+from django.test.client import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from edu_platform.models import Course, CourseSubscription, CourseEnrollment
+from edu_platform.utility.pagination import KeysetPagination
+from edu_platform.views.course_views import AllPaymentRecordsAPIView
+from rest_framework.test import force_authenticate
+from datetime import timedelta
+import statistics
+import time
+
+PREFIX = 'bench-pay-'
+BATCH = 5000
+
+
+class Command(BaseCommand):
+    help = 'Seeds subscriptions and measures payment record page latency by depth.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--courses', type=int, default=100)
+        parser.add_argument('--depths', default='1,100,10000,49000', help='Comma-separated page numbers')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--skip-seed', action='store_true', help='Reuse previously seeded rows')
+        parser.add_argument('--cleanup', action='store_true', help='Delete seeded rows and exit')
+
+    def cleanup(self):
+        User = get_user_model()
+        courses = Course.objects.filter(slug__startswith=PREFIX)
+        CourseEnrollment.objects.filter(course__in=courses).delete()
+        CourseSubscription.objects.filter(course__in=courses).delete()
+        courses.delete()
+        User.objects.filter(username__startswith=PREFIX).delete()
+
+    def seed(self, rows, course_count):
+        User = get_user_model()
+        students = -(-rows // course_count)
+        now = timezone.now()
+        with transaction.atomic():
+            Course.objects.bulk_create([
+                Course(name=f"Benchmark Course {i}", slug=f"{PREFIX}{i}", description='Benchmark', category='benchmark', base_price=999)
+                for i in range(course_count)
+            ], batch_size=BATCH)
+            User.objects.bulk_create([
+                User(username=f"{PREFIX}{i}", email=f"{PREFIX}{i}@example.com", role='student', has_purchased_courses=True)
+                for i in range(students)
+            ], batch_size=BATCH)
+        course_ids = list(Course.objects.filter(slug__startswith=PREFIX).order_by('id').values_list('id', flat=True))
+        student_ids = list(User.objects.filter(username__startswith=PREFIX).order_by('id').values_list('id', flat=True))
+
+        created = 0
+        while created < rows:
+            chunk = []
+            for n in range(created, min(created + BATCH, rows)):
+                completed = n % 10 != 0
+                chunk.append(CourseSubscription(
+                    student_id=student_ids[n // course_count],
+                    course_id=course_ids[n % course_count],
+                    payment_status='completed' if completed else 'pending',
+                    order_id=f"{PREFIX}order-{n}",
+                    payment_id=f"{PREFIX}pay-{n}" if completed else None,
+                    amount_paid=999,
+                    payment_method='razorpay',
+                    payment_completed_at=now - timedelta(seconds=n) if completed else None,
+                ))
+            with transaction.atomic():
+                CourseSubscription.objects.bulk_create(chunk)
+                CourseEnrollment.objects.bulk_create([
+                    CourseEnrollment(
+                        student_id=subscription.student_id, course_id=subscription.course_id,
+                        subscription_id=subscription.id, batch='weekdays' if subscription.id % 2 else 'weekends'
+                    )
+                    for subscription in chunk
+                ])
+            created += len(chunk)
+            if created % 100_000 < BATCH:
+                self.stdout.write(f"Seeded {created}/{rows} subscriptions")
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE course_subscriptions')
+            cursor.execute('ANALYZE course_enrollments')
+
+    def timed(self, call, repeat):
+        durations, queries = [], 0
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                call()
+                durations.append(time.perf_counter() - started)
+            queries = len(context.captured_queries)
+        return statistics.median(durations) * 1000, queries
+
+    def handle(self, *args, **options):
+        if options['cleanup']:
+            self.cleanup()
+            self.stdout.write(self.style.SUCCESS('Removed benchmark rows'))
+            return
+        if not options['skip_seed']:
+            started = time.perf_counter()
+            self.seed(options['rows'], options['courses'])
+            self.stdout.write(f"Seeded {options['rows']} subscriptions in {time.perf_counter() - started:.0f}s")
+
+        admin = get_user_model()(id=0, username='bench-admin', role='admin', is_staff=True, is_superuser=True)
+        view = AllPaymentRecordsAPIView.as_view()
+        factory = RequestFactory()
+        pagination = KeysetPagination()
+        size = pagination.page_size
+        ordered = CourseSubscription.objects.order_by(F('payment_completed_at').desc(nulls_first=True), '-id')
+
+        for page in [int(depth) for depth in options['depths'].split(',')]:
+            offset = (page - 1) * size
+            params = {}
+            if offset:
+                # Cursor of the last row of the previous page, as the client would receive it
+                value, pk = ordered.values_list('payment_completed_at', 'id')[offset - 1]
+                params['cursor'] = pagination.encode_cursor(value, pk)
+
+            def keyset_page():
+                request = factory.get('/api/courses/payments/all/', params)
+                force_authenticate(request, user=admin)
+                response = view(request)
+                assert response.status_code == 200, response.data
+                response.render()
+
+            def offset_page():
+                list(AllPaymentRecordsAPIView().get_queryset().order_by(
+                    F('payment_completed_at').desc(nulls_first=True), '-id'
+                )[offset:offset + size])
+
+            keyset_ms, keyset_queries = self.timed(keyset_page, options['repeat'])
+            offset_ms, _ = self.timed(offset_page, options['repeat'])
+            self.stdout.write(
+                f"page {page:>6}: keyset {keyset_ms:7.1f} ms ({keyset_queries} queries)   offset {offset_ms:8.1f} ms"
+            )
+        self.stdout.write(self.style.SUCCESS('Benchmark finished'))
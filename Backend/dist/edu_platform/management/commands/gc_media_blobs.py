@@ -0,0 +1,36 @@
+"""
+Garbage-collects deduplicated media blobs.
+
+Deletes blobs that no field has referred to for longer than the grace period.
+``--recount`` first rebuilds every reference count from the database (all
+FileFields plus recording poster lists), which repairs counts drifted by
+queryset updates that bypass model signals.
+
+Usage: python manage.py gc_media_blobs [--recount] [--grace-hours 24] [--dry-run]
+"""
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from edu_platform.utility.media_dedup import collect_garbage, recount_references
+
+
+class Command(BaseCommand):
+    help = 'Deletes unreferenced media blobs, optionally recounting references first.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recount', action='store_true', help='Rebuild reference counts before collecting')
+        parser.add_argument('--grace-hours', type=int, default=None, help='Override MEDIA_BLOB_GC_GRACE_HOURS')
+        parser.add_argument('--dry-run', action='store_true', help='Only list the blobs that would be deleted')
+
+    def handle(self, *args, **options):
+        if options['recount']:
+            corrected = recount_references(apps.get_app_config('edu_platform'))
+            self.stdout.write(f"Corrected {corrected} reference counts")
+
+        blobs = collect_garbage(grace_hours=options['grace_hours'], dry_run=options['dry_run'])
+        for digest, name, size in blobs:
+            self.stdout.write(f"{'would delete' if options['dry_run'] else 'deleted'} {name} ({size} bytes)")
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(blobs)} blobs, {sum(size for _, _, size in blobs)} bytes"
+            f"{' reclaimable' if options['dry_run'] else ' reclaimed'}"
+        ))
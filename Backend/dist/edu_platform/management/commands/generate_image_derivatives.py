@@ -0,0 +1,46 @@
+"""
+Renders image derivatives in the foreground.
+
+Backfills course thumbnails and profile pictures uploaded before derivatives
+existed, or regenerates all of them after IMAGE_DERIVATIVE_SETTINGS changes.
+
+Usage: python manage.py generate_image_derivatives [--force]
+"""
+
+from django.core.management.base import BaseCommand
+from edu_platform.utility.image_derivatives import (
+    IMAGE_SOURCES, source_model, render_derivatives, store_derivatives, derivative_options
+)
+from edu_platform.utility.recording_processing import recording_source
+import time
+
+
+class Command(BaseCommand):
+    help = 'Generates resized WebP/JPEG copies of course thumbnails and profile pictures.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenerate derivatives that are up to date')
+
+    def handle(self, *args, **options):
+        rendered = failed = 0
+        started = time.perf_counter()
+        for label, (image_field, derivatives_field) in IMAGE_SOURCES.items():
+            model = source_model(label)
+            rows = model.objects.exclude(**{image_field: ''}).exclude(**{f'{image_field}__isnull': True})
+            for instance in rows.only('pk', image_field, derivatives_field).iterator():
+                image = getattr(instance, image_field)
+                derivatives = getattr(instance, derivatives_field) or {}
+                if not options['force'] and derivatives.get('source') == image.name:
+                    continue
+                try:
+                    result = render_derivatives(recording_source(image), derivative_options())
+                    if store_derivatives(label, instance.pk, image.name, result):
+                        rendered += 1
+                        self.stdout.write(f"{label} {instance.pk}: {len(result['files'])} files")
+                except Exception as e:
+                    failed += 1
+                    self.stdout.write(self.style.ERROR(f"{label} {instance.pk}: {e}"))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rendered derivatives for {rendered} images ({failed} failed) in {time.perf_counter() - started:.1f}s"
+        ))
@@ -0,0 +1,63 @@
+"""
+Runs the recording processing pipeline in the foreground.
+
+Useful to backfill recordings uploaded before processing existed, or to retry
+failed ones, without waiting for the web workers' periodic job.
+
+Usage: python manage.py process_recordings [--session ID ...] [--retry-failed] [--reprocess]
+"""
+
+from django.core.management.base import BaseCommand
+from edu_platform.models import ClassSession
+from edu_platform.utility.recording_processing import (
+    process_recording_file, store_results, mark_failed, worker_options, recording_source, claim_recording,
+    release_lease
+)
+import time
+
+
+class Command(BaseCommand):
+    help = 'Computes checksum, media metadata and poster frames for class recordings.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--session', type=int, action='append', help='Only these session IDs')
+        parser.add_argument('--retry-failed', action='store_true', help='Include recordings that failed before')
+        parser.add_argument('--reprocess', action='store_true', help='Include recordings that are already processed')
+
+    def handle(self, *args, **options):
+        statuses = ['', 'pending']
+        if options['retry_failed']:
+            statuses.append('failed')
+        if options['reprocess']:
+            statuses.append('ready')
+
+        sessions = ClassSession.objects.exclude(recording='').exclude(recording__isnull=True).filter(
+            recording_status__in=statuses
+        )
+        if options['session']:
+            sessions = sessions.filter(id__in=options['session'])
+
+        processed = failed = 0
+        started = time.perf_counter()
+        for session in sessions.only('id', 'recording').iterator():
+            name = session.recording.name
+            claim = claim_recording(session.id, statuses)
+            if claim is None:
+                continue
+            try:
+                result = process_recording_file(recording_source(session.recording), worker_options())
+                store_results(session.id, name, result, claim)
+                processed += 1
+                self.stdout.write(f"session {session.id}: {result['size']} bytes, sha256 {result['sha256'][:12]}…")
+                for error in result['errors']:
+                    self.stdout.write(self.style.WARNING(f"  {error}"))
+            except Exception as e:
+                mark_failed(session.id, name, e, claim)
+                failed += 1
+                self.stdout.write(self.style.ERROR(f"session {session.id}: {e}"))
+            finally:
+                release_lease(session.id)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {processed} recordings ({failed} failed) in {time.perf_counter() - started:.1f}s"
+        ))
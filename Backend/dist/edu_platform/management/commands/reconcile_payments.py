@@ -0,0 +1,68 @@
+"""
+Reconciles pending subscriptions against the payment gateway.
+
+Completes subscriptions whose payment was captured but never verified, fails
+those whose payments all failed, and prints the mismatches found and the
+throughput reached. ``--gateway fake`` runs against the in-memory gateway,
+which gives unknown orders deterministic outcomes, with optional latency.
+Because those outcomes are made up, the fake gateway only changes data with
+DEBUG on; otherwise it needs ``--dry-run``.
+
+Usage: python manage.py reconcile_payments [--gateway fake] [--fake-latency 0.05]
+       [--chunk-size 200] [--concurrency 8] [--older-than 30] [--limit N] [--dry-run]
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from edu_platform.utility.payment_gateway import FakeGateway, get_gateway
+from edu_platform.utility.payment_reconciliation import reconcile_pending
+
+
+class Command(BaseCommand):
+    help = 'Cross-checks pending subscriptions with the payment gateway and applies missed state changes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--gateway', choices=['razorpay', 'fake'], default=None, help='Defaults to PAYMENT_GATEWAY_SETTINGS')
+        parser.add_argument('--fake-latency', type=float, default=None, help='Seconds per fake gateway request')
+        parser.add_argument('--chunk-size', type=int, default=None)
+        parser.add_argument('--concurrency', type=int, default=None)
+        parser.add_argument('--older-than', type=int, default=None, help='Only orders created this many minutes ago or earlier')
+        parser.add_argument('--limit', type=int, default=None, help='Stop after this many subscriptions')
+        parser.add_argument('--dry-run', action='store_true', help='Report mismatches without changing anything')
+
+    def handle(self, *args, **options):
+        if options['fake_latency'] is not None:
+            gateway = get_gateway('fake', latency=options['fake_latency'])
+        else:
+            gateway = get_gateway(options['gateway'])
+        if isinstance(gateway, FakeGateway) and not options['dry_run'] and not settings.DEBUG:
+            raise CommandError(
+                'The fake gateway invents payment outcomes; use --dry-run, or DEBUG, to run against it.'
+            )
+        report = reconcile_pending(
+            gateway,
+            chunk_size=options['chunk_size'],
+            concurrency=options['concurrency'],
+            older_than_minutes=options['older_than'],
+            dry_run=options['dry_run'],
+            limit=options['limit'],
+        )
+
+        for mismatch in report['mismatches']:
+            self.stdout.write(
+                f"subscription {mismatch['subscription_id']} order {mismatch['order_id']}: "
+                f"local {mismatch['local']}, gateway {mismatch['gateway']} (payment {mismatch['payment_id']})"
+            )
+        for order_id in report['error_orders']:
+            self.stdout.write(self.style.WARNING(f"order {order_id}: gateway lookup failed"))
+
+        action = 'would change' if options['dry_run'] else 'changed'
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {report['checked']} pending subscriptions in {report['chunks']} chunks: "
+            f"{report['completed']} completed, {report['failed']} failed ({action}), "
+            f"{report['unchanged']} unchanged, {report['errors']} errors"
+        ))
+        self.stdout.write(
+            f"{report['elapsed_seconds']:.2f}s total, {report['gateway_seconds']:.2f}s waiting on the gateway, "
+            f"{report['orders_per_second']:.1f} orders/s"
+        )
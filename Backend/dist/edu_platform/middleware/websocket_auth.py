@@ -0,0 +1,114 @@
+"""
+JWT authentication for WebSocket connections.
+
+The SPA authenticates the REST API with SimpleJWT access tokens and has no session
+cookie, so the session-based ``AuthMiddlewareStack`` cannot identify it. This
+middleware reads the access token from the ``access_token.<jwt>`` subprotocol
+(browsers cannot set headers on WebSockets) or from the ``?token=`` query
+parameter, validates the signature and expiry locally, and sets ``scope['user']``
+to a ``ClaimsUser`` built from the token claims, without a database query.
+
+Verified tokens are kept in a small LRU so reconnect storms (a whole class
+reconnecting after a network blip) don't repeat the signature check.
+"""
+
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import AccessToken
+from edu_platform.utility.jwt_tokens import ClaimsUser
+from collections import OrderedDict
+from urllib.parse import parse_qs
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+TOKEN_SUBPROTOCOL_PREFIX = 'access_token.'
+TOKEN_QUERY_PARAM = 'token'
+
+
+class VerifiedTokenCache:
+    """LRU of raw token -> validated claims; entries are dropped once the token expires."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+
+    def get(self, raw_token):
+        claims = self.entries.get(raw_token)
+        if claims is None:
+            return None
+        if claims.get('exp', 0) <= time.time():
+            del self.entries[raw_token]
+            return None
+        self.entries.move_to_end(raw_token)
+        return claims
+
+    def set(self, raw_token, claims):
+        self.entries[raw_token] = claims
+        self.entries.move_to_end(raw_token)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+
+token_cache = VerifiedTokenCache(
+    getattr(settings, 'CLASSROOM_SETTINGS', {}).get('TOKEN_CACHE_SIZE', 1024)
+)
+
+
+def get_raw_token(scope):
+    """Extracts the access token from the offered subprotocols or the query string."""
+    for subprotocol in scope.get('subprotocols') or []:
+        if subprotocol.startswith(TOKEN_SUBPROTOCOL_PREFIX):
+            return subprotocol[len(TOKEN_SUBPROTOCOL_PREFIX):]
+    query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    values = query.get(TOKEN_QUERY_PARAM)
+    return values[0] if values else None
+
+
+@database_sync_to_async
+def load_user_claims(user_id):
+    """Fallback for tokens issued before role/email claims were added."""
+    from edu_platform.models import User
+    return User.objects.filter(id=user_id, is_active=True).values('role', 'email').first()
+
+
+async def get_claims(raw_token):
+    """Returns validated claims for a raw access token, or None if it is invalid."""
+    claims = token_cache.get(raw_token)
+    if claims is not None:
+        return claims
+
+    try:
+        claims = dict(AccessToken(raw_token).payload)
+    except TokenError as e:
+        logger.warning(f"Rejected WebSocket token: {e}")
+        return None
+
+    if 'role' not in claims:
+        user_claims = await load_user_claims(claims.get(settings.SIMPLE_JWT.get('USER_ID_CLAIM', 'user_id')))
+        if user_claims is None:
+            return None
+        claims.update(user_claims)
+
+    token_cache.set(raw_token, claims)
+    return claims
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """Populates scope['user'] from a JWT access token."""
+
+    async def __call__(self, scope, receive, send):
+        scope = dict(scope)
+        raw_token = get_raw_token(scope)
+        claims = await get_claims(raw_token) if raw_token else None
+        scope['user'] = ClaimsUser(claims) if claims else AnonymousUser()
+        return await super().__call__(scope, receive, send)
+
+
+def JWTAuthMiddlewareStack(inner):
+    """Drop-in replacement for channels' AuthMiddlewareStack for token-authenticated clients."""
+    return JWTAuthMiddleware(inner)
@@ -1,5 +1,7 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models.functions import Upper
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 from django.conf import settings
@@ -123,6 +125,7 @@ class TeacherProfile(models.Model):
     specialization = models.JSONField(default=list, help_text="List of subjects/areas of expertise")
     bio = models.TextField(blank=True, help_text="Brief professional biography")
     profile_picture = models.ImageField(upload_to='teacher_profiles/', null=True, blank=True)
+    profile_picture_derivatives = models.JSONField(default=dict, blank=True, help_text="Resized WebP/JPEG copies of the profile picture")
     linkedin_url = models.URLField(blank=True)
     resume = models.FileField(upload_to='teacher_resumes/', null=True, blank=True)
     is_verified = models.BooleanField(default=False, help_text="Verified by admin")
@@ -150,6 +153,7 @@ class StudentProfile(models.Model):
         limit_choices_to={'role': 'student'}
     )
     profile_picture = models.ImageField(upload_to='student_profiles/', null=True, blank=True)
+    profile_picture_derivatives = models.JSONField(default=dict, blank=True, help_text="Resized WebP/JPEG copies of the profile picture")
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -231,6 +235,7 @@ class Course(models.Model):
     category = models.CharField(max_length=100)
     level = models.CharField(max_length=20, choices=LEVEL_CHOICES, default='beginner')
     thumbnail = models.ImageField(upload_to='course_thumbnails/', blank=True, null=True)
+    thumbnail_derivatives = models.JSONField(default=dict, blank=True, help_text="Resized WebP/JPEG copies of the thumbnail")
     duration_hours = models.IntegerField(help_text="Total course duration in hours", default=30)
     base_price = models.DecimalField(max_digits=10, decimal_places=2)
     advantages = models.JSONField(default=list, help_text="List of course advantages/features")
@@ -245,6 +250,8 @@ class Course(models.Model):
         indexes = [
             models.Index(fields=['category', 'is_active']),
             models.Index(fields=['slug']),
+            # Serves name__icontains (UPPER(name) LIKE '%...%'); needs pg_trgm
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'), name='courses_name_trgm_idx'),
         ]
         
     def __str__(self):
@@ -293,6 +300,7 @@ class CourseSubscription(models.Model):
     payment_status = models.CharField(max_length=20, choices=PAYMENT_STATUS, default='pending')
     payment_id = models.CharField(max_length=255, unique=True, null=True, blank=True)
     order_id = models.CharField(max_length=255, unique=True, null=True, blank=True)
+    order_fingerprint = models.CharField(max_length=64, blank=True, help_text="Hash of the student, course, batch and amount the open order was created for")
     amount_paid = models.DecimalField(max_digits=10, decimal_places=2)
     payment_method = models.CharField(max_length=50, choices=PAYMENT_METHOD_CHOICES, default='other')
     
@@ -315,6 +323,9 @@ class CourseSubscription(models.Model):
         indexes = [
             models.Index(fields=['student', 'payment_status']),
             models.Index(fields=['course', 'payment_status']),
+            # Keyset pagination of the admin payment list, unfiltered and by status
+            models.Index(fields=['payment_completed_at', 'id']),
+            models.Index(fields=['payment_status', 'payment_completed_at', 'id']),
         ]
     
     def __str__(self):
@@ -364,6 +375,7 @@ class ClassSchedule(models.Model):
     batch = models.CharField( max_length=20, choices=[("weekdays", "Weekdays"), ("weekends", "Weekends")])
     batch_start_date = models.DateField()
     batch_end_date = models.DateField()
+    capacity = models.PositiveIntegerField(null=True, blank=True, help_text="Seats this schedule adds to its batch; empty means unlimited")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -390,6 +402,25 @@ class ClassSession(models.Model):
     end_time = models.DateTimeField()
     recording = models.FileField(upload_to="recordings/", blank=True, null=True, help_text="Local class recording")
     is_active = models.BooleanField(default=True, help_text="Whether the class is live or accessible")
+
+    # Filled in by the recording processing pipeline after upload
+    RECORDING_STATUS_CHOICES = (
+        ('', 'None'),
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    )
+    recording_status = models.CharField(max_length=10, choices=RECORDING_STATUS_CHOICES, default='', blank=True)
+    recording_size = models.BigIntegerField(null=True, blank=True, help_text="Recording size in bytes")
+    recording_sha256 = models.CharField(max_length=64, blank=True)
+    recording_duration = models.FloatField(null=True, blank=True, help_text="Recording duration in seconds")
+    recording_width = models.PositiveIntegerField(null=True, blank=True)
+    recording_height = models.PositiveIntegerField(null=True, blank=True)
+    recording_posters = models.JSONField(default=list, blank=True, help_text="Storage names of poster frames")
+    recording_processed_at = models.DateTimeField(null=True, blank=True)
+    recording_claim = models.CharField(max_length=32, blank=True, help_text="Token of the worker processing the recording")
+    recording_lease_until = models.DateTimeField(null=True, blank=True, help_text="The claim is retried if not renewed by then")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -398,6 +429,7 @@ class ClassSession(models.Model):
         indexes = [
             models.Index(fields=['class_id']),
             models.Index(fields=["schedule", "session_date", "start_time"]),
+            models.Index(fields=["recording_status", "updated_at"]),
         ]
         ordering = ["created_at"]
 
@@ -424,6 +456,238 @@ class ClassSession(models.Model):
             )
 
 
+class ClassChatMessage(models.Model):
+    """Archived chat and system events from a class session's live event stream."""
+    session = models.ForeignKey(
+        ClassSession,
+        on_delete=models.CASCADE,
+        related_name='chat_messages'
+    )
+    sequence = models.CharField(max_length=32, help_text="Redis Stream entry ID the event was published with")
+    sender = models.CharField(max_length=254)
+    message = models.TextField()
+    is_emoji = models.BooleanField(default=False)
+    is_system = models.BooleanField(default=False)
+    sent_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'class_chat_messages'
+        unique_together = ['session', 'sequence']
+        indexes = [
+            models.Index(fields=['session', 'sent_at']),
+        ]
+        ordering = ['sent_at', 'id']
+
+    def __str__(self):
+        return f"{self.sender}: {self.message[:50]} ({self.sequence})"
+
+
+class ClassAttendance(models.Model):
+    """Accumulated attendance of one user in one class session, flushed from Redis in bulk."""
+    session = models.ForeignKey(
+        ClassSession,
+        on_delete=models.CASCADE,
+        related_name='attendance'
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='class_attendance'
+    )
+    first_joined_at = models.DateTimeField()
+    last_left_at = models.DateTimeField()
+    total_seconds = models.PositiveIntegerField(default=0, help_text="Time connected, summed over all joins")
+    join_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'class_attendance'
+        unique_together = ['session', 'user']
+        indexes = [
+            models.Index(fields=['user', 'session']),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - session {self.session_id} ({self.total_seconds}s)"
+
+
+class PlaybackProgress(models.Model):
+    """Latest playback position of one user in one class recording, flushed from Redis in bulk."""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='playback_progress'
+    )
+    session = models.ForeignKey(
+        ClassSession,
+        on_delete=models.CASCADE,
+        related_name='playback_progress'
+    )
+    position_seconds = models.FloatField(default=0)
+    duration_seconds = models.FloatField(null=True, blank=True)
+    completed = models.BooleanField(default=False, help_text="Watched to the end at least once")
+    updated_at = models.DateTimeField(help_text="Time of the heartbeat that set the position")
+
+    class Meta:
+        db_table = 'playback_progress'
+        unique_together = ['user', 'session']
+        indexes = [
+            models.Index(fields=['user', '-updated_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - session {self.session_id} at {self.position_seconds:.0f}s"
+
+
+class RecordingUpload(models.Model):
+    """A resumable, chunked upload of a class recording; the file is attached to the session on finalize."""
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('finalizing', 'Finalizing'),
+        ('completed', 'Completed'),
+        ('aborted', 'Aborted'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    session = models.ForeignKey(
+        ClassSession,
+        on_delete=models.CASCADE,
+        related_name='recording_uploads'
+    )
+    uploaded_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='recording_uploads'
+    )
+    filename = models.CharField(max_length=255)
+    total_size = models.BigIntegerField(help_text="Size of the complete file in bytes")
+    received_bytes = models.BigIntegerField(default=0, help_text="Bytes confirmed so far; the next chunk must start here")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'recording_uploads'
+        indexes = [
+            models.Index(fields=['session', 'status']),
+            models.Index(fields=['status', 'updated_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.filename} ({self.received_bytes}/{self.total_size}) - {self.status}"
+
+    @property
+    def is_complete(self):
+        return self.received_bytes >= self.total_size
+
+
+class MediaBlob(models.Model):
+    """A stored media file, keyed by content hash and shared by every field that references it."""
+    digest = models.CharField(max_length=64, primary_key=True, help_text="SHA-256 of the content (hex)")
+    name = models.CharField(max_length=255, unique=True, help_text="Storage name of the blob")
+    size = models.BigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'media_blobs'
+        indexes = [
+            models.Index(fields=['ref_count', 'updated_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.size} bytes, {self.ref_count} refs)"
+
+
+class PaymentWebhookEvent(models.Model):
+    """Inbox of verified payment gateway webhooks, applied in batches by a background job."""
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('processed', 'Processed'),
+        ('ignored', 'Ignored'),
+        ('failed', 'Failed'),
+    )
+
+    event_id = models.CharField(max_length=100, unique=True, null=True, blank=True, help_text="Gateway event ID (X-Razorpay-Event-Id); redeliveries share it")
+    event_type = models.CharField(max_length=100)
+    payload = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'payment_webhook_events'
+        indexes = [
+            models.Index(fields=['status', 'id']),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} {self.event_id} ({self.status})"
+
+
+class RevenueDaily(models.Model):
+    """Daily revenue rollup per course, payment method and currency, maintained incrementally."""
+    day = models.DateField()
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='revenue_days')
+    payment_method = models.CharField(max_length=50)
+    currency = models.CharField(max_length=3)
+    orders_created = models.PositiveIntegerField(default=0, help_text="Gateway orders created (checkouts started)")
+    completed_count = models.PositiveIntegerField(default=0)
+    gross_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    refunded_count = models.PositiveIntegerField(default=0)
+    refunded_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'revenue_daily'
+        unique_together = ['day', 'course', 'payment_method', 'currency']
+        indexes = [
+            models.Index(fields=['course', 'day']),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.course_id} {self.payment_method} {self.currency}: {self.gross_amount}"
+
+
+class TransactionExport(models.Model):
+    """A transaction export rendered in the background; the file is kept for EXPIRY_HOURS."""
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    )
+    FORMAT_CHOICES = (
+        ('pdf', 'PDF'),
+        ('xlsx', 'Excel'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='transaction_exports')
+    file_format = models.CharField(max_length=10, choices=FORMAT_CHOICES, default='pdf')
+    filters = models.JSONField(default=dict, blank=True, help_text="start_date, end_date and status the export was requested with")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    file = models.FileField(upload_to='exports/', blank=True, null=True)
+    row_count = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'transaction_exports'
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.file_format} export {self.id} ({self.status})"
+
+
 #--------Enrollment models---------#
 class CourseEnrollment(models.Model):
     """Tracks student enrollment in a specific course batch."""
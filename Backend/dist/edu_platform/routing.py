@@ -1,5 +1,6 @@
 """Configures WebSocket routing for the classes app."""
 from django.urls import re_path
+from edu_platform.consumers.classroom import ClassRoomConsumer
 # from edu_platform.consumers import webrtc_consumers
 
 websocket_urlpatterns = [
@@ -7,4 +8,7 @@ websocket_urlpatterns = [
 
     # Connects WebRTC signaling consumer for a specific room ID.
     # re_path(r'ws/signal/(?P<room_id>\w+)/$', webrtc_consumers.WebRTCSignalingConsumer.as_asgi()),
+
+    # Live classroom (chat, reactions, signaling) for a ClassSession.class_id
+    re_path(r'ws/classroom/(?P<class_id>[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})/$', ClassRoomConsumer.as_asgi()),
 ]
\ No newline at end of file
@@ -4,6 +4,7 @@ from django.db.models import Q
 from edu_platform.models import User, TeacherProfile, OTP, StudentProfile, Course, ClassSchedule,CourseEnrollment, ClassSession
 from edu_platform.serializers.course_serializers import CourseSerializer
 from edu_platform.utility.email_services import send_teacher_credentials
+from edu_platform.utility.image_derivatives import srcset_urls
 import re
 from django.utils import timezone
 from datetime import datetime, timedelta
@@ -53,14 +54,19 @@ def check_user_existence_utility(email=None, phone_number=None):
 
 class TeacherProfileSerializer(serializers.ModelSerializer):
     """Serializes teacher profile data."""
+    profile_picture_srcset = serializers.SerializerMethodField()
     
     class Meta:
         model = TeacherProfile
         fields = ['qualification', 'experience_years', 'specialization', 'bio', 
-                  'profile_picture', 'linkedin_url', 'resume', 'is_verified', 
+                  'profile_picture', 'profile_picture_srcset', 'linkedin_url', 'resume', 'is_verified', 
                   'teaching_languages']
         read_only_fields = ['is_verified']
 
+    def get_profile_picture_srcset(self, obj):
+        """Resized profile picture URLs by format and width, once they have been generated."""
+        return srcset_urls(obj, 'profile_picture', self.context.get('request'))
+
     def validate_experience_years(self, value):
         """Ensures experience years are within valid range."""
         if value < 0 or value > 50:
@@ -989,9 +995,15 @@ class ForgotPasswordSerializer(serializers.Serializer):
 
 class StudentProfileSerializer(serializers.ModelSerializer):
     """Serializes student profile data."""
+    profile_picture_srcset = serializers.SerializerMethodField()
+
     class Meta:
         model = StudentProfile
-        fields = ['profile_picture']
+        fields = ['profile_picture', 'profile_picture_srcset']
+
+    def get_profile_picture_srcset(self, obj):
+        """Resized profile picture URLs by format and width, once they have been generated."""
+        return srcset_urls(obj, 'profile_picture', self.context.get('request'))
 
 class UserStatusCountSerializer(serializers.Serializer):
     active_users = serializers.IntegerField()
@@ -1,7 +1,7 @@
 from rest_framework import serializers
 from django.utils import timezone
 from datetime import datetime, timedelta
-from edu_platform.models import User, ClassSchedule, Course, ClassSession, CourseEnrollment
+from edu_platform.models import User, ClassSchedule, Course, ClassSession, CourseEnrollment, ClassChatMessage
 import logging
 import uuid
 
@@ -607,3 +607,12 @@ class ClassScheduleSerializer(serializers.ModelSerializer):
                 'message': f'An unexpected error occurred while creating the schedule: {str(e)}',
                 'message_type': 'error'
             })
+
+
+class ClassChatMessageSerializer(serializers.ModelSerializer):
+    """Serializes archived classroom chat events."""
+    seq = serializers.CharField(source='sequence', read_only=True)
+
+    class Meta:
+        model = ClassChatMessage
+        fields = ['seq', 'sender', 'message', 'is_emoji', 'is_system', 'sent_at']
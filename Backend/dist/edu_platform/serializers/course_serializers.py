@@ -5,22 +5,48 @@ from edu_platform.models import Course, CourseSubscription, ClassSchedule, Class
 from django.utils.dateformat import format as date_format
 from django.utils import timezone
 from datetime import date
+from edu_platform.utility.image_derivatives import srcset_urls
+from edu_platform.utility.course_pricing import get_latest_pricings, price_details
 import logging
 logger = logging.getLogger(__name__)
 
+price_field = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+
 class CourseSerializer(serializers.ModelSerializer):
     """Serializes course data for retrieval and updates."""
     batches = serializers.SerializerMethodField()
     schedule = serializers.SerializerMethodField()
+    thumbnail_srcset = serializers.SerializerMethodField()
+    effective_price = serializers.SerializerMethodField()
+    discount_percent = serializers.SerializerMethodField()
 
     class Meta:
         model = Course
         fields = [
-            'id', 'name', 'slug', 'description', 'category', 'level', 'thumbnail',
-            'duration_hours', 'base_price', 'advantages', 'batches', 'schedule',
+            'id', 'name', 'slug', 'description', 'category', 'level', 'thumbnail', 'thumbnail_srcset',
+            'duration_hours', 'base_price', 'effective_price', 'discount_percent', 'advantages', 'batches', 'schedule',
             'is_active', 'created_at', 'updated_at'
         ]
 
+    def get_thumbnail_srcset(self, obj):
+        """Resized thumbnail URLs by format and width, e.g. {"webp": {"64": url, "256": url, ...}}."""
+        return srcset_urls(obj, 'thumbnail', self.context.get('request'))
+
+    def pricings(self):
+        # Resolved once per render; a list reuses this serializer for every course
+        if not hasattr(self, '_pricings'):
+            self._pricings = get_latest_pricings()
+        return self._pricings
+
+    def get_effective_price(self, obj):
+        """Price charged at checkout: the latest course pricing, else base_price."""
+        return price_field.to_representation(price_details(obj, self.pricings())['price'])
+
+    def get_discount_percent(self, obj):
+        discount = price_details(obj, self.pricings())['discount_percent']
+        return price_field.to_representation(discount) if discount is not None else None
+
     def get_batches(self, obj):
         request = self.context.get('request')
         today = date.today()
@@ -162,7 +188,9 @@ class PaymentRecordSerializer(serializers.ModelSerializer):
         fields = ['name','email','phone_number','course','batch','registration_dateTime','payment_method','amount_paid','start_date_time', 'end_date_time', 'status']
 
     def get_batch(self, obj):
-        """Fetch batch from related CourseEnrollment."""
+        """Batch of the subscription's enrollment; AllPaymentRecordsAPIView annotates it."""
+        if hasattr(obj, 'enrollment_batch'):
+            return obj.enrollment_batch or None
         enrollment = obj.enrollments.first()  # because of related_name is enrollments
         if enrollment and enrollment.batch:
             return enrollment.batch
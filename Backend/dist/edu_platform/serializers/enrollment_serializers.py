@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from edu_platform.models import CourseEnrollment, CourseSubscription, ClassSchedule
 from .payment_serializers import validate_batch_for_course
+from edu_platform.utility.seat_inventory import move_seat, reserve_seat
+from django.db import transaction
 
 
 class CourseEnrollmentSerializer(serializers.ModelSerializer):
@@ -46,8 +48,17 @@ class CourseEnrollmentSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         """Updates the batch for an existing enrollment."""
         validated_data.pop('subscription_id', None)
+        old_batch = instance.batch
         instance.batch = validated_data.get('batch', instance.batch)
-        instance.save()
+        if instance.batch == old_batch:
+            return instance
+        # Raises BatchFullError when the new batch has no free seat; seats change only if the save commits
+        with transaction.atomic():
+            if instance.subscription.payment_status == 'completed':
+                move_seat(instance.course_id, old_batch, instance.batch, instance.student_id)
+            else:
+                reserve_seat(instance.course_id, instance.batch, instance.student_id)
+            instance.save()
         return instance
 
     def create(self, validated_data):
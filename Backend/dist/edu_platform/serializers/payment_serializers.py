@@ -3,12 +3,12 @@ from edu_platform.models import Course, CourseSubscription, ClassSchedule
 
 def validate_batch_for_course(value, course):
     """Shared utility to validate batch availability for a course."""
-    schedules = ClassSchedule.objects.filter(course=course)
-    if not schedules.exists():
+    # Only the distinct batch names are needed, not every schedule row; seats are checked by seat_inventory
+    available_batches = set(ClassSchedule.objects.filter(course=course).values_list('batch', flat=True).distinct())
+    if not available_batches:
         raise serializers.ValidationError({
             'error': f"No schedules available for course '{course.name}'."
         })
-    available_batches = set(schedule.batch for schedule in schedules)
     if value not in available_batches:
         raise serializers.ValidationError({
             'error': f"Batch '{value}' is not available for course '{course.name}'."
@@ -66,21 +66,7 @@ class VerifyPaymentSerializer(serializers.Serializer):
     razorpay_payment_id = serializers.CharField()
     razorpay_signature = serializers.CharField()
     subscription_id = serializers.IntegerField()
-
-    def validate(self, attrs):
-        """Ensures subscription exists and is pending."""
-        try:
-            subscription = CourseSubscription.objects.get(
-                id=attrs['subscription_id'],
-                order_id=attrs['razorpay_order_id'],
-                student=self.context['request'].user,
-                payment_status='pending'
-            )
-        except CourseSubscription.DoesNotExist:
-            raise serializers.ValidationError({"error": "Subscription not found or already processed."})
-        
-        attrs['subscription'] = subscription
-        return attrs
+    # The subscription is looked up and locked by VerifyPaymentView inside its transaction
 
 
 class TransactionReportSerializer(serializers.ModelSerializer):
@@ -99,3 +85,22 @@ class TransactionReportSerializer(serializers.ModelSerializer):
             return 'Success'
         return 'Failure'    
     
+
+
+class TransactionExportSerializer(serializers.Serializer):
+    """Validates a background transaction export request."""
+    file_format = serializers.ChoiceField(choices=['pdf', 'xlsx'], default='pdf')
+    start_date = serializers.CharField(required=False, help_text="Date or datetime; purchases on or after it")
+    end_date = serializers.CharField(required=False, help_text="Date or datetime; a date includes the whole day")
+    status = serializers.CharField(required=False)
+
+    def validate(self, attrs):
+        """Normalizes the filters the export job runs with; PDFs are limited to PDF_MAX_ROWS."""
+        from edu_platform.utility.transaction_exports import clean_filters, check_pdf_size
+        try:
+            attrs['filters'] = clean_filters(attrs)
+            if attrs['file_format'] == 'pdf':
+                check_pdf_size(attrs['filters'])
+        except ValueError as e:
+            raise serializers.ValidationError({'error': str(e)})
+        return attrs
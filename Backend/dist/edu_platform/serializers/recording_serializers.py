@@ -0,0 +1,60 @@
+from rest_framework import serializers
+from edu_platform.models import RecordingUpload
+from edu_platform.utility.recording_uploads import get_upload_setting
+import math
+import os
+
+
+class RecordingUploadInitSerializer(serializers.Serializer):
+    """Validates the start of a resumable recording upload."""
+    filename = serializers.CharField(max_length=255)
+    total_size = serializers.IntegerField(min_value=1)
+
+    def validate_filename(self, value):
+        name = os.path.basename(value.replace('\\', '/')).strip()
+        if not name:
+            raise serializers.ValidationError({"error": "Filename is invalid."})
+        return name
+
+    def validate_total_size(self, value):
+        max_size = get_upload_setting('MAX_FILE_SIZE')
+        if max_size and value > max_size:
+            raise serializers.ValidationError({"error": f"Recording exceeds the maximum size of {max_size} bytes."})
+        return value
+
+
+class RecordingUploadSerializer(serializers.ModelSerializer):
+    """State of a resumable upload; clients resume by sending the next chunk at received_bytes."""
+    upload_id = serializers.UUIDField(source='id', read_only=True)
+    session_id = serializers.IntegerField(read_only=True)
+    chunk_size = serializers.SerializerMethodField()
+    max_chunk_size = serializers.SerializerMethodField()
+
+    class Meta:
+        model = RecordingUpload
+        fields = [
+            'upload_id', 'session_id', 'filename', 'total_size', 'received_bytes',
+            'status', 'chunk_size', 'max_chunk_size', 'created_at', 'completed_at'
+        ]
+        read_only_fields = fields
+
+    def get_chunk_size(self, obj):
+        return get_upload_setting('CHUNK_SIZE')
+
+    def get_max_chunk_size(self, obj):
+        return get_upload_setting('MAX_CHUNK_SIZE')
+
+
+class PlaybackProgressSerializer(serializers.Serializer):
+    """Validates a playback progress heartbeat."""
+    position = serializers.FloatField(min_value=0)
+    duration = serializers.FloatField(min_value=0, required=False, allow_null=True)
+
+    def validate(self, data):
+        duration = data.get('duration')
+        # FloatField parses "NaN" and "Infinity", and NaN passes min_value
+        if not math.isfinite(data['position']) or (duration is not None and not math.isfinite(duration)):
+            raise serializers.ValidationError({"error": "Position and duration must be finite numbers."})
+        if duration and data['position'] > duration:
+            data['position'] = duration
+        return data
@@ -1,3 +1,155 @@
-from django.test import TestCase
+from django.core.files.base import ContentFile, File
+from django.core.files.storage import FileSystemStorage
+from django.test import SimpleTestCase, override_settings
+from moto import mock_s3
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
+import boto3
+import io
+import os
+import requests
+import tempfile
 
-# Create your tests here.
+from edu_platform.utility.media_storage import (
+    MediaS3Storage, get_transfer_config, has_local_path, presigned_url
+)
+from edu_platform.utility.transaction_exports import ExportTooLarge, write_pdf
+
+BUCKET = 'edustream-test-media'
+MB = 1024 * 1024
+
+
+class TemporaryFile(File):
+    """A file on disk, like the finished chunked uploads MediaS3Storage uploads by path."""
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+@override_settings(MEDIA_S3_TRANSFER={
+    # S3 rejects multipart parts under 5 MB (except the last), and moto enforces it too
+    'MULTIPART_THRESHOLD': 5 * MB,
+    'MULTIPART_CHUNKSIZE': 5 * MB,
+    'MAX_CONCURRENCY': 4,
+})
+class MediaS3StorageTests(SimpleTestCase):
+    """MediaS3Storage against moto's in-memory S3."""
+
+    def setUp(self):
+        credentials = mock.patch.dict(os.environ, {
+            'AWS_ACCESS_KEY_ID': 'testing',
+            'AWS_SECRET_ACCESS_KEY': 'testing',
+            'AWS_DEFAULT_REGION': 'us-east-1',
+        })
+        credentials.start()
+        self.addCleanup(credentials.stop)
+        s3 = mock_s3()
+        s3.start()
+        self.addCleanup(s3.stop)
+
+        boto3.client('s3', region_name='us-east-1').create_bucket(Bucket=BUCKET)
+        self.storage = MediaS3Storage(
+            bucket_name=BUCKET,
+            region_name='us-east-1',
+            endpoint_url=None,
+            location='',
+            access_key='testing',
+            secret_key='testing',
+        )
+
+    def stored_object(self, name):
+        return self.storage.bucket.Object(name)
+
+    def test_transfer_config_follows_settings(self):
+        config = get_transfer_config()
+        self.assertEqual(config.multipart_threshold, 5 * MB)
+        self.assertEqual(config.multipart_chunksize, 5 * MB)
+        self.assertEqual(config.max_concurrency, 4)
+        self.assertEqual(self.storage.transfer_config.multipart_chunksize, 5 * MB)
+
+    def test_file_on_disk_is_uploaded_in_parts(self):
+        payload = os.urandom(12 * MB)
+        with tempfile.NamedTemporaryFile() as source:
+            source.write(payload)
+            source.flush()
+            source.seek(0)
+            name = self.storage.save('recordings/class.mp4', TemporaryFile(source))
+
+        stored = self.stored_object(name)
+        self.assertEqual(stored.content_length, len(payload))
+        # A multipart upload's ETag ends in "-<part count>": 12 MB in 5 MB parts is 3 parts
+        self.assertTrue(stored.e_tag.strip('"').endswith('-3'), stored.e_tag)
+        self.assertEqual(stored.get()['Body'].read(), payload)
+
+    def test_file_below_threshold_is_uploaded_in_one_request(self):
+        name = self.storage.save('thumbnails/course.png', ContentFile(b'thumbnail bytes'))
+
+        stored = self.stored_object(name)
+        self.assertEqual(stored.content_length, len(b'thumbnail bytes'))
+        self.assertNotIn('-', stored.e_tag.strip('"'))
+
+    def test_existing_name_is_not_overwritten(self):
+        first = self.storage.save('thumbnails/course.png', ContentFile(b'first'))
+        second = self.storage.save('thumbnails/course.png', ContentFile(b'second'))
+
+        self.assertNotEqual(first, second)
+        self.assertEqual(self.stored_object(first).get()['Body'].read(), b'first')
+
+    def test_presigned_url_is_signed_and_expires(self):
+        name = self.storage.save('recordings/class.mp4', ContentFile(b'recording bytes'))
+
+        url = presigned_url(self.storage, name, expire=120)
+
+        self.assertIn('X-Amz-Signature=', url)
+        self.assertIn('X-Amz-Expires=120', url)
+        # moto also intercepts requests, so the signed URL can be fetched
+        response = requests.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'recording bytes')
+
+    def test_s3_has_no_local_path(self):
+        self.assertFalse(has_local_path(self.storage))
+
+
+class LocalStorageHelperTests(SimpleTestCase):
+
+    def test_filesystem_storage_has_local_path_and_plain_url(self):
+        with tempfile.TemporaryDirectory() as root:
+            storage = FileSystemStorage(location=root, base_url='/media/')
+            self.assertTrue(has_local_path(storage))
+            self.assertEqual(presigned_url(storage, 'recordings/class.mp4', expire=60), '/media/recordings/class.mp4')
+
+
+def export_row(index):
+    """A row in EXPORT_FIELDS order, as export_rows yields it."""
+    purchased = datetime(2024, 1, 1, 10, 30, tzinfo=dt_timezone.utc)
+    return (
+        index, purchased, purchased, f'student{index}@example.com', f'student{index}',
+        'A course name long enough to be truncated in its column', Decimal('499.00'), 'INR',
+        'upi', 'completed', f'order_{index:014d}', f'pay_{index:014d}',
+    )
+
+
+class TransactionPdfExportTests(SimpleTestCase):
+
+    def write(self, row_count):
+        rows = (export_row(index) for index in range(1, row_count + 1))
+        fileobj = io.BytesIO()
+        with mock.patch('edu_platform.utility.transaction_exports.export_rows', return_value=rows):
+            count = write_pdf({}, fileobj)
+        return count, fileobj.getvalue()
+
+    def test_renders_rows_across_pages(self):
+        # More rows than the widest column's character budget, and more than one page
+        count, pdf = self.write(150)
+
+        self.assertEqual(count, 150)
+        self.assertTrue(pdf.startswith(b'%PDF'))
+        self.assertGreater(pdf.count(b'/Type /Page\n'), 1)
+
+    @override_settings(TRANSACTION_EXPORT_SETTINGS={'PDF_MAX_ROWS': 40})
+    def test_rows_past_the_limit_are_refused(self):
+        self.assertEqual(self.write(40)[0], 40)
+        with self.assertRaises(ExportTooLarge):
+            self.write(41)
@@ -1,14 +1,18 @@
 from django.urls import path
 from asgiref.sync import sync_to_async
-from edu_platform.views.class_views import ClassScheduleView, ClassSessionListView, ClassSessionUpdateView
+from edu_platform.views.class_views import ClassScheduleView, ClassSessionListView, ClassSessionUpdateView, ClassChatHistoryView, LiveParticipantCountView, SessionAttendanceReportView, BatchAttendanceReportView
 from django.views.generic import TemplateView
 
 urlpatterns = [
     path('schedules/', ClassScheduleView.as_view(), name='class-schedule-list'),
     path('schedules/<int:schedule_id>/', ClassScheduleView.as_view(), name='class-schedule-detail'),
+    path('schedules/<int:schedule_id>/attendance/', BatchAttendanceReportView.as_view(), name='batch-attendance-report'),
 
     path('classroom/test/', TemplateView.as_view(template_name='classroom.html'), name='classroom_test'),
 
     path('sessions/', ClassSessionListView.as_view(), name='session-list'),
     path('sessions/<int:class_id>/', ClassSessionUpdateView.as_view(), name='session-update'),
+    path('sessions/<int:session_id>/chat/', ClassChatHistoryView.as_view(), name='session-chat-history'),
+    path('sessions/<int:session_id>/attendance/', SessionAttendanceReportView.as_view(), name='session-attendance-report'),
+    path('live/participants/', LiveParticipantCountView.as_view(), name='live-participant-counts'),
 ]
\ No newline at end of file
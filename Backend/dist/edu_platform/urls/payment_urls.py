@@ -1,5 +1,8 @@
 from django.urls import path
-from edu_platform.views.payment_views import CreateOrderView, VerifyPaymentView,TransactionReportView
+from edu_platform.views.payment_views import (
+    CreateOrderView, VerifyPaymentView,TransactionReportView, RazorpayWebhookView,
+    TransactionExportView, TransactionExportJobView, TransactionExportStatusView, RevenueAnalyticsView
+)
 
 
 urlpatterns = [
@@ -8,6 +11,17 @@ urlpatterns = [
     
     # Verifies payment for a subscription and updates subscription status.
     path('verify_payment/', VerifyPaymentView.as_view(), name='verify_payment'),
-    path('transactions/report/', TransactionReportView.as_view(), name='transaction-report')
+    path('transactions/report/', TransactionReportView.as_view(), name='transaction-report'),
+
+    # Full exports: CSV/XLSX streamed directly, PDF/XLSX rendered in the background.
+    path('transactions/export/<str:file_format>/', TransactionExportView.as_view(), name='transaction-export'),
+    path('transactions/exports/', TransactionExportJobView.as_view(), name='transaction-export-jobs'),
+    path('transactions/exports/<uuid:export_id>/', TransactionExportStatusView.as_view(), name='transaction-export-status'),
+
+    # Revenue, orders and conversion from the daily rollup table.
+    path('analytics/revenue/', RevenueAnalyticsView.as_view(), name='revenue-analytics'),
+
+    # Razorpay webhooks: verified, stored in an inbox and applied in the background.
+    path('webhook/', RazorpayWebhookView.as_view(), name='razorpay-webhook'),
 ]
 
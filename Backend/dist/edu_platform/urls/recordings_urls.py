@@ -0,0 +1,20 @@
+from django.urls import path
+from edu_platform.views.recording_views import (
+    RecordingUploadInitView, RecordingUploadChunkView, RecordingUploadFinalizeView,
+    RecordingPlaybackView, RecordingStreamView, RecordingProgressView
+)
+from edu_platform.views.class_views import get_recordings
+
+urlpatterns = [
+    path('', get_recordings, name='recording-list'),
+
+    # Resumable upload: init -> PUT chunks at Upload-Offset -> finalize
+    path('sessions/<int:session_id>/uploads/', RecordingUploadInitView.as_view(), name='recording-upload-init'),
+    path('uploads/<uuid:upload_id>/', RecordingUploadChunkView.as_view(), name='recording-upload-chunk'),
+    path('uploads/<uuid:upload_id>/finalize/', RecordingUploadFinalizeView.as_view(), name='recording-upload-finalize'),
+
+    # Playback: entitlement check -> signed stream URL with Range support
+    path('sessions/<int:session_id>/playback/', RecordingPlaybackView.as_view(), name='recording-playback'),
+    path('stream/<str:token>/', RecordingStreamView.as_view(), name='recording-stream'),
+    path('sessions/<int:session_id>/progress/', RecordingProgressView.as_view(), name='recording-progress'),
+]
@@ -0,0 +1,185 @@
+"""
+Buffered classroom attendance.
+
+Joins and leaves are recorded in Redis by the classroom consumer instead of
+writing a row per event:
+
+* ``attendance:open`` maps ``{class_id}:{user_id}`` to the time the user joined.
+* On leave (clean disconnect or heartbeat expiry) the interval is closed and added
+  to ``attendance:{class_id}:{user_id}`` (first/last/seconds/joins), and the pair
+  is marked in ``attendance:dirty``.
+
+A periodic job drains the dirty pairs and upserts them into ``class_attendance``
+with one multi-row ``INSERT ... ON CONFLICT`` per batch, adding to the totals
+already stored.
+"""
+
+from django.db import connection, transaction
+from edu_platform.utility.redis_services import get_redis
+import logging
+import time
+from datetime import datetime, timezone as dt_timezone
+
+logger = logging.getLogger(__name__)
+
+OPEN_ATTENDANCE_KEY = 'attendance:open'
+DIRTY_ATTENDANCE_KEY = 'attendance:dirty'
+
+UPSERT_SQL = """
+    INSERT INTO class_attendance (session_id, user_id, first_joined_at, last_left_at, total_seconds, join_count)
+    VALUES {values}
+    ON CONFLICT (session_id, user_id) DO UPDATE SET
+        first_joined_at = LEAST(class_attendance.first_joined_at, EXCLUDED.first_joined_at),
+        last_left_at = GREATEST(class_attendance.last_left_at, EXCLUDED.last_left_at),
+        total_seconds = class_attendance.total_seconds + EXCLUDED.total_seconds,
+        join_count = class_attendance.join_count + EXCLUDED.join_count
+"""
+
+
+def attendance_member(class_id, user_id):
+    return f'{class_id}:{user_id}'
+
+
+def pending_key(member):
+    """Returns the hash holding closed-but-unflushed intervals for a class/user pair."""
+    return f'attendance:{member}'
+
+
+async def record_join(client, class_id, user_id):
+    """Opens an attendance interval; a second tab of the same user keeps the earlier start."""
+    await client.hsetnx(OPEN_ATTENDANCE_KEY, attendance_member(class_id, user_id), time.time())
+
+
+def _add_interval(pipe, member, joined_at, left_at):
+    key = pending_key(member)
+    pipe.hsetnx(key, 'first', joined_at)
+    pipe.hset(key, 'last', left_at)
+    pipe.hincrbyfloat(key, 'seconds', max(left_at - joined_at, 0))
+    pipe.hincrby(key, 'joins', 1)
+    pipe.sadd(DIRTY_ATTENDANCE_KEY, member)
+
+
+async def record_leave(client, class_id, user_id, left_at=None):
+    """Closes the user's open interval, if this call is the one that removes it."""
+    member = attendance_member(class_id, user_id)
+    pipe = client.pipeline(transaction=True)
+    pipe.hget(OPEN_ATTENDANCE_KEY, member)
+    pipe.hdel(OPEN_ATTENDANCE_KEY, member)
+    joined_at, removed = await pipe.execute()
+    if not removed:
+        return
+    pipe = client.pipeline(transaction=False)
+    _add_interval(pipe, member, float(joined_at), left_at or time.time())
+    await pipe.execute()
+
+
+def close_open_attendance(client, closures):
+    """Sync counterpart of ``record_leave`` for background jobs.
+
+    ``closures`` is an iterable of (class_id, user_id, left_at); intervals already
+    closed by the consumer are skipped.
+    """
+    closures = [(attendance_member(class_id, user_id), left_at) for class_id, user_id, left_at in closures]
+    if not closures:
+        return 0
+    pipe = client.pipeline(transaction=True)
+    for member, _ in closures:
+        pipe.hget(OPEN_ATTENDANCE_KEY, member)
+        pipe.hdel(OPEN_ATTENDANCE_KEY, member)
+    results = pipe.execute()
+
+    pipe = client.pipeline(transaction=False)
+    closed = 0
+    for index, (member, left_at) in enumerate(closures):
+        joined_at, removed = results[2 * index], results[2 * index + 1]
+        if removed:
+            _add_interval(pipe, member, float(joined_at), left_at)
+            closed += 1
+    if closed:
+        pipe.execute()
+    return closed
+
+
+def _drain(client, members):
+    """Atomically takes the pending totals for each member."""
+    pipe = client.pipeline(transaction=True)
+    for member in members:
+        pipe.hgetall(pending_key(member))
+        pipe.delete(pending_key(member))
+    results = pipe.execute()
+    return {member: results[2 * index] for index, member in enumerate(members) if results[2 * index]}
+
+
+def _rebuffer(client, drained):
+    """Puts drained totals back after a failed flush so they go out with the next one."""
+    pipe = client.pipeline(transaction=False)
+    for member, values in drained.items():
+        key = pending_key(member)
+        pipe.hsetnx(key, 'first', values['first'])
+        pipe.hset(key, 'last', values['last'])
+        pipe.hincrbyfloat(key, 'seconds', values['seconds'])
+        pipe.hincrby(key, 'joins', values['joins'])
+        pipe.sadd(DIRTY_ATTENDANCE_KEY, member)
+    pipe.execute()
+
+
+def _to_datetime(timestamp):
+    return datetime.fromtimestamp(float(timestamp), tz=dt_timezone.utc)
+
+
+def upsert_attendance(rows):
+    """Adds (session_id, user_id, first, last, seconds, joins) rows to class_attendance."""
+    if not rows:
+        return
+    placeholders = ', '.join(['(%s, %s, %s, %s, %s, %s)'] * len(rows))
+    params = [value for row in rows for value in row]
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(UPSERT_SQL.format(values=placeholders), params)
+
+
+def flush_attendance(batch_size=None):
+    """Moves buffered attendance from Redis into class_attendance; returns rows written."""
+    from edu_platform.models import ClassSession, User
+    from edu_platform.utility.classroom_events import get_classroom_setting
+
+    batch_size = batch_size or get_classroom_setting('ARCHIVE_BATCH_SIZE', 1000)
+    client = get_redis()
+    written = 0
+    while True:
+        members = client.spop(DIRTY_ATTENDANCE_KEY, batch_size)
+        if not members:
+            return written
+        drained = _drain(client, members)
+        if not drained:
+            continue
+
+        pairs = [member.rsplit(':', 1) for member in drained]
+        sessions = dict(
+            ClassSession.objects.filter(class_id__in={class_id for class_id, _ in pairs})
+            .values_list('class_id', 'id')
+        )
+        sessions = {str(class_id): session_id for class_id, session_id in sessions.items()}
+        user_ids = set(User.objects.filter(id__in={int(user_id) for _, user_id in pairs}).values_list('id', flat=True))
+
+        rows = []
+        for (class_id, user_id), values in zip(pairs, drained.values()):
+            session_id = sessions.get(class_id)
+            # Session or user deleted since the class; nothing to attach the time to
+            if session_id is None or int(user_id) not in user_ids:
+                continue
+            rows.append((
+                session_id,
+                int(user_id),
+                _to_datetime(values['first']),
+                _to_datetime(values['last']),
+                int(round(float(values['seconds']))),
+                int(values['joins']),
+            ))
+
+        try:
+            upsert_attendance(rows)
+        except Exception:
+            _rebuffer(client, drained)
+            raise
+        written += len(rows)
+        logger.info(f"Flushed {len(rows)} attendance rows")
@@ -0,0 +1,188 @@
+"""
+Per-class event log backed by capped Redis Streams.
+
+Chat, emoji and system events are appended to ``class:{class_id}:events`` and the
+stream entry ID doubles as the event's sequence number. Reconnecting clients send
+the last sequence they saw and receive everything after it. Streams of finished
+classes are archived to ``ClassChatMessage`` in bulk and then deleted.
+"""
+
+from django.conf import settings
+from django.utils import timezone
+from datetime import timedelta, datetime, timezone as dt_timezone
+from edu_platform.utility.redis_services import get_redis
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Set of class_ids that currently have an unarchived stream
+ACTIVE_STREAMS_KEY = 'class:streams:active'
+
+SEQUENCE_RE = re.compile(r'^\d+-\d+$')
+
+# Deletes the stream and its active marker only if nothing was appended since archiving
+DROP_EMPTY_STREAM_SCRIPT = """
+if redis.call('XLEN', KEYS[1]) > 0 then return 0 end
+redis.call('DEL', KEYS[1])
+redis.call('SREM', KEYS[2], ARGV[1])
+return 1
+"""
+
+
+def get_classroom_setting(name, default):
+    """Reads a value from settings.CLASSROOM_SETTINGS."""
+    return getattr(settings, 'CLASSROOM_SETTINGS', {}).get(name, default)
+
+
+def stream_key(class_id):
+    """Returns the Redis Stream key for a class."""
+    return f'class:{class_id}:events'
+
+
+def is_valid_sequence(value):
+    """Checks that a client-supplied sequence looks like a stream entry ID."""
+    return isinstance(value, str) and bool(SEQUENCE_RE.match(value))
+
+
+def encode_event(event):
+    """Flattens a chat event into stream fields (Redis only stores strings)."""
+    return {
+        'message': event['message'],
+        'sender': event['sender'],
+        'is_emoji': '1' if event.get('is_emoji') else '0',
+    }
+
+
+def decode_event(sequence, fields):
+    """Builds a chat event from a stream entry."""
+    return {
+        'type': 'chat_message',
+        'message': fields.get('message', ''),
+        'sender': fields.get('sender', ''),
+        'is_emoji': fields.get('is_emoji') == '1',
+        'seq': sequence,
+    }
+
+
+def sequence_to_datetime(sequence):
+    """Converts the millisecond part of a stream entry ID to an aware datetime."""
+    millis = int(sequence.split('-', 1)[0])
+    return datetime.fromtimestamp(millis / 1000, tz=dt_timezone.utc)
+
+
+async def append_event(client, class_id, event):
+    """Appends a chat event to the class stream and returns its sequence number."""
+    pipe = client.pipeline(transaction=False)
+    pipe.xadd(
+        stream_key(class_id),
+        encode_event(event),
+        maxlen=get_classroom_setting('STREAM_MAXLEN', 5000),
+        approximate=True
+    )
+    pipe.sadd(ACTIVE_STREAMS_KEY, str(class_id))
+    sequence, _ = await pipe.execute()
+    return sequence
+
+
+def record_event(client, class_id, event):
+    """Synchronous append_event for background jobs running outside the event loop."""
+    pipe = client.pipeline(transaction=False)
+    pipe.xadd(
+        stream_key(class_id),
+        encode_event(event),
+        maxlen=get_classroom_setting('STREAM_MAXLEN', 5000),
+        approximate=True
+    )
+    pipe.sadd(ACTIVE_STREAMS_KEY, str(class_id))
+    sequence, _ = pipe.execute()
+    return sequence
+
+
+async def iter_events_after(client, class_id, last_seq=None):
+    """Yields decoded events published after `last_seq`, paging through the stream."""
+    batch_size = get_classroom_setting('REPLAY_BATCH_SIZE', 200)
+    key = stream_key(class_id)
+    start = f'({last_seq}' if last_seq else '-'
+    while True:
+        entries = await client.xrange(key, min=start, max='+', count=batch_size)
+        for sequence, fields in entries:
+            yield decode_event(sequence, fields)
+        if len(entries) < batch_size:
+            return
+        start = f'({entries[-1][0]}'
+
+
+def archive_stream(client, session_id, class_id):
+    """Copies one class stream into ClassChatMessage in bulk, removing the copied entries."""
+    from edu_platform.models import ClassChatMessage
+
+    batch_size = get_classroom_setting('ARCHIVE_BATCH_SIZE', 1000)
+    key = stream_key(class_id)
+    archived = 0
+    while True:
+        # Archived entries are removed, so each batch starts at the head of the stream
+        entries = client.xrange(key, min='-', max='+', count=batch_size)
+        if not entries:
+            break
+        ClassChatMessage.objects.bulk_create(
+            [
+                ClassChatMessage(
+                    session_id=session_id,
+                    sequence=sequence,
+                    sender=fields.get('sender', ''),
+                    message=fields.get('message', ''),
+                    is_emoji=fields.get('is_emoji') == '1',
+                    is_system=fields.get('sender') == 'system',
+                    sent_at=sequence_to_datetime(sequence),
+                )
+                for sequence, fields in entries
+            ],
+            batch_size=batch_size,
+            ignore_conflicts=True
+        )
+        # Only the copied IDs: events appended meanwhile stay for the next batch or run
+        client.xdel(key, *[sequence for sequence, _ in entries])
+        archived += len(entries)
+        if len(entries) < batch_size:
+            break
+
+    client.eval(DROP_EMPTY_STREAM_SCRIPT, 2, key, ACTIVE_STREAMS_KEY, class_id)
+    return archived
+
+
+def archive_closed_streams():
+    """Archives the streams of every class that ended more than the grace period ago."""
+    from edu_platform.models import ClassSession
+
+    client = get_redis()
+    class_ids = client.smembers(ACTIVE_STREAMS_KEY)
+    if not class_ids:
+        return 0
+
+    grace = timedelta(minutes=get_classroom_setting('ARCHIVE_GRACE_MINUTES', 15))
+    cutoff = timezone.now() - grace
+    sessions = {
+        str(class_id): (session_id, end_time, is_active)
+        for session_id, class_id, end_time, is_active in ClassSession.objects.filter(
+            class_id__in=class_ids
+        ).values_list('id', 'class_id', 'end_time', 'is_active')
+    }
+
+    total = 0
+    for class_id in class_ids:
+        if class_id not in sessions:
+            # Session was deleted; nothing to archive against
+            client.delete(stream_key(class_id))
+            client.srem(ACTIVE_STREAMS_KEY, class_id)
+            continue
+        session_id, end_time, is_active = sessions[class_id]
+        if is_active and end_time >= cutoff:
+            continue
+        try:
+            count = archive_stream(client, session_id, class_id)
+            total += count
+            logger.info(f"Archived {count} classroom events for class {class_id}")
+        except Exception as e:
+            logger.error(f"Failed to archive classroom stream for class {class_id}: {e}")
+    return total
@@ -0,0 +1,156 @@
+"""
+Heartbeat-based classroom presence.
+
+Each class keeps a sorted set ``class:{class_id}:presence`` of user IDs scored by
+the time of their last heartbeat. Members whose heartbeat is older than
+HEARTBEAT_TIMEOUT_SECONDS are considered gone, even if their socket never ran
+``disconnect`` (worker crash, dropped connection). A periodic sweep removes them
+and tells the rest of the class.
+
+A user may be connected from several tabs or devices. Each user's sockets are
+tracked in ``class:{class_id}:presence:{user_id}`` (channel names scored by
+their own heartbeat); a user only leaves the class when the last of them does.
+"""
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from edu_platform.utility.redis_services import get_redis
+from edu_platform.utility.classroom_events import get_classroom_setting, record_event
+from edu_platform.utility.classroom_attendance import close_open_attendance
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Set of class_ids that currently have presence entries
+ACTIVE_PRESENCE_KEY = 'class:presence:active'
+
+
+def presence_key(class_id):
+    """Returns the presence sorted-set key for a class."""
+    return f'class:{class_id}:presence'
+
+
+def heartbeat_timeout():
+    """Seconds without a heartbeat after which a participant is considered gone."""
+    return get_classroom_setting('HEARTBEAT_TIMEOUT_SECONDS', 45)
+
+
+def connections_key(class_id, user_id):
+    """Returns the key of the sorted set of one user's sockets in a class."""
+    return f'class:{class_id}:presence:{user_id}'
+
+
+# Drops one socket (and any that stopped heartbeating); removes the user once none is left
+MARK_ABSENT_SCRIPT = """
+redis.call('ZREM', KEYS[2], ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', ARGV[3])
+if redis.call('ZCARD', KEYS[2]) > 0 then return 0 end
+redis.call('DEL', KEYS[2])
+return redis.call('ZREM', KEYS[1], ARGV[1])
+"""
+
+
+async def mark_present(client, class_id, user_id, channel_name):
+    """Adds or refreshes a socket's heartbeat; returns True if the user was not present before."""
+    now = time.time()
+    pipe = client.pipeline(transaction=False)
+    pipe.zadd(presence_key(class_id), {str(user_id): now})
+    pipe.zadd(connections_key(class_id, user_id), {channel_name: now})
+    pipe.expire(connections_key(class_id, user_id), heartbeat_timeout() * 2)
+    pipe.sadd(ACTIVE_PRESENCE_KEY, str(class_id))
+    added, *_ = await pipe.execute()
+    return bool(added)
+
+
+async def mark_absent(client, class_id, user_id, channel_name):
+    """Removes a socket on a clean disconnect; returns True if it was the user's last one."""
+    removed = await client.eval(
+        MARK_ABSENT_SCRIPT, 2, presence_key(class_id), connections_key(class_id, user_id),
+        str(user_id), channel_name, time.time() - heartbeat_timeout()
+    )
+    return bool(removed)
+
+
+async def count_present(client, class_id):
+    """Counts participants with a live heartbeat in one class."""
+    return await client.zcount(presence_key(class_id), time.time() - heartbeat_timeout(), '+inf')
+
+
+def get_live_counts(class_ids):
+    """Returns {class_id: live participant count} for the given classes in one round trip."""
+    class_ids = [str(class_id) for class_id in class_ids]
+    if not class_ids:
+        return {}
+    client = get_redis('presence')
+    min_score = time.time() - heartbeat_timeout()
+    pipe = client.pipeline(transaction=False)
+    for class_id in class_ids:
+        pipe.zcount(presence_key(class_id), min_score, '+inf')
+    return dict(zip(class_ids, pipe.execute()))
+
+
+def get_active_class_ids():
+    """Returns the class_ids that currently have presence entries."""
+    return get_redis('presence').smembers(ACTIVE_PRESENCE_KEY)
+
+
+def sweep_stale_participants():
+    """Evicts participants with expired heartbeats and broadcasts their leave events."""
+    from edu_platform.models import User
+
+    client = get_redis('presence')
+    cutoff = time.time() - heartbeat_timeout()
+    evicted = {}
+    for class_id in client.smembers(ACTIVE_PRESENCE_KEY):
+        key = presence_key(class_id)
+        stale = client.zrangebyscore(key, '-inf', cutoff, withscores=True)
+        if stale:
+            # Only the sweeper whose ZREM succeeds announces the leave, so
+            # concurrent sweeps in several workers don't duplicate events
+            pipe = client.pipeline(transaction=False)
+            for user_id, _ in stale:
+                pipe.zrem(key, user_id)
+            removed = [(user_id, last_seen) for (user_id, last_seen), ok in zip(stale, pipe.execute()) if ok]
+            # None of their sockets heartbeated either (the user's score is the latest of them)
+            if removed:
+                client.delete(*[connections_key(class_id, user_id) for user_id, _ in removed])
+            if removed:
+                evicted[class_id] = removed
+        if not client.zcard(key):
+            client.srem(ACTIVE_PRESENCE_KEY, class_id)
+
+    if not evicted:
+        return 0
+
+    events_client = get_redis()
+    # Attendance ends at the last heartbeat, not at the time of the sweep
+    try:
+        close_open_attendance(events_client, (
+            (class_id, user_id, last_seen)
+            for class_id, removed in evicted.items()
+            for user_id, last_seen in removed
+        ))
+    except Exception as e:
+        logger.error(f"Failed to close attendance for evicted participants: {e}")
+
+    user_ids = {int(user_id) for removed in evicted.values() for user_id, _ in removed}
+    emails = dict(User.objects.filter(id__in=user_ids).values_list('id', 'email'))
+    channel_layer = get_channel_layer()
+    total = 0
+    for class_id, removed in evicted.items():
+        for user_id, _ in removed:
+            event = {
+                'type': 'chat_message',
+                'message': f"{emails.get(int(user_id), 'A participant')} left the class",
+                'sender': 'system',
+            }
+            try:
+                event['seq'] = record_event(events_client, class_id, event)
+            except Exception as e:
+                logger.error(f"Failed to log presence expiry for class {class_id}: {e}")
+            if channel_layer is not None:
+                async_to_sync(channel_layer.group_send)(f'class_{class_id}', event)
+            total += 1
+        logger.info(f"Evicted {len(removed)} stale participants from class {class_id}")
+    return total
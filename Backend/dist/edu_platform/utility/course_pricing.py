@@ -0,0 +1,121 @@
+"""
+Effective course prices.
+
+A course's price is its latest ``CoursePricing.final_price`` (by
+``created_at``), or ``base_price`` when it has none. The latest pricing of
+every course is loaded with one window-function query
+(``ROW_NUMBER() OVER (PARTITION BY course_id ORDER BY created_at DESC)``) and
+kept in a process-local dict, so the catalog and order creation read the same
+prices without a query per course.
+
+Saving or deleting a ``CoursePricing`` clears this process's copy and, on
+commit, bumps a version number in the shared cache; other processes compare
+that version (one cache GET, no database query) before using their copy and
+reload when it changed.
+"""
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'course_pricing:version'
+
+_prices = {'version': None, 'by_course': None}
+_prices_lock = threading.Lock()
+
+
+def new_version():
+    # Time-based so a version recreated after eviction never reuses an old number
+    return time.time_ns() // 1_000_000
+
+
+def get_version():
+    try:
+        version = cache.get(VERSION_KEY)
+        if version is None:
+            cache.add(VERSION_KEY, new_version(), timeout=None)
+            version = cache.get(VERSION_KEY)
+        return version
+    except Exception as e:
+        # Without the shared version, fall back to reloading on every lookup
+        logger.error(f"Course pricing version unavailable: {e}")
+        return None
+
+
+def load_latest_pricings():
+    """{course_id: (final_price, original_price, discount_percent)} of each course's latest pricing."""
+    from edu_platform.models import CoursePricing
+
+    latest = (
+        CoursePricing.objects
+        .annotate(rank=Window(
+            expression=RowNumber(),
+            partition_by=[F('course_id')],
+            order_by=[F('created_at').desc(), F('id').desc()],
+        ))
+        .filter(rank=1)
+        .values_list('course_id', 'final_price', 'original_price', 'discount_percent')
+    )
+    return {course_id: (final_price, original_price, discount) for course_id, final_price, original_price, discount in latest}
+
+
+def get_latest_pricings():
+    """The cached latest pricings, reloaded when another process changed them."""
+    version = get_version()
+    with _prices_lock:
+        if _prices['by_course'] is not None and version is not None and _prices['version'] == version:
+            return _prices['by_course']
+    # Read the version before querying, so a change made during the load triggers another one
+    by_course = load_latest_pricings()
+    with _prices_lock:
+        _prices['version'] = version
+        _prices['by_course'] = by_course
+    return by_course
+
+
+def price_details(course, pricings=None):
+    """{'price', 'original_price', 'discount_percent'} a student pays for the course now."""
+    pricings = get_latest_pricings() if pricings is None else pricings
+    pricing = pricings.get(course.id)
+    if pricing is None:
+        return {'price': course.base_price, 'original_price': course.base_price, 'discount_percent': None}
+    final_price, original_price, discount_percent = pricing
+    return {'price': final_price, 'original_price': original_price, 'discount_percent': discount_percent}
+
+
+def effective_price(course, pricings=None):
+    """The price charged for the course: latest pricing's final price, else base_price."""
+    return price_details(course, pricings)['price']
+
+
+def invalidate_pricings(**kwargs):
+    """Drops this process's prices now and everyone's once the change is committed."""
+    with _prices_lock:
+        _prices['by_course'] = None
+
+    def bump():
+        with _prices_lock:
+            _prices['by_course'] = None
+        try:
+            cache.incr(VERSION_KEY)
+        except ValueError:
+            # Key missing (evicted or never set)
+            cache.add(VERSION_KEY, new_version(), timeout=None)
+        except Exception as e:
+            logger.error(f"Failed to invalidate course pricing cache: {e}")
+
+    transaction.on_commit(bump)
+
+
+def connect_pricing_signals():
+    from django.db.models.signals import post_save, post_delete
+    from edu_platform.models import CoursePricing
+
+    post_save.connect(invalidate_pricings, sender=CoursePricing, dispatch_uid='course_pricing_saved')
+    post_delete.connect(invalidate_pricings, sender=CoursePricing, dispatch_uid='course_pricing_deleted')
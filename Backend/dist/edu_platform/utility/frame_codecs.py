@@ -0,0 +1,70 @@
+"""
+WebSocket frame codecs for the classroom, negotiated through the subprotocol.
+
+JSON text frames are the default. Clients that offer the ``edustream.msgpack``
+subprotocol get MessagePack binary frames instead, which are smaller and cheaper
+to build for large signaling payloads (SDP offers/answers).
+"""
+
+import json
+import msgpack
+
+JSON_SUBPROTOCOL = 'edustream.json'
+MSGPACK_SUBPROTOCOL = 'edustream.msgpack'
+
+
+class FrameDecodeError(ValueError):
+    """Raised when an incoming frame cannot be decoded."""
+
+
+class JSONCodec:
+    """Text frames carrying JSON (default)."""
+    subprotocol = JSON_SUBPROTOCOL
+    binary = False
+
+    def encode(self, payload):
+        return json.dumps(payload)
+
+    def decode(self, frame):
+        try:
+            if isinstance(frame, bytes):
+                frame = frame.decode('utf-8')
+            return json.loads(frame)
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            raise FrameDecodeError(str(e))
+
+
+class MsgpackCodec:
+    """Binary frames carrying MessagePack."""
+    subprotocol = MSGPACK_SUBPROTOCOL
+    binary = True
+
+    def encode(self, payload):
+        return msgpack.packb(payload, use_bin_type=True)
+
+    def decode(self, frame):
+        if isinstance(frame, str):
+            frame = frame.encode('utf-8')
+        try:
+            return msgpack.unpackb(frame, raw=False)
+        except (msgpack.UnpackException, ValueError) as e:
+            raise FrameDecodeError(str(e))
+
+
+CODECS = {
+    JSON_SUBPROTOCOL: JSONCodec(),
+    MSGPACK_SUBPROTOCOL: MsgpackCodec(),
+}
+
+
+def select_codec(subprotocols):
+    """Picks the codec for the subprotocols a client offered, preferring msgpack.
+
+    Returns (codec, subprotocol_to_accept); the subprotocol is None when the
+    client offered none of ours, in which case plain JSON is used.
+    """
+    offered = subprotocols or []
+    for name in (MSGPACK_SUBPROTOCOL, JSON_SUBPROTOCOL):
+        if name in offered:
+            return CODECS[name], name
+    return CODECS[JSON_SUBPROTOCOL], None
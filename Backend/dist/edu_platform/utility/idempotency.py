@@ -0,0 +1,107 @@
+"""
+Idempotency-Key support for payment POSTs.
+
+A client that retries a request with the same ``Idempotency-Key`` header gets
+the stored response of the first attempt instead of running it again. Keys are
+scoped to the user and endpoint and kept in Redis:
+
+* the first request claims the key with ``SET NX`` (state ``in_progress``);
+* a concurrent retry while it runs gets 409;
+* when it finishes, the status and body are stored for ``TTL_SECONDS``
+  (server errors and retryable conflicts release the key so the client can retry);
+* reusing a key with a different request body is rejected with 422.
+"""
+
+from django.conf import settings
+from edu_platform.utility.redis_services import get_redis
+from functools import wraps
+from rest_framework import status
+from rest_framework.response import Response
+import hashlib
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = 'HTTP_IDEMPOTENCY_KEY'
+IN_PROGRESS = 'in_progress'
+# Outcomes that may differ on retry (a seat batch filled, an order changed underneath,
+# rate limits); storing them would replay the failure for the whole TTL
+RETRYABLE_STATUSES = {status.HTTP_409_CONFLICT, status.HTTP_429_TOO_MANY_REQUESTS}
+
+
+def get_idempotency_setting(name, default=None):
+    return getattr(settings, 'IDEMPOTENCY_SETTINGS', {}).get(name, default)
+
+
+def idempotency_key(request, key):
+    return f"idempotency:{request.user.id}:{request.path}:{key}"
+
+
+def request_fingerprint(request):
+    return hashlib.sha256(json.dumps(request.data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def error(message, status_code):
+    return Response({
+        'message': message,
+        'message_type': 'error',
+        'status': status_code
+    }, status=status_code)
+
+
+def idempotent(view_method):
+    """Decorates an APIView.post so requests carrying an Idempotency-Key run at most once."""
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.META.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > get_idempotency_setting('MAX_KEY_LENGTH', 255):
+            return error('Idempotency-Key is too long.', status.HTTP_400_BAD_REQUEST)
+
+        client = get_redis()
+        redis_key = idempotency_key(request, key)
+        fingerprint = request_fingerprint(request)
+        ttl = get_idempotency_setting('TTL_SECONDS', 24 * 3600)
+
+        claim = json.dumps({'state': IN_PROGRESS, 'fingerprint': fingerprint})
+        try:
+            claimed = client.set(redis_key, claim, nx=True, ex=get_idempotency_setting('LOCK_SECONDS', 60))
+        except Exception as e:
+            # The payment itself must not depend on Redis; lose only the replay protection
+            logger.error(f"Idempotency store unavailable, running {request.path} without it: {e}")
+            return view_method(self, request, *args, **kwargs)
+        if not claimed:
+            stored = client.get(redis_key)
+            if stored is None:
+                # Expired between SET and GET; treat as a fresh request
+                return wrapper(self, request, *args, **kwargs)
+            stored = json.loads(stored)
+            if stored['fingerprint'] != fingerprint:
+                return error('Idempotency-Key was already used with a different request.', status.HTTP_422_UNPROCESSABLE_ENTITY)
+            if stored['state'] == IN_PROGRESS:
+                return error('A request with this Idempotency-Key is still being processed.', status.HTTP_409_CONFLICT)
+            response = Response(stored['body'], status=stored['status'])
+            response['Idempotent-Replayed'] = 'true'
+            return response
+
+        try:
+            response = view_method(self, request, *args, **kwargs)
+        except Exception:
+            client.delete(redis_key)
+            raise
+        try:
+            if response.status_code >= 500 or response.status_code in RETRYABLE_STATUSES:
+                client.delete(redis_key)
+            else:
+                client.set(redis_key, json.dumps({
+                    'state': 'completed',
+                    'fingerprint': fingerprint,
+                    'status': response.status_code,
+                    'body': response.data,
+                }, default=str), ex=ttl)
+        except Exception as e:
+            logger.error(f"Failed to store idempotent response for {request.path}: {e}")
+        return response
+    return wrapper
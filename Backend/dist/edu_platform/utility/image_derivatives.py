@@ -0,0 +1,250 @@
+"""
+Resized derivatives of uploaded images (course thumbnails, profile pictures).
+
+Saving a model in ``IMAGE_SOURCES`` with a new image queues it, after the
+transaction commits, on the shared media process pool. A worker decodes the
+original once, applies the EXIF orientation and writes each configured width in
+each format without EXIF metadata. The parent stores the files and records them
+in the model's ``*_derivatives`` JSON field, only if the row still holds the
+same source image:
+
+    {"source": "<image name>", "width": 1600, "height": 900,
+     "formats": {"webp": {"64": "<name>", "256": ...}, "jpeg": {...}}}
+
+Serializers expose it as ``{format: {width: url}}`` through ``srcset_urls``.
+"""
+
+from django.conf import settings
+from django.db import transaction
+from edu_platform.utility.media_dedup import retain_media, release_media, stored_names
+from edu_platform.utility.recording_processing import get_executor, open_source, recording_source
+from functools import partial
+from PIL import Image, ImageOps
+import io
+import logging
+import os
+import shutil
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVE_UPLOAD_DIR = 'image_derivatives'
+
+# model label -> (image field, derivatives field)
+IMAGE_SOURCES = {
+    'edu_platform.Course': ('thumbnail', 'thumbnail_derivatives'),
+    'edu_platform.TeacherProfile': ('profile_picture', 'profile_picture_derivatives'),
+    'edu_platform.StudentProfile': ('profile_picture', 'profile_picture_derivatives'),
+}
+
+FORMAT_EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+
+_in_flight = set()
+
+
+def get_image_setting(name, default=None):
+    return getattr(settings, 'IMAGE_DERIVATIVE_SETTINGS', {}).get(name, default)
+
+
+def derivative_options():
+    return {
+        'widths': get_image_setting('WIDTHS', [64, 256, 1024]),
+        'formats': get_image_setting('FORMATS', ['webp', 'jpeg']),
+        'quality': get_image_setting('QUALITY', 80),
+    }
+
+
+# --- Worker side: file work only ---
+
+def target_widths(original_width, widths):
+    """Configured widths, capped at the original so images are never upscaled."""
+    return sorted({min(width, original_width) for width in widths})
+
+
+def flatten(image):
+    """RGB copy for JPEG; transparent areas become white."""
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        rgba = image.convert('RGBA')
+        background = Image.new('RGB', rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def render_derivatives(source, options):
+    """Runs in a pool worker; writes the derivatives to a temp dir and returns their paths."""
+    with open_source(source) as f:
+        # Pillow needs a seekable file; URL responses are buffered in memory (images are small)
+        data = f if hasattr(f, 'seekable') and f.seekable() else io.BytesIO(f.read())
+        image = Image.open(data)
+        raw_width, raw_height = image.size
+        # Let the JPEG decoder downscale by a power of two when the original is much larger
+        largest = max(options['widths'])
+        image.draft('RGB', (largest, largest))
+        drafted = image.size
+        image = ImageOps.exif_transpose(image)
+        image.load()
+
+    # Dimensions of the original as displayed (after the EXIF rotation)
+    if image.size != drafted:
+        raw_width, raw_height = raw_height, raw_width
+    original_width, original_height = raw_width, raw_height
+
+    icc_profile = image.info.get('icc_profile')
+    has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+    webp_source = image.convert('RGBA' if has_alpha else 'RGB')
+    jpeg_source = flatten(image)
+
+    output_dir = tempfile.mkdtemp(prefix='image_derivatives_')
+    files = []
+    width_limit = image.size[0]
+    for width in sorted(target_widths(width_limit, options['widths']), reverse=True):
+        height = max(round(image.size[1] * width / width_limit), 1)
+        for fmt in options['formats']:
+            base = webp_source if fmt == 'webp' else jpeg_source
+            resized = base if base.size == (width, height) else base.resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+            path = os.path.join(output_dir, f"{width}.{FORMAT_EXTENSIONS[fmt]}")
+            # No exif= argument: the derivatives carry no EXIF (location, camera) data
+            save_args = {'quality': options['quality']}
+            if icc_profile:
+                save_args['icc_profile'] = icc_profile
+            if fmt == 'jpeg':
+                save_args.update(optimize=True, progressive=True)
+            else:
+                save_args.update(method=4)
+            resized.save(path, fmt.upper(), **save_args)
+            files.append((fmt, width, path))
+
+    return {
+        'width': original_width,
+        'height': original_height,
+        'files': files,
+        'output_dir': output_dir,
+    }
+
+
+# --- Parent side ---
+
+def source_model(label):
+    from django.apps import apps
+
+    return apps.get_model(label)
+
+
+def store_derivatives(label, pk, source_name, result):
+    """Saves rendered files if the row still holds `source_name`; returns True if stored."""
+    from django.core.files import File
+    from django.core.files.storage import default_storage
+
+    model = source_model(label)
+    image_field, derivatives_field = IMAGE_SOURCES[label]
+    try:
+        current = model.objects.filter(pk=pk).values(image_field, derivatives_field).first()
+        if not current or current[image_field] != source_name:
+            return False
+
+        stem = os.path.splitext(os.path.basename(source_name))[0]
+        formats = {}
+        for fmt, width, path in result['files']:
+            with open(path, 'rb') as f:
+                name = default_storage.save(
+                    f"{DERIVATIVE_UPLOAD_DIR}/{stem}_{width}.{FORMAT_EXTENSIONS[fmt]}", File(f)
+                )
+            formats.setdefault(fmt, {})[str(width)] = name
+
+        derivatives = {
+            'source': source_name,
+            'width': result['width'],
+            'height': result['height'],
+            'formats': formats,
+        }
+        updated = model.objects.filter(pk=pk, **{image_field: source_name}).update(**{derivatives_field: derivatives})
+        if updated:
+            retain_media(list(stored_names(derivatives)))
+            release_media(list(stored_names(current[derivatives_field])))
+        return bool(updated)
+    finally:
+        shutil.rmtree(result['output_dir'], ignore_errors=True)
+
+
+def on_rendered(label, pk, source_name, future):
+    """Pool callback; runs on the executor's management thread."""
+    from django.db import connection
+
+    _in_flight.discard((label, pk, source_name))
+    try:
+        store_derivatives(label, pk, source_name, future.result())
+    except Exception as e:
+        logger.error(f"Image derivatives for {label} {pk} failed: {e}")
+    finally:
+        connection.close()
+
+
+def enqueue_derivatives(label, pk):
+    """Submits the row's current image to the pool; returns True if submitted."""
+    model = source_model(label)
+    image_field, derivatives_field = IMAGE_SOURCES[label]
+    instance = model.objects.filter(pk=pk).only('pk', image_field).first()
+    image = getattr(instance, image_field, None) if instance else None
+    if not image:
+        return False
+
+    key = (label, pk, image.name)
+    if key in _in_flight:
+        return False
+    _in_flight.add(key)
+    try:
+        future = get_executor().submit(render_derivatives, recording_source(image), derivative_options())
+    except Exception:
+        _in_flight.discard(key)
+        raise
+    future.add_done_callback(partial(on_rendered, label, pk, image.name))
+    return True
+
+
+def clear_derivatives(label, pk, derivatives):
+    model = source_model(label)
+    _, derivatives_field = IMAGE_SOURCES[label]
+    if model.objects.filter(pk=pk).update(**{derivatives_field: {}}):
+        release_media(list(stored_names(derivatives)))
+
+
+def queue_image_derivatives(sender, instance, update_fields=None, **kwargs):
+    """post_save: renders derivatives off the request path when the image changed."""
+    label = sender._meta.label
+    image_field, derivatives_field = IMAGE_SOURCES[label]
+    if update_fields is not None and image_field not in update_fields:
+        return
+    image = getattr(instance, image_field)
+    derivatives = getattr(instance, derivatives_field) or {}
+    if not image:
+        if derivatives:
+            clear_derivatives(label, instance.pk, derivatives)
+        return
+    if derivatives.get('source') != image.name:
+        transaction.on_commit(partial(enqueue_derivatives, label, instance.pk))
+
+
+def connect_derivative_signals():
+    from django.db.models.signals import post_save
+
+    for label in IMAGE_SOURCES:
+        post_save.connect(queue_image_derivatives, sender=source_model(label), dispatch_uid=f'image_derivatives_{label}')
+
+
+def srcset_urls(instance, image_field, request=None):
+    """{format: {width: url}} for the instance's current image, or None until its derivatives exist."""
+    from django.core.files.storage import default_storage
+
+    _, derivatives_field = IMAGE_SOURCES[instance._meta.label]
+    image = getattr(instance, image_field)
+    derivatives = getattr(instance, derivatives_field) or {}
+    if not image or derivatives.get('source') != image.name:
+        return None
+    urls = {}
+    for fmt, names in derivatives.get('formats', {}).items():
+        urls[fmt] = {}
+        for width, name in sorted(names.items(), key=lambda item: int(item[0])):
+            url = default_storage.url(name)
+            urls[fmt][width] = request.build_absolute_uri(url) if request and url.startswith('/') else url
+    return urls
@@ -0,0 +1,49 @@
+"""
+JWT helpers: tokens that carry the user's role and email as claims, and a
+lightweight user built from those claims.
+"""
+
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.models import TokenUser
+
+
+class RoleRefreshToken(RefreshToken):
+    """Refresh token whose access tokens also carry `role` and `email` claims.
+
+    Lets token consumers (e.g. the WebSocket auth middleware) authorize by role
+    without loading the user from the database.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token['role'] = user.role
+        token['email'] = user.email
+        return token
+
+
+class ClaimsUser(TokenUser):
+    """Stateless user backed by validated token claims, exposing the role helpers of User."""
+
+    @property
+    def email(self):
+        return self.token.get('email', '')
+
+    @property
+    def role(self):
+        return self.token.get('role')
+
+    @property
+    def is_admin(self):
+        return self.role == 'admin'
+
+    @property
+    def is_teacher(self):
+        return self.role == 'teacher'
+
+    @property
+    def is_student(self):
+        return self.role == 'student'
+
+    def __str__(self):
+        return f"{self.email} - {self.role}"
@@ -0,0 +1,288 @@
+"""
+Content-addressed, deduplicated media storage.
+
+``DeduplicatingStorageMixin`` stores every file once under its SHA-256,
+``blobs/ab/cd/<digest><ext>``, and returns that name to the FileField, so
+identical uploads (a re-uploaded recording, the same profile picture twice)
+share one blob. The digest comes from the upload handlers below, which hash
+while Django receives the request body; other content is hashed with a single
+read before storing.
+
+``MediaBlob`` rows count the model fields referring to each blob. Signals
+registered in ``connect_refcount_signals`` keep the counts current on save and
+delete. Code that keeps blob names in JSON fields (``NAME_LIST_FIELDS``:
+recording posters, image derivatives) calls ``retain_media``/``release_media``
+itself when it writes them. ``collect_garbage`` deletes
+blobs with no references after a grace period. Deleting a blob name through the
+storage is a no-op, because other rows may still point at it.
+"""
+
+from django.conf import settings
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+from django.db import models as db_models
+from django.db.models import F
+from django.utils import timezone
+from datetime import timedelta
+import hashlib
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+BLOB_PREFIX = 'blobs/'
+
+# JSON fields holding storage names that count as references to blobs
+NAME_LIST_FIELDS = {
+    'edu_platform.ClassSession': ['recording_posters'],
+    'edu_platform.Course': ['thumbnail_derivatives'],
+    'edu_platform.TeacherProfile': ['profile_picture_derivatives'],
+    'edu_platform.StudentProfile': ['profile_picture_derivatives'],
+}
+
+
+def is_blob_name(name):
+    return isinstance(name, str) and name.startswith(BLOB_PREFIX)
+
+
+def stored_names(value):
+    """Yields the blob names found anywhere in a JSON value."""
+    if isinstance(value, dict):
+        for item in value.values():
+            yield from stored_names(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from stored_names(item)
+    elif is_blob_name(value):
+        yield value
+
+
+def blob_name(digest, original_name):
+    ext = os.path.splitext(original_name)[1].lower()[:10]
+    return f"{BLOB_PREFIX}{digest[:2]}/{digest[2:4]}/{digest}{ext}"
+
+
+def content_digest(content):
+    """SHA-256 of a file, from the upload handler when available, else by one read."""
+    digest = getattr(content, 'content_sha256', None)
+    if digest:
+        return digest
+    hasher = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks() if hasattr(content, 'chunks') else iter(lambda: content.read(1024 * 1024), b''):
+        hasher.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return hasher.hexdigest()
+
+
+# --- Upload handlers: hash while the request body streams in ---
+
+class HashingUploadMixin:
+    def new_file(self, *args, **kwargs):
+        # Before super(): MemoryFileUploadHandler raises StopFutureHandlers once activated
+        self.hasher = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        if file is not None:
+            file.content_sha256 = self.hasher.hexdigest()
+        return file
+
+
+class HashingMemoryFileUploadHandler(HashingUploadMixin, MemoryFileUploadHandler):
+    def receive_data_chunk(self, raw_data, start):
+        if self.activated:
+            self.hasher.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+
+class HashingTemporaryFileUploadHandler(HashingUploadMixin, TemporaryFileUploadHandler):
+    def receive_data_chunk(self, raw_data, start):
+        self.hasher.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+
+# --- Storage ---
+
+class DeduplicatingStorageMixin:
+    """Mix into a Storage class in front of the concrete backend."""
+
+    def get_available_name(self, name, max_length=None):
+        # The stored name is derived from the content in _save; no suffixing needed.
+        # FileSystemStorage._save calls this again when its exclusive create finds the
+        # file; raising stops that retry loop and lets _save reuse the file instead.
+        if is_blob_name(name) and self.exists(name):
+            raise FileExistsError(name)
+        return name
+
+    def _save(self, name, content):
+        from edu_platform.models import MediaBlob
+
+        digest = content_digest(content)
+        existing = MediaBlob.objects.filter(digest=digest).values_list('name', flat=True).first()
+        # Touching the row keeps garbage collection from removing it while we link to it
+        if existing and MediaBlob.objects.filter(digest=digest).update(updated_at=timezone.now()):
+            return existing
+
+        target = blob_name(digest, name)
+        # A file left behind without its row (interrupted GC), or written by a concurrent
+        # upload of the same content, is reused as-is
+        try:
+            stored_name = target if self.exists(target) else super()._save(target, content)
+        except FileExistsError:
+            stored_name = target
+        size = getattr(content, 'size', None)
+        blob, _ = MediaBlob.objects.get_or_create(
+            digest=digest,
+            defaults={'name': stored_name, 'size': size if size is not None else self.size(stored_name)}
+        )
+        return blob.name
+
+    def delete(self, name):
+        if is_blob_name(name):
+            return
+        super().delete(name)
+
+    def delete_blob(self, name):
+        super().delete(name)
+
+
+# --- Reference counting ---
+
+def retain_media(names):
+    from edu_platform.models import MediaBlob
+
+    for name in filter(is_blob_name, names):
+        MediaBlob.objects.filter(name=name).update(ref_count=F('ref_count') + 1, updated_at=timezone.now())
+
+
+def release_media(names):
+    from edu_platform.models import MediaBlob
+
+    for name in filter(is_blob_name, names):
+        MediaBlob.objects.filter(name=name, ref_count__gt=0).update(
+            ref_count=F('ref_count') - 1, updated_at=timezone.now()
+        )
+
+
+def file_fields(model):
+    return [field for field in model._meta.concrete_fields if isinstance(field, db_models.FileField)]
+
+
+def capture_file_names(sender, instance, update_fields=None, **kwargs):
+    """pre_save: remembers the stored names the save is about to replace."""
+    fields = [f for f in file_fields(sender) if update_fields is None or f.name in update_fields]
+    instance._previous_file_names = {}
+    if not fields or instance._state.adding or instance.pk is None:
+        return
+    previous = sender._base_manager.filter(pk=instance.pk).values(*[f.attname for f in fields]).first() or {}
+    instance._previous_file_names = {name: value for name, value in previous.items() if value}
+
+
+def update_file_refs(sender, instance, created=False, update_fields=None, **kwargs):
+    """post_save: moves references from the replaced names to the new ones."""
+    previous = getattr(instance, '_previous_file_names', {})
+    acquired, released = [], []
+    for field in file_fields(sender):
+        if update_fields is not None and field.name not in update_fields:
+            continue
+        current = getattr(instance, field.attname).name or ''
+        old = previous.get(field.attname, '')
+        if current != old:
+            if current:
+                acquired.append(current)
+            if old:
+                released.append(old)
+    retain_media(acquired)
+    release_media(released)
+
+
+def drop_file_refs(sender, instance, **kwargs):
+    """post_delete: releases every file the row referred to."""
+    release_media([getattr(instance, f.attname).name for f in file_fields(sender) if getattr(instance, f.attname)])
+    for field_name in NAME_LIST_FIELDS.get(sender._meta.label, []):
+        release_media(list(stored_names(getattr(instance, field_name))))
+
+
+def connect_refcount_signals(app_config):
+    """Registers the refcount handlers for every model of the app that has file fields."""
+    from django.db.models.signals import pre_save, post_save, post_delete
+
+    # Without dedup there are no blobs to count; skip the extra SELECT on every save
+    if not getattr(settings, 'MEDIA_DEDUP', False):
+        return
+    for model in app_config.get_models():
+        if file_fields(model):
+            pre_save.connect(capture_file_names, sender=model, dispatch_uid=f'media_refs_pre_{model._meta.label}')
+            post_save.connect(update_file_refs, sender=model, dispatch_uid=f'media_refs_post_{model._meta.label}')
+            post_delete.connect(drop_file_refs, sender=model, dispatch_uid=f'media_refs_del_{model._meta.label}')
+
+
+def referenced_names(app_config):
+    """Counts references to blob names across all file fields and NAME_LIST_FIELDS."""
+    from collections import Counter
+
+    counts = Counter()
+    for model in app_config.get_models():
+        for field_name in NAME_LIST_FIELDS.get(model._meta.label, []):
+            for value in model._base_manager.values_list(field_name, flat=True).iterator():
+                counts.update(stored_names(value))
+        for field in file_fields(model):
+            rows = (
+                model._base_manager.filter(**{f'{field.attname}__startswith': BLOB_PREFIX})
+                .values(field.attname)
+                .annotate(refs=db_models.Count('pk'))
+                .order_by()
+            )
+            for row in rows:
+                counts[row[field.attname]] += row['refs']
+    return counts
+
+
+def recount_references(app_config):
+    """Rebuilds every ref_count from the database; returns the number of rows corrected."""
+    from edu_platform.models import MediaBlob
+
+    counts = referenced_names(app_config)
+    corrected = 0
+    for blob in MediaBlob.objects.only('name', 'ref_count').iterator():
+        actual = counts.get(blob.name, 0)
+        if blob.ref_count != actual:
+            MediaBlob.objects.filter(pk=blob.pk).update(ref_count=actual)
+            corrected += 1
+    return corrected
+
+
+def collect_garbage(grace_hours=None, dry_run=False):
+    """Deletes blobs that have had no references for longer than the grace period."""
+    from django.core.files.storage import default_storage
+    from edu_platform.models import MediaBlob
+
+    grace_hours = grace_hours if grace_hours is not None else getattr(settings, 'MEDIA_BLOB_GC_GRACE_HOURS', 24)
+    cutoff = timezone.now() - timedelta(hours=grace_hours)
+    orphans = list(MediaBlob.objects.filter(ref_count=0, updated_at__lt=cutoff).values_list('digest', 'name', 'size'))
+    if dry_run:
+        return orphans
+
+    deleted = []
+    for digest, name, size in orphans:
+        # Conditional delete: a concurrent upload or reference touches updated_at
+        removed, _ = MediaBlob.objects.filter(digest=digest, ref_count=0, updated_at__lt=cutoff).delete()
+        if not removed:
+            continue
+        try:
+            if hasattr(default_storage, 'delete_blob'):
+                default_storage.delete_blob(name)
+            deleted.append((digest, name, size))
+        except Exception as e:
+            logger.error(f"Failed to delete media blob {name}: {e}")
+    if deleted:
+        logger.info(f"Garbage-collected {len(deleted)} media blobs ({sum(size for _, _, size in deleted)} bytes)")
+    return deleted
+
+
+def collect_media_garbage():
+    """Periodic job entry point."""
+    return collect_garbage()
@@ -0,0 +1,74 @@
+"""
+Media storage backends and helpers.
+
+``MediaS3Storage`` is selected with MEDIA_STORAGE=s3 (see settings.STORAGES).
+It uploads large files as parallel multipart uploads sized by
+settings.MEDIA_S3_TRANSFER and returns presigned URLs from ``url()``. The local
+FileSystemStorage stays the default; code that needs a filesystem path checks
+``has_local_path`` instead of assuming one. With MEDIA_DEDUP enabled the
+``Deduplicating*`` variants store content-addressed blobs (see media_dedup).
+"""
+
+from boto3.s3.transfer import TransferConfig
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from edu_platform.utility.media_dedup import DeduplicatingStorageMixin
+from storages.backends.s3 import S3Storage
+from storages.utils import clean_name
+
+
+def get_transfer_config():
+    """TransferConfig for multipart uploads, from settings.MEDIA_S3_TRANSFER."""
+    transfer = getattr(settings, 'MEDIA_S3_TRANSFER', {})
+    return TransferConfig(
+        multipart_threshold=transfer.get('MULTIPART_THRESHOLD', 64 * 1024 * 1024),
+        multipart_chunksize=transfer.get('MULTIPART_CHUNKSIZE', 16 * 1024 * 1024),
+        max_concurrency=transfer.get('MAX_CONCURRENCY', 8),
+        use_threads=True,
+    )
+
+
+class MediaS3Storage(S3Storage):
+    """Private S3 (or S3-compatible) bucket for uploaded media."""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('transfer_config', get_transfer_config())
+        super().__init__(**kwargs)
+
+    def _save(self, name, content):
+        # Files already on disk (finished chunked uploads) are uploaded by path so
+        # s3transfer can read the parts concurrently instead of from one stream
+        if not hasattr(content, 'temporary_file_path'):
+            return super()._save(name, content)
+
+        cleaned_name = clean_name(name)
+        key = self._normalize_name(cleaned_name)
+        params = self._get_write_parameters(key, content)
+        self.bucket.Object(key).upload_file(
+            content.temporary_file_path(), ExtraArgs=params, Config=self.transfer_config
+        )
+        return cleaned_name
+
+
+class DeduplicatingFileSystemStorage(DeduplicatingStorageMixin, FileSystemStorage):
+    pass
+
+
+class DeduplicatingS3Storage(DeduplicatingStorageMixin, MediaS3Storage):
+    pass
+
+
+def has_local_path(storage):
+    """Whether files in `storage` can be opened from the local filesystem."""
+    try:
+        storage.path('')
+    except NotImplementedError:
+        return False
+    return True
+
+
+def presigned_url(storage, name, expire=None):
+    """Time-limited URL for a stored file (plain URL for storages without signing)."""
+    if isinstance(storage, S3Storage):
+        return storage.url(name, expire=expire)
+    return storage.url(name)
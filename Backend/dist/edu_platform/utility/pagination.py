@@ -0,0 +1,133 @@
+"""
+Keyset (seek) pagination for large admin listings.
+
+PageNumberPagination turns page N into ``OFFSET N * size``, so the database
+walks every earlier row and deep pages get slower as the table grows. Here the
+``cursor`` query parameter carries the sort key of the row a page ends (or
+starts) at, and the next page is a range scan from that key on an index over
+(sort field, id), which costs the same at any depth.
+
+The sort field may be nullable. Rows are ordered the way PostgreSQL orders
+``DESC``, with NULLs first, then by id descending as the tie-breaker. The
+response keeps the ``count``/``next``/``previous``/``results`` shape. ``count``
+is only computed for the first page, since counting is the one part whose cost
+grows with the table.
+"""
+
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from django.db.models import F, Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+import json
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination on (ordering_field DESC NULLS FIRST, id DESC)."""
+    ordering_field = 'payment_completed_at'
+    page_size = 20
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def encode_cursor(self, value, pk, reverse=False):
+        """Opaque cursor for the position (value, pk); reverse cursors page backwards."""
+        raw = json.dumps([value.isoformat() if value is not None else None, pk, reverse])
+        return urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            value, pk, reverse = json.loads(urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4)))
+            if value is not None:
+                value = parse_datetime(value)
+                if value is None:
+                    raise ValueError(encoded)
+            return value, int(pk), bool(reverse)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def segments(self, value, pk, reverse):
+        """Filters for the rows after (value, pk) in listing order (before it when reverse).
+
+        Each filter is a single range on the (field, id) index, so the scan
+        starts at the cursor instead of skipping earlier rows; the NULL and
+        non-NULL parts are queried separately for the same reason.
+        """
+        field = self.ordering_field
+        if not reverse:
+            if value is None:
+                return [Q(**{f'{field}__isnull': True, 'id__lt': pk}), Q(**{f'{field}__isnull': False})]
+            return [Q(**{f'{field}__lte': value}) & (Q(**{f'{field}__lt': value}) | Q(**{field: value, 'id__lt': pk}))]
+        if value is None:
+            return [Q(**{f'{field}__isnull': True, 'id__gt': pk})]
+        return [
+            Q(**{f'{field}__gte': value}) & (Q(**{f'{field}__gt': value}) | Q(**{field: value, 'id__gt': pk})),
+            Q(**{f'{field}__isnull': True}),
+        ]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor[2])
+
+        if reverse:
+            ordering = (F(self.ordering_field).asc(nulls_last=True), 'id')
+        else:
+            ordering = (F(self.ordering_field).desc(nulls_first=True), '-id')
+        self.count = queryset.count() if cursor is None else None
+
+        rows = []
+        for condition in (self.segments(*cursor) if cursor is not None else [Q()]):
+            rows.extend(queryset.filter(condition).order_by(*ordering)[:self.size + 1 - len(rows)])
+            if len(rows) > self.size:
+                break
+
+        more = len(rows) > self.size
+        rows = rows[:self.size]
+        if reverse:
+            rows.reverse()
+        self.has_next = True if reverse else more
+        self.has_previous = more if reverse else cursor is not None
+        self.rows = rows
+        return rows
+
+    def link(self, row, reverse):
+        url = self.request.build_absolute_uri()
+        if row is None:
+            return remove_query_param(url, self.cursor_query_param)
+        cursor = self.encode_cursor(getattr(row, self.ordering_field), row.pk, reverse)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_next_link(self):
+        if not self.has_next or not self.rows:
+            return None
+        return self.link(self.rows[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.rows:
+            return self.link(None, reverse=True)
+        return self.link(self.rows[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.count,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
@@ -0,0 +1,497 @@
+"""
+Payment gateway adapters.
+
+``get_gateway()`` returns the process-wide gateway selected by
+PAYMENT_GATEWAY_SETTINGS['BACKEND']:
+
+* ``razorpay``: the Razorpay SDK on a pooled ``requests`` session with default
+  connect/read timeouts, retries with full jitter for idempotent calls (reads,
+  and writes that failed before reaching the gateway), and a circuit breaker
+  that fails fast with ``GatewayUnavailable`` while the gateway is down;
+* ``fake``: an in-memory gateway for tests, benchmarks and local
+  reconciliation runs.
+
+``get_async_gateway()`` is the aiohttp-based counterpart for async views; it
+shares the retry and breaker behaviour and keeps one session per event loop.
+"""
+
+from django.conf import settings
+import asyncio
+import base64
+import hashlib
+import hmac
+import itertools
+import json
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+RAZORPAY_API_URL = 'https://api.razorpay.com/v1'
+
+_gateways = {}
+_async_gateways = {}
+_gateways_lock = threading.Lock()
+
+
+def get_gateway_setting(name, default=None):
+    return getattr(settings, 'PAYMENT_GATEWAY_SETTINGS', {}).get(name, default)
+
+
+class GatewayUnavailable(Exception):
+    """The gateway is failing or unreachable; the call was not completed."""
+
+
+class GatewayRequestError(Exception):
+    """The gateway rejected the request (HTTP 4xx); retrying will not help."""
+
+
+class GatewayServerError(Exception):
+    """The gateway (or a proxy in front of it) answered HTTP 5xx, whatever the body."""
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures; lets one trial call through after `reset_timeout`."""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_timeout or self.trial_in_flight:
+                return False
+            # Half-open: a single call decides whether to close again
+            self.trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logger.error(f"Payment gateway circuit opened after {self.failures} consecutive failures")
+                self.opened_at = time.monotonic()
+
+    def end_call(self):
+        """Called after every call however it ended, so an unrecorded trial never keeps the circuit open."""
+        with self.lock:
+            self.trial_in_flight = False
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter."""
+
+    def __init__(self, max_retries=2, backoff=0.25, backoff_max=2.0):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+
+    def delay(self, attempt):
+        return random.uniform(0, min(self.backoff_max, self.backoff * 2 ** attempt))
+
+
+def breaker_from_settings():
+    return CircuitBreaker(
+        failure_threshold=get_gateway_setting('BREAKER_FAILURE_THRESHOLD', 5),
+        reset_timeout=get_gateway_setting('BREAKER_RESET_SECONDS', 30),
+    )
+
+
+def retry_from_settings():
+    return RetryPolicy(
+        max_retries=get_gateway_setting('MAX_RETRIES', 2),
+        backoff=get_gateway_setting('RETRY_BACKOFF_SECONDS', 0.25),
+        backoff_max=get_gateway_setting('RETRY_BACKOFF_MAX_SECONDS', 2.0),
+    )
+
+
+def signature_matches(secret, message, signature):
+    expected = hmac.new(secret.encode(), message.encode(), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature or '')
+
+
+class BaseGateway:
+    """Operations the payment code uses; implementations raise GatewayUnavailable when they cannot answer."""
+
+    key_id = ''
+    key_secret = ''
+
+    def create_order(self, order_data):
+        raise NotImplementedError
+
+    def fetch_order(self, order_id):
+        raise NotImplementedError
+
+    def fetch_order_payments(self, order_id):
+        raise NotImplementedError
+
+    def fetch_payment(self, payment_id):
+        raise NotImplementedError
+
+    def verify_payment_signature(self, order_id, payment_id, signature):
+        """Checks the checkout signature locally (HMAC-SHA256 of "order_id|payment_id")."""
+        return signature_matches(self.key_secret, f"{order_id}|{payment_id}", signature)
+
+
+# --- Razorpay over a pooled, timeout-bounded session ---
+
+def build_session(pool_connections=None, pool_maxsize=None, connect_timeout=None, read_timeout=None):
+    """requests.Session with a sized connection pool and a default timeout on every request."""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    default_timeout = (
+        connect_timeout or get_gateway_setting('CONNECT_TIMEOUT_SECONDS', 3.05),
+        read_timeout or get_gateway_setting('READ_TIMEOUT_SECONDS', 10),
+    )
+
+    class TimeoutHTTPAdapter(HTTPAdapter):
+        def send(self, request, **kwargs):
+            if kwargs.get('timeout') is None:
+                kwargs['timeout'] = default_timeout
+            response = super().send(request, **kwargs)
+            # Raised here, before the SDK tries to parse a proxy's HTML error page as JSON
+            if response.status_code >= 500:
+                raise GatewayServerError(f"Gateway returned HTTP {response.status_code}")
+            return response
+
+    session = requests.Session()
+    adapter = TimeoutHTTPAdapter(
+        pool_connections=pool_connections or get_gateway_setting('POOL_CONNECTIONS', 4),
+        pool_maxsize=pool_maxsize or get_gateway_setting('POOL_MAXSIZE', 20),
+        max_retries=0,  # Retries are decided per call by RazorpayGateway
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class RazorpayGateway(BaseGateway):
+    def __init__(self, key_id=None, key_secret=None, session=None, retry=None, breaker=None):
+        import razorpay
+
+        self.key_id = key_id or settings.RAZORPAY_KEY_ID
+        self.key_secret = key_secret or settings.RAZORPAY_KEY_SECRET
+        self.client = razorpay.Client(session=session or build_session(), auth=(self.key_id, self.key_secret))
+        self.retry = retry or retry_from_settings()
+        self.breaker = breaker or breaker_from_settings()
+
+    def is_transient(self, error):
+        """Whether a failure is the gateway's (timeouts, connection errors, 5xx, unparseable bodies) and counts against the breaker."""
+        import razorpay
+        import requests
+
+        return isinstance(error, (
+            requests.ConnectionError, requests.Timeout, razorpay.errors.ServerError, razorpay.errors.GatewayError,
+            GatewayServerError, json.JSONDecodeError, requests.exceptions.JSONDecodeError,
+        ))
+
+    def can_retry(self, error, idempotent):
+        import requests
+
+        # A write is only repeated if the request never reached the gateway
+        return idempotent or isinstance(error, requests.ConnectTimeout)
+
+    def call(self, operation, *args, idempotent=True, **kwargs):
+        for attempt in itertools.count():
+            if not self.breaker.allow():
+                raise GatewayUnavailable('Payment gateway is temporarily unavailable.')
+            try:
+                result = operation(*args, **kwargs)
+            except Exception as e:
+                if not self.is_transient(e):
+                    # Client errors (bad request, auth) say nothing about gateway health
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                if not self.can_retry(e, idempotent) or attempt >= self.retry.max_retries:
+                    raise GatewayUnavailable(f'Payment gateway request failed: {e}') from e
+                time.sleep(self.retry.delay(attempt))
+                continue
+            finally:
+                self.breaker.end_call()
+            self.breaker.record_success()
+            return result
+
+    def create_order(self, order_data):
+        return self.call(self.client.order.create, data=order_data, idempotent=False)
+
+    def fetch_order(self, order_id):
+        return self.call(self.client.order.fetch, order_id)
+
+    def fetch_order_payments(self, order_id):
+        return self.call(self.client.order.payments, order_id).get('items', [])
+
+    def fetch_payment(self, payment_id):
+        return self.call(self.client.payment.fetch, payment_id)
+
+
+# --- In-memory fake ---
+
+class FakeGateway(BaseGateway):
+    """In-memory gateway for tests, benchmarks and local reconciliation runs.
+
+    Orders created through it are stored; `capture`/`fail` simulate checkout.
+    Orders it has never seen get a deterministic outcome from a hash of their ID
+    (roughly 60% captured, 20% failed, 20% never paid), so reconciliation can run
+    against a copy of real data. `latency` and `failure_rate` simulate a slow or
+    flaky gateway.
+    """
+
+    key_id = 'rzp_test_fake'
+    key_secret = 'fake_secret'
+
+    def __init__(self, latency=0.0, failure_rate=0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.orders = {}
+        self.payments = {}
+        self.counter = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def simulate(self):
+        if self.latency:
+            time.sleep(self.latency)
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise GatewayUnavailable('Simulated gateway failure.')
+
+    def create_order(self, order_data):
+        self.simulate()
+        with self.lock:
+            order_id = f"order_fake{next(self.counter):010d}"
+            order = self.orders[order_id] = {
+                'id': order_id, 'entity': 'order', 'status': 'created',
+                'amount': order_data['amount'], 'currency': order_data.get('currency', 'INR'),
+                'notes': order_data.get('notes', {}), 'created_at': int(time.time()),
+            }
+            self.payments[order_id] = []
+        return dict(order)
+
+    def add_payment(self, order_id, status):
+        with self.lock:
+            payment_id = f"pay_fake{next(self.counter):010d}"
+            payment = {'id': payment_id, 'entity': 'payment', 'order_id': order_id, 'status': status, 'method': 'upi'}
+            self.payments.setdefault(order_id, []).append(payment)
+            if order_id in self.orders:
+                self.orders[order_id]['status'] = 'paid' if status == 'captured' else 'attempted'
+        return payment
+
+    def capture(self, order_id):
+        return self.add_payment(order_id, 'captured')
+
+    def fail(self, order_id):
+        return self.add_payment(order_id, 'failed')
+
+    def sign(self, order_id, payment_id):
+        """Checkout signature as the real gateway would produce it."""
+        return hmac.new(self.key_secret.encode(), f"{order_id}|{payment_id}".encode(), hashlib.sha256).hexdigest()
+
+    def derived_payments(self, order_id):
+        bucket = int(hashlib.sha256(order_id.encode()).hexdigest()[:8], 16) % 10
+        if bucket >= 8:
+            return []
+        status = 'captured' if bucket < 6 else 'failed'
+        return [{
+            'id': f"pay_fake_{hashlib.sha1(order_id.encode()).hexdigest()[:14]}",
+            'entity': 'payment', 'order_id': order_id, 'status': status, 'method': 'upi',
+        }]
+
+    def fetch_order(self, order_id):
+        self.simulate()
+        if order_id in self.orders:
+            return dict(self.orders[order_id])
+        payments = self.derived_payments(order_id)
+        status = 'created' if not payments else 'paid' if payments[0]['status'] == 'captured' else 'attempted'
+        return {'id': order_id, 'entity': 'order', 'status': status}
+
+    def fetch_order_payments(self, order_id):
+        self.simulate()
+        if order_id in self.payments:
+            return [dict(payment) for payment in self.payments[order_id]]
+        return self.derived_payments(order_id)
+
+    def fetch_payment(self, payment_id):
+        self.simulate()
+        for payments in self.payments.values():
+            for payment in payments:
+                if payment['id'] == payment_id:
+                    return dict(payment)
+        raise GatewayUnavailable(f'Unknown payment {payment_id}.')
+
+
+def get_gateway(name=None, **kwargs):
+    """Process-wide gateway (shared connection pool and breaker); kwargs build a separate instance."""
+    name = name or get_gateway_setting('BACKEND', 'razorpay')
+    if kwargs:
+        return build_gateway(name, **kwargs)
+    with _gateways_lock:
+        gateway = _gateways.get(name)
+        if gateway is None:
+            gateway = _gateways[name] = build_gateway(name)
+        return gateway
+
+
+def build_gateway(name, **kwargs):
+    if name == 'fake':
+        return FakeGateway(
+            latency=kwargs.get('latency', get_gateway_setting('FAKE_LATENCY_SECONDS', 0.0)),
+            failure_rate=kwargs.get('failure_rate', 0.0),
+        )
+    if name == 'razorpay':
+        return RazorpayGateway(**kwargs)
+    raise ValueError(f"Unknown payment gateway: {name}")
+
+
+# --- Async variant ---
+
+class AsyncRazorpayGateway:
+    """Razorpay REST API over aiohttp; create one per event loop (see get_async_gateway)."""
+
+    def __init__(self, key_id=None, key_secret=None, base_url=RAZORPAY_API_URL, retry=None, breaker=None):
+        self.key_id = key_id or settings.RAZORPAY_KEY_ID
+        self.key_secret = key_secret or settings.RAZORPAY_KEY_SECRET
+        self.base_url = base_url
+        self.retry = retry or retry_from_settings()
+        self.breaker = breaker or breaker_from_settings()
+        self.session = None
+
+    def get_session(self):
+        import aiohttp
+
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=get_gateway_setting('POOL_MAXSIZE', 20),
+                    ttl_dns_cache=300,
+                ),
+                timeout=aiohttp.ClientTimeout(
+                    total=None,
+                    sock_connect=get_gateway_setting('CONNECT_TIMEOUT_SECONDS', 3.05),
+                    sock_read=get_gateway_setting('READ_TIMEOUT_SECONDS', 10),
+                ),
+                headers={
+                    'Authorization': 'Basic ' + base64.b64encode(f"{self.key_id}:{self.key_secret}".encode()).decode(),
+                },
+            )
+        return self.session
+
+    async def request(self, method, path, json_data=None, idempotent=True):
+        import aiohttp
+
+        for attempt in itertools.count():
+            if not self.breaker.allow():
+                raise GatewayUnavailable('Payment gateway is temporarily unavailable.')
+            sent = False
+            try:
+                async with self.get_session().request(method, f"{self.base_url}{path}", json=json_data) as response:
+                    sent = True
+                    # A 5xx is the gateway's failure whatever its body (often a proxy's HTML page)
+                    if response.status >= 500:
+                        raise aiohttp.ClientResponseError(
+                            response.request_info, response.history, status=response.status,
+                            message=(await response.text(errors='replace'))[:200]
+                        )
+                    body = await response.json(content_type=None)
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                # ValueError: a body that is not JSON
+                self.breaker.record_failure()
+                # Writes are repeated only if the request never reached the gateway
+                retryable = idempotent or (not sent and isinstance(e, (aiohttp.ClientConnectorError, asyncio.TimeoutError)))
+                if not retryable or attempt >= self.retry.max_retries:
+                    raise GatewayUnavailable(f'Payment gateway request failed: {e}') from e
+                await asyncio.sleep(self.retry.delay(attempt))
+                continue
+            finally:
+                self.breaker.end_call()
+            self.breaker.record_success()
+            if response.status >= 400:
+                error = (body or {}).get('error', {}) if isinstance(body, dict) else {}
+                raise GatewayRequestError(error.get('description') or f'Gateway returned HTTP {response.status}')
+            return body
+
+    async def create_order(self, order_data):
+        return await self.request('POST', '/orders', json_data=order_data, idempotent=False)
+
+    async def fetch_order(self, order_id):
+        return await self.request('GET', f'/orders/{order_id}')
+
+    async def fetch_order_payments(self, order_id):
+        return (await self.request('GET', f'/orders/{order_id}/payments')).get('items', [])
+
+    async def fetch_payment(self, payment_id):
+        return await self.request('GET', f'/payments/{payment_id}')
+
+    def verify_payment_signature(self, order_id, payment_id, signature):
+        return signature_matches(self.key_secret, f"{order_id}|{payment_id}", signature)
+
+    async def close(self):
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+
+
+class AsyncFakeGateway:
+    """Async wrapper around FakeGateway; latency is awaited instead of blocking the loop."""
+
+    def __init__(self, latency=0.0, failure_rate=0.0):
+        self.latency = latency
+        self.fake = FakeGateway(failure_rate=failure_rate)
+        self.key_id = self.fake.key_id
+
+    async def run(self, method, *args):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return getattr(self.fake, method)(*args)
+
+    async def create_order(self, order_data):
+        return await self.run('create_order', order_data)
+
+    async def fetch_order(self, order_id):
+        return await self.run('fetch_order', order_id)
+
+    async def fetch_order_payments(self, order_id):
+        return await self.run('fetch_order_payments', order_id)
+
+    async def fetch_payment(self, payment_id):
+        return await self.run('fetch_payment', payment_id)
+
+    def verify_payment_signature(self, order_id, payment_id, signature):
+        return self.fake.verify_payment_signature(order_id, payment_id, signature)
+
+    async def close(self):
+        pass
+
+
+def get_async_gateway(name=None):
+    """Gateway shared by all coroutines on the running event loop (aiohttp sessions are loop-bound)."""
+    name = name or get_gateway_setting('BACKEND', 'razorpay')
+    key = (name, id(asyncio.get_running_loop()))
+    gateway = _async_gateways.get(key)
+    if gateway is None:
+        if name == 'fake':
+            gateway = AsyncFakeGateway(latency=get_gateway_setting('FAKE_LATENCY_SECONDS', 0.0))
+        elif name == 'razorpay':
+            gateway = AsyncRazorpayGateway()
+        else:
+            raise ValueError(f"Unknown payment gateway: {name}")
+        _async_gateways[key] = gateway
+    return gateway
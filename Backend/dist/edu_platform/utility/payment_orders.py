@@ -0,0 +1,199 @@
+"""
+Idempotent gateway order creation.
+
+A student has at most one open (pending) subscription per course. Its gateway
+order is reused while the (student, course, batch, amount) it was created for
+is unchanged and it is younger than ORDER_REUSE_SECONDS, so double clicks and
+retries return the same order instead of creating orphans. The subscription
+row is locked only while deciding; the gateway call runs outside the
+transaction, and its order is stored only if the subscription still holds the
+order it replaces. A concurrent request that loses that race returns the
+winner's order when it is for the same purchase.
+
+Verification runs in one transaction as well: a single ``SELECT ... FOR UPDATE``
+loads the enrollment with its subscription and course, and the state change is
+made with conditional UPDATEs. Concurrent verify calls (and webhooks) serialize
+on the subscription row, and exactly one of them completes it.
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from edu_platform.utility.recording_cache import invalidate_recordings_cache_on_commit
+from edu_platform.utility.revenue_rollup import record_orders, record_completions
+from edu_platform.utility.seat_inventory import commit_seat, release_seat
+from datetime import timedelta
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class AlreadySubscribedError(Exception):
+    """The student completed payment for the course in the meantime."""
+
+
+class OrderConflictError(Exception):
+    """A concurrent checkout for the same course replaced the order; the client should retry."""
+
+
+class SubscriptionNotFoundError(Exception):
+    """No open subscription (with an enrollment) matches the verified order."""
+
+
+class InvalidSignatureError(Exception):
+    """The payment signature does not match the order; the subscription was marked failed."""
+
+
+def get_order_setting(name, default=None):
+    return getattr(settings, 'PAYMENT_ORDER_SETTINGS', {}).get(name, default)
+
+
+def order_fingerprint(student_id, course_id, batch, amount, currency):
+    """Identifies what an order was created for; a change in any part needs a new order."""
+    return hashlib.sha256(f"{student_id}|{course_id}|{batch}|{amount}|{currency}".encode()).hexdigest()
+
+
+def is_reusable(subscription, fingerprint):
+    if not subscription.order_id or subscription.order_fingerprint != fingerprint:
+        return False
+    max_age = timedelta(seconds=get_order_setting('ORDER_REUSE_SECONDS', 30 * 60))
+    return subscription.purchased_at and subscription.purchased_at > timezone.now() - max_age
+
+
+def open_order(create_gateway_order, student, course, batch, price, currency='INR'):
+    """Returns (subscription, order, reused) for a purchase, calling the gateway only when needed.
+
+    `create_gateway_order(order_data)` creates the order at the gateway and
+    returns its response dict. It is called with no transaction open; the new
+    order is stored with a conditional UPDATE on the order it replaces.
+    """
+    from edu_platform.models import CourseSubscription, CourseEnrollment
+
+    amount = int(price * 100)
+    fingerprint = order_fingerprint(student.id, course.id, batch, amount, currency)
+
+    with transaction.atomic():
+        subscription, created = CourseSubscription.objects.select_for_update().get_or_create(
+            student=student,
+            course=course,
+            defaults={
+                'amount_paid': price,
+                'payment_method': 'razorpay',
+                'payment_status': 'pending',
+                'currency': currency,
+            }
+        )
+
+        if subscription.payment_status == 'completed':
+            raise AlreadySubscribedError()
+        if not created and subscription.payment_status == 'pending' and is_reusable(subscription, fingerprint):
+            logger.info(f"Reusing order {subscription.order_id} of subscription {subscription.id} for user {student.id}")
+            return subscription, {'id': subscription.order_id, 'amount': amount, 'currency': currency}, True
+        replaced_order_id = subscription.order_id
+
+    order = create_gateway_order({
+        'amount': amount,
+        'currency': currency,
+        'payment_capture': '1',
+        'notes': {
+            'course_id': str(course.id),
+            'student_id': str(student.id),
+            'student_email': student.email,
+            'batch': batch
+        }
+    })
+
+    with transaction.atomic():
+        # A failed or refunded attempt starts over as a new pending purchase
+        now = timezone.now()
+        stored = (
+            CourseSubscription.objects
+            .filter(id=subscription.id, order_id=replaced_order_id)
+            .exclude(payment_status='completed')
+            .update(
+                order_id=order['id'], order_fingerprint=fingerprint, amount_paid=price,
+                currency=currency, payment_status='pending', purchased_at=now
+            )
+        )
+        if not stored:
+            # A concurrent request stored its order first (or the payment completed)
+            subscription = CourseSubscription.objects.select_for_update().get(id=subscription.id)
+            logger.warning(f"Discarding order {order['id']}: subscription {subscription.id} changed meanwhile")
+            if subscription.payment_status == 'completed':
+                raise AlreadySubscribedError()
+            if subscription.payment_status == 'pending' and is_reusable(subscription, fingerprint):
+                return subscription, {'id': subscription.order_id, 'amount': amount, 'currency': currency}, True
+            raise OrderConflictError()
+
+        subscription.order_id = order['id']
+        subscription.order_fingerprint = fingerprint
+        subscription.amount_paid = price
+        subscription.currency = currency
+        subscription.payment_status = 'pending'
+        subscription.purchased_at = now
+        logger.info(f"Created order {order['id']} for subscription {subscription.id}, user {student.id}, course {course.id}")
+        record_orders([subscription])
+
+        CourseEnrollment.objects.update_or_create(
+            student=student,
+            course=course,
+            subscription=subscription,
+            defaults={'batch': batch}
+        )
+    return subscription, order, False
+
+
+def verify_order(student, subscription_id, order_id, payment_id, payment_response, signature_valid):
+    """Completes a subscription after checkout; returns (enrollment, already_verified).
+
+    Costs one locking SELECT and at most two UPDATEs. Raises
+    SubscriptionNotFoundError or InvalidSignatureError.
+    """
+    from edu_platform.models import CourseSubscription, CourseEnrollment, User
+
+    with transaction.atomic():
+        enrollment = (
+            CourseEnrollment.objects
+            .select_related('subscription', 'subscription__course')
+            .select_for_update(of=('subscription',))
+            .filter(subscription_id=subscription_id, subscription__order_id=order_id, student=student)
+            .order_by('id')
+            .first()
+        )
+        if enrollment is None:
+            raise SubscriptionNotFoundError()
+        subscription = enrollment.subscription
+
+        if subscription.payment_status == 'completed':
+            return enrollment, True
+        if subscription.payment_status not in ('pending', 'failed'):
+            raise SubscriptionNotFoundError()
+
+        if not signature_valid:
+            CourseSubscription.objects.filter(id=subscription.id, payment_status='pending').update(payment_status='failed')
+        else:
+            # A webhook may have marked the attempt failed before the browser returned
+            completed_at = timezone.now()
+            updated = CourseSubscription.objects.filter(id=subscription.id, payment_status__in=['pending', 'failed']).update(
+                payment_id=payment_id,
+                payment_status='completed',
+                payment_response=payment_response,
+                payment_completed_at=completed_at,
+            )
+            User.objects.filter(id=student.id, has_purchased_courses=False).update(has_purchased_courses=True)
+            if updated:
+                record_completions([subscription], completed_at)
+                invalidate_recordings_cache_on_commit()
+                commit_seat(subscription.course_id, enrollment.batch, student.id)
+
+    # Raised outside the transaction so the failed status is kept
+    if not signature_valid:
+        release_seat(subscription.course_id, enrollment.batch, student.id)
+        raise InvalidSignatureError()
+
+    subscription.payment_id = payment_id
+    subscription.payment_status = 'completed'
+    subscription.payment_response = payment_response
+    subscription.payment_completed_at = completed_at
+    return enrollment, False
@@ -0,0 +1,174 @@
+"""
+Reconciliation of pending subscriptions against the payment gateway.
+
+Pending subscriptions older than a grace period are paged through by
+``order_id`` (keyset pagination on its unique index). For each chunk the
+gateway's payments are fetched with a bounded thread pool, then every state
+change of the chunk is applied in one transaction with conditional UPDATEs, so
+a concurrent VerifyPayment call or webhook is never overwritten:
+
+* a captured payment completes the subscription;
+* only failed payments mark it failed;
+* no payment yet, or one still authorised, leaves it pending.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from edu_platform.utility.recording_cache import invalidate_recordings_cache_on_commit
+from edu_platform.utility.revenue_rollup import record_completions
+from edu_platform.utility.seat_inventory import commit_seat
+from datetime import timedelta
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def get_reconciliation_setting(name, default=None):
+    return getattr(settings, 'PAYMENT_RECONCILIATION_SETTINGS', {}).get(name, default)
+
+
+def gateway_state(payments):
+    """Returns ('completed', payment), ('failed', payment) or ('pending', None) for an order's payments."""
+    captured = [payment for payment in payments if payment.get('status') == 'captured']
+    if captured:
+        return 'completed', captured[0]
+    if payments and all(payment.get('status') == 'failed' for payment in payments):
+        return 'failed', payments[-1]
+    return 'pending', None
+
+
+def fetch_states(gateway, order_ids, executor):
+    """{order_id: (state, payment) or Exception}, fetched concurrently."""
+    def fetch(order_id):
+        try:
+            return order_id, gateway_state(gateway.fetch_order_payments(order_id))
+        except Exception as e:
+            return order_id, e
+    return dict(executor.map(fetch, order_ids))
+
+
+def apply_chunk(states, dry_run=False):
+    """Applies gateway states to the chunk's subscriptions in one transaction; returns changes."""
+    from edu_platform.models import CourseSubscription, CourseEnrollment, User
+
+    changes = []
+    with transaction.atomic():
+        subscriptions = CourseSubscription.objects.select_for_update().filter(
+            order_id__in=[order_id for order_id, state in states.items() if not isinstance(state, Exception)],
+            payment_status='pending'
+        ).only('id', 'order_id', 'student_id', 'course_id', 'amount_paid', 'payment_method', 'currency')
+        completed_students = set()
+        completed = []
+        now = timezone.now()
+        for subscription in subscriptions:
+            state, payment = states[subscription.order_id]
+            if state == 'pending':
+                continue
+            changes.append((subscription.id, subscription.order_id, state, payment.get('id')))
+            if dry_run:
+                continue
+            if state == 'completed':
+                updated = CourseSubscription.objects.filter(id=subscription.id, payment_status='pending').update(
+                    payment_status='completed',
+                    payment_id=payment.get('id'),
+                    payment_response={'reconciled': True, 'payment': payment},
+                    payment_completed_at=now,
+                )
+                if updated:
+                    completed.append(subscription)
+                completed_students.add(subscription.student_id)
+            else:
+                CourseSubscription.objects.filter(id=subscription.id, payment_status='pending').update(
+                    payment_status='failed',
+                    payment_response={'reconciled': True, 'payment': payment},
+                )
+        if completed_students:
+            User.objects.filter(id__in=completed_students, has_purchased_courses=False).update(has_purchased_courses=True)
+        record_completions(completed, now)
+        if completed:
+            invalidate_recordings_cache_on_commit()
+            batches = dict(
+                CourseEnrollment.objects.filter(subscription_id__in=[subscription.id for subscription in completed])
+                .values_list('subscription_id', 'batch')
+            )
+            for subscription in completed:
+                if subscription.id in batches:
+                    commit_seat(subscription.course_id, batches[subscription.id], subscription.student_id)
+    return changes
+
+
+def reconcile_pending(gateway, chunk_size=None, concurrency=None, older_than_minutes=None, dry_run=False, limit=None):
+    """Reconciles pending subscriptions; returns a report dict with counts, mismatches and throughput."""
+    from edu_platform.models import CourseSubscription
+
+    chunk_size = chunk_size or get_reconciliation_setting('CHUNK_SIZE', 200)
+    concurrency = concurrency or get_reconciliation_setting('CONCURRENCY', 8)
+    older_than_minutes = older_than_minutes if older_than_minutes is not None else get_reconciliation_setting('OLDER_THAN_MINUTES', 30)
+    cutoff = timezone.now() - timedelta(minutes=older_than_minutes)
+
+    report = {
+        'checked': 0, 'completed': 0, 'failed': 0, 'unchanged': 0, 'errors': 0,
+        'chunks': 0, 'mismatches': [], 'error_orders': [], 'gateway_seconds': 0.0,
+    }
+    started = time.perf_counter()
+    last_order_id = ''
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='reconcile') as executor:
+        while limit is None or report['checked'] < limit:
+            size = chunk_size if limit is None else min(chunk_size, limit - report['checked'])
+            order_ids = list(
+                CourseSubscription.objects.filter(
+                    payment_status='pending', order_id__isnull=False, order_id__gt=last_order_id, purchased_at__lt=cutoff
+                ).order_by('order_id').values_list('order_id', flat=True)[:size]
+            )
+            if not order_ids:
+                break
+            last_order_id = order_ids[-1]
+
+            fetch_started = time.perf_counter()
+            states = fetch_states(gateway, order_ids, executor)
+            report['gateway_seconds'] += time.perf_counter() - fetch_started
+
+            errors = {order_id: e for order_id, e in states.items() if isinstance(e, Exception)}
+            for order_id, e in errors.items():
+                logger.error(f"Reconciliation could not fetch order {order_id}: {e}")
+                report['error_orders'].append(order_id)
+
+            changes = apply_chunk(states, dry_run=dry_run)
+            for subscription_id, order_id, state, payment_id in changes:
+                report[state] += 1
+                report['mismatches'].append({
+                    'subscription_id': subscription_id, 'order_id': order_id,
+                    'local': 'pending', 'gateway': state, 'payment_id': payment_id,
+                })
+            report['checked'] += len(order_ids)
+            report['errors'] += len(errors)
+            report['unchanged'] += len(order_ids) - len(errors) - len(changes)
+            report['chunks'] += 1
+
+    report['elapsed_seconds'] = time.perf_counter() - started
+    report['orders_per_second'] = report['checked'] / report['elapsed_seconds'] if report['elapsed_seconds'] else 0.0
+    if report['checked']:
+        logger.info(
+            f"Reconciled {report['checked']} pending subscriptions: {report['completed']} completed, "
+            f"{report['failed']} failed, {report['errors']} errors in {report['elapsed_seconds']:.1f}s"
+        )
+    return report
+
+
+def reconcile_payments():
+    """Periodic job entry point; one web worker at a time runs it."""
+    from edu_platform.utility.payment_gateway import FakeGateway, get_gateway
+    from edu_platform.utility.redis_services import get_redis
+
+    gateway = get_gateway()
+    # Unknown orders get made-up outcomes from the fake; never apply them to real subscriptions
+    if isinstance(gateway, FakeGateway):
+        logger.warning("Skipping payment reconciliation: PAYMENT_GATEWAY_SETTINGS['BACKEND'] is the fake gateway")
+        return None
+    interval = get_reconciliation_setting('INTERVAL_SECONDS', 900)
+    if not get_redis().set('payments:reconcile:lock', 1, nx=True, ex=interval):
+        return None
+    return reconcile_pending(gateway)
@@ -0,0 +1,192 @@
+"""
+Razorpay webhook inbox.
+
+The webhook view only verifies the HMAC signature and stores the raw event with
+a single ``INSERT ... ON CONFLICT DO NOTHING`` keyed by Razorpay's event ID, so
+bursts cost the web workers one short write per delivery and redeliveries are
+dropped. A periodic job claims pending events in batches
+(``SELECT ... FOR UPDATE SKIP LOCKED``, so several workers can drain the inbox
+together) and applies them with conditional UPDATEs, which makes replaying an
+event, or racing the browser's VerifyPayment call, harmless.
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from edu_platform.utility.recording_cache import invalidate_recordings_cache_on_commit
+from edu_platform.utility.revenue_rollup import record_completions
+from edu_platform.utility.seat_inventory import commit_seat
+import hashlib
+import hmac
+import logging
+
+logger = logging.getLogger(__name__)
+
+CAPTURED_EVENTS = {'payment.captured', 'order.paid'}
+FAILED_EVENTS = {'payment.failed'}
+
+
+def get_webhook_setting(name, default=None):
+    return getattr(settings, 'PAYMENT_WEBHOOK_SETTINGS', {}).get(name, default)
+
+
+def verify_signature(body, signature, secret=None):
+    """Checks X-Razorpay-Signature: hex HMAC-SHA256 of the raw body with the webhook secret."""
+    secret = secret or settings.RAZORPAY_WEBHOOK_SECRET
+    if not secret or not signature:
+        return False
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+def store_event(event_id, payload):
+    """Inserts the event into the inbox; a redelivery of a stored event is a no-op."""
+    from edu_platform.models import PaymentWebhookEvent
+
+    PaymentWebhookEvent.objects.bulk_create([
+        PaymentWebhookEvent(
+            event_id=event_id or None,
+            event_type=str(payload.get('event', ''))[:100],
+            payload=payload,
+        )
+    ], ignore_conflicts=True)
+
+
+def payment_entity(payload):
+    return ((payload.get('payload') or {}).get('payment') or {}).get('entity') or {}
+
+
+def order_entity(payload):
+    return ((payload.get('payload') or {}).get('order') or {}).get('entity') or {}
+
+
+def event_order_id(payload):
+    return payment_entity(payload).get('order_id') or order_entity(payload).get('id')
+
+
+def apply_events(events):
+    """Applies a batch of events to subscriptions and enrollments; returns {event_id: status}."""
+    from edu_platform.models import CourseSubscription, CourseEnrollment, User
+
+    order_ids = {event_order_id(event.payload) for event in events} - {None}
+    subscriptions = {
+        subscription.order_id: subscription
+        for subscription in CourseSubscription.objects.filter(order_id__in=order_ids).only(
+            'id', 'order_id', 'student_id', 'course_id', 'payment_status', 'amount_paid', 'payment_method', 'currency'
+        )
+    }
+
+    results = {}
+    completed = []
+    now = timezone.now()
+    for event in events:
+        order_id = event_order_id(event.payload)
+        subscription = subscriptions.get(order_id)
+        if event.event_type not in CAPTURED_EVENTS | FAILED_EVENTS:
+            results[event.id] = 'ignored'
+            continue
+        if subscription is None:
+            results[event.id] = 'ignored'
+            logger.warning(f"Webhook {event.event_id} ({event.event_type}) for unknown order {order_id}")
+            continue
+
+        payment = payment_entity(event.payload)
+        if event.event_type in CAPTURED_EVENTS:
+            # Conditional: a verified payment or an earlier delivery already completed it
+            updated = CourseSubscription.objects.filter(
+                id=subscription.id, payment_status__in=['pending', 'failed']
+            ).update(
+                payment_status='completed',
+                payment_id=payment.get('id') or F('payment_id'),
+                payment_response=event.payload,
+                payment_completed_at=now,
+            )
+            if updated:
+                # Payment entities carry checkout notes; the order's notes (with the batch) only come with order.paid
+                notes = order_entity(event.payload).get('notes') or payment.get('notes') or {}
+                completed.append((subscription, notes.get('batch')))
+        else:
+            CourseSubscription.objects.filter(id=subscription.id, payment_status='pending').update(
+                payment_status='failed',
+                payment_response=event.payload,
+            )
+        results[event.id] = 'processed'
+
+    if completed:
+        User.objects.filter(
+            id__in={subscription.student_id for subscription, _ in completed}, has_purchased_courses=False
+        ).update(has_purchased_courses=True)
+        # Orders always get an enrollment at creation, which holds the batch
+        batches = dict(
+            CourseEnrollment.objects.filter(subscription_id__in=[subscription.id for subscription, _ in completed])
+            .values_list('subscription_id', 'batch')
+        )
+        # Recreate a missing enrollment from the order notes when the event has them
+        missing = [
+            (subscription, noted_batch) for subscription, noted_batch in completed
+            if subscription.id not in batches and noted_batch
+        ]
+        CourseEnrollment.objects.bulk_create([
+            CourseEnrollment(
+                student_id=subscription.student_id,
+                course_id=subscription.course_id,
+                subscription_id=subscription.id,
+                batch=noted_batch,
+            )
+            for subscription, noted_batch in missing
+        ], ignore_conflicts=True)
+        batches.update({subscription.id: noted_batch for subscription, noted_batch in missing})
+        record_completions([subscription for subscription, _ in completed], now)
+        invalidate_recordings_cache_on_commit()
+        for subscription, _ in completed:
+            if subscription.id in batches:
+                commit_seat(subscription.course_id, batches[subscription.id], subscription.student_id)
+        logger.info(f"Completed {len(completed)} subscriptions from webhooks")
+    return results
+
+
+def process_webhook_events(batch_size=None):
+    """Periodic job: drains the inbox in batches; returns the number of events handled."""
+    from edu_platform.models import PaymentWebhookEvent
+
+    batch_size = batch_size or get_webhook_setting('BATCH_SIZE', 200)
+    max_attempts = get_webhook_setting('MAX_ATTEMPTS', 5)
+    handled = 0
+    retry_later = False
+    while not retry_later:
+        with transaction.atomic():
+            events = list(
+                PaymentWebhookEvent.objects.select_for_update(skip_locked=True)
+                .filter(status='pending')
+                .order_by('id')[:batch_size]
+            )
+            if not events:
+                return handled
+            try:
+                with transaction.atomic():
+                    results = apply_events(events)
+            except Exception as e:
+                # Retry one event per savepoint so a bad delivery only fails itself
+                logger.error(f"Failed to apply {len(events)} webhook events, retrying one at a time: {e}")
+                results = {}
+                for event in events:
+                    try:
+                        with transaction.atomic():
+                            results.update(apply_events([event]))
+                    except Exception as e:
+                        logger.error(f"Failed to apply webhook event {event.id}: {e}")
+                        retry_later = True
+                        PaymentWebhookEvent.objects.filter(id=event.id).update(
+                            attempts=F('attempts') + 1, last_error=str(e)[:1000]
+                        )
+                        PaymentWebhookEvent.objects.filter(id=event.id, attempts__gte=max_attempts).update(status='failed')
+
+            now = timezone.now()
+            for status_value in set(results.values()):
+                PaymentWebhookEvent.objects.filter(
+                    id__in=[event_id for event_id, result in results.items() if result == status_value]
+                ).update(status=status_value, processed_at=now, attempts=F('attempts') + 1)
+        handled += len(results)
+    # Events that failed stay pending until the next run
+    return handled
@@ -0,0 +1,187 @@
+"""
+Write-behind buffering of recording playback progress.
+
+Players send a heartbeat every few seconds. Each heartbeat only writes Redis:
+
+* ``playback:progress:{user_id}`` maps session IDs to ``position|duration|time``
+  (latest heartbeat wins; the hash expires when the user stops watching).
+* ``playback:dirty`` collects ``{user_id}:{session_id}`` pairs not yet flushed.
+* ``playback:grant:{user_id}:{session_id}`` is set when a playback URL is issued,
+  so heartbeats are authorised without a database query.
+
+A periodic job upserts the dirty pairs into ``playback_progress`` with one
+multi-row ``INSERT ... ON CONFLICT`` per batch. Reads merge the database rows
+with newer positions still in Redis.
+"""
+
+from django.conf import settings
+from django.db import connection, transaction
+from edu_platform.utility.redis_services import get_redis
+from datetime import datetime, timezone as dt_timezone
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+DIRTY_PROGRESS_KEY = 'playback:dirty'
+
+UPSERT_SQL = """
+    INSERT INTO playback_progress (user_id, session_id, position_seconds, duration_seconds, completed, updated_at)
+    VALUES {values}
+    ON CONFLICT (user_id, session_id) DO UPDATE SET
+        position_seconds = EXCLUDED.position_seconds,
+        duration_seconds = COALESCE(EXCLUDED.duration_seconds, playback_progress.duration_seconds),
+        completed = playback_progress.completed OR EXCLUDED.completed,
+        updated_at = EXCLUDED.updated_at
+    WHERE playback_progress.updated_at <= EXCLUDED.updated_at
+"""
+
+
+def get_progress_setting(name, default=None):
+    return getattr(settings, 'RECORDING_PLAYBACK_SETTINGS', {}).get(name, default)
+
+
+def progress_key(user_id):
+    return f'playback:progress:{user_id}'
+
+
+def grant_key(user_id, session_id):
+    return f'playback:grant:{user_id}:{session_id}'
+
+
+def encode_progress(position, duration, timestamp):
+    return f"{position:.3f}|{'' if duration is None else f'{duration:.3f}'}|{timestamp:.3f}"
+
+
+def decode_progress(value):
+    position, duration, timestamp = value.split('|')
+    return float(position), float(duration) if duration else None, float(timestamp)
+
+
+def is_completed(position, duration):
+    return bool(duration) and position >= duration * get_progress_setting('COMPLETED_RATIO', 0.95)
+
+
+def grant_progress(user_id, session_id, ttl):
+    """Allows heartbeats for this user and session; called when a playback URL is issued."""
+    get_redis().set(grant_key(user_id, session_id), 1, ex=ttl)
+
+
+def record_progress(user_id, session_id, position, duration=None):
+    """Buffers a heartbeat; returns False if the user has no playback grant for the session."""
+    client = get_redis()
+    if not client.exists(grant_key(user_id, session_id)):
+        return False
+    key = progress_key(user_id)
+    pipe = client.pipeline(transaction=False)
+    pipe.hset(key, session_id, encode_progress(position, duration, time.time()))
+    pipe.expire(key, get_progress_setting('PROGRESS_TTL_SECONDS', 7 * 24 * 3600))
+    pipe.sadd(DIRTY_PROGRESS_KEY, f'{user_id}:{session_id}')
+    pipe.execute()
+    return True
+
+
+def _to_datetime(timestamp):
+    return datetime.fromtimestamp(timestamp, tz=dt_timezone.utc)
+
+
+def get_resume_positions(user_id, session_ids):
+    """{session_id: {position, duration, completed, updated_at}} for the user's sessions."""
+    from edu_platform.models import PlaybackProgress
+
+    session_ids = list(session_ids)
+    if not session_ids:
+        return {}
+    positions = {
+        row['session_id']: {
+            'position': row['position_seconds'],
+            'duration': row['duration_seconds'],
+            'completed': row['completed'],
+            'updated_at': row['updated_at'],
+        }
+        for row in PlaybackProgress.objects.filter(user_id=user_id, session_id__in=session_ids).values(
+            'session_id', 'position_seconds', 'duration_seconds', 'completed', 'updated_at'
+        )
+    }
+    try:
+        buffered = get_redis().hmget(progress_key(user_id), session_ids)
+    except Exception as e:
+        logger.error(f"Failed to read buffered playback progress for user {user_id}: {e}")
+        return positions
+
+    for session_id, value in zip(session_ids, buffered):
+        if not value:
+            continue
+        position, duration, timestamp = decode_progress(value)
+        updated_at = _to_datetime(timestamp)
+        stored = positions.get(session_id)
+        if stored and stored['updated_at'] >= updated_at:
+            continue
+        duration = duration if duration is not None else (stored or {}).get('duration')
+        positions[session_id] = {
+            'position': position,
+            'duration': duration,
+            'completed': bool(stored and stored['completed']) or is_completed(position, duration),
+            'updated_at': updated_at,
+        }
+    return positions
+
+
+def upsert_progress(rows):
+    """Writes (user_id, session_id, position, duration, completed, updated_at) rows to playback_progress."""
+    if not rows:
+        return
+    placeholders = ', '.join(['(%s, %s, %s, %s, %s, %s)'] * len(rows))
+    params = [value for row in rows for value in row]
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(UPSERT_SQL.format(values=placeholders), params)
+
+
+def flush_progress(batch_size=None):
+    """Moves buffered positions from Redis into playback_progress; returns rows written."""
+    from edu_platform.models import ClassSession, User
+
+    batch_size = batch_size or get_progress_setting('PROGRESS_FLUSH_BATCH_SIZE', 1000)
+    client = get_redis()
+    written = 0
+    while True:
+        members = client.spop(DIRTY_PROGRESS_KEY, batch_size)
+        if not members:
+            return written
+
+        pairs = [tuple(int(part) for part in member.split(':', 1)) for member in members]
+        pipe = client.pipeline(transaction=False)
+        for user_id, session_id in pairs:
+            pipe.hget(progress_key(user_id), session_id)
+        values = pipe.execute()
+
+        durations = dict(
+            ClassSession.objects.filter(id__in={session_id for _, session_id in pairs})
+            .values_list('id', 'recording_duration')
+        )
+        user_ids = set(User.objects.filter(id__in={user_id for user_id, _ in pairs}).values_list('id', flat=True))
+
+        rows = []
+        for (user_id, session_id), value in zip(pairs, values):
+            # Expired from Redis, or the session/user was deleted since the heartbeat
+            if not value or session_id not in durations or user_id not in user_ids:
+                continue
+            position, duration, timestamp = decode_progress(value)
+            duration = duration if duration is not None else durations[session_id]
+            rows.append((
+                user_id,
+                session_id,
+                position,
+                duration,
+                is_completed(position, duration),
+                _to_datetime(timestamp),
+            ))
+
+        try:
+            upsert_progress(rows)
+        except Exception:
+            # Positions are still in the per-user hashes; mark them dirty again
+            client.sadd(DIRTY_PROGRESS_KEY, *members)
+            raise
+        written += len(rows)
+        logger.info(f"Flushed {len(rows)} playback progress rows")
@@ -0,0 +1,45 @@
+"""
+In-process token buckets for throttling WebSocket clients.
+"""
+
+import time
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `capacity`."""
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+
+    def consume(self, tokens=1):
+        """Takes `tokens` if available; returns False when the caller is over budget."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+
+
+class MessageRateLimiter:
+    """Keeps one TokenBucket per message type for a single connection."""
+
+    def __init__(self, limits):
+        # limits: {message_type: (tokens_per_second, burst)}, with an optional 'default'
+        self.limits = limits
+        self.buckets = {}
+
+    def allow(self, message_type):
+        """Returns True if a message of this type fits the connection's budget."""
+        key = message_type if message_type in self.limits else 'default'
+        if key not in self.limits:
+            return True
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            rate, burst = self.limits[key]
+            bucket = self.buckets[key] = TokenBucket(rate, burst)
+        return bucket.consume()
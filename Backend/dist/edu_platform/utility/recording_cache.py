@@ -0,0 +1,72 @@
+"""
+Per-user cache of the recordings listing.
+
+Entries are keyed by user, role, host and query parameters and include a
+global version number; bumping the version invalidates every user's entry at
+once without having to find them. It is bumped when a recording is uploaded or
+processed, when a session, schedule, course or enrollment is saved or deleted
+(signals), and when a payment completes through a conditional UPDATE, which
+sends no signal but grants the student access to the batch's recordings.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+import hashlib
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'recordings:list:version'
+
+
+def get_cache_timeout():
+    return getattr(settings, 'RECORDING_LIST_CACHE_SECONDS', 300)
+
+
+def new_version():
+    # Time-based so a version recreated after eviction never reuses an old number
+    return time.time_ns() // 1_000_000
+
+
+def get_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, new_version(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def recordings_cache_key(user, params, host):
+    """Builds the cache key for one user's view of the listing."""
+    filters = '&'.join(f'{name}={params[name]}' for name in sorted(params))
+    digest = hashlib.sha1(f'{host}|{filters}'.encode()).hexdigest()
+    return f'recordings:list:{get_version()}:{user.id}:{user.role}:{digest}'
+
+
+def invalidate_recordings_cache():
+    """Drops every cached listing; called when recordings are added, replaced or processed."""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        # Key missing (evicted or never set)
+        cache.add(VERSION_KEY, new_version(), timeout=None)
+    except Exception as e:
+        logger.error(f"Failed to invalidate recordings cache: {e}")
+
+
+def invalidate_recordings_cache_on_commit(**kwargs):
+    """Bumps the version once the surrounding transaction commits (signal receiver)."""
+    transaction.on_commit(invalidate_recordings_cache)
+
+
+def connect_recording_cache_signals():
+    from django.db.models.signals import post_save, post_delete
+    from edu_platform.models import ClassSession, ClassSchedule, Course, CourseEnrollment
+
+    for model in (ClassSession, ClassSchedule, Course, CourseEnrollment):
+        post_save.connect(invalidate_recordings_cache_on_commit, sender=model,
+                          dispatch_uid=f'recordings_cache_saved_{model.__name__}')
+        post_delete.connect(invalidate_recordings_cache_on_commit, sender=model,
+                            dispatch_uid=f'recordings_cache_deleted_{model.__name__}')
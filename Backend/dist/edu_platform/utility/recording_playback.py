@@ -0,0 +1,147 @@
+"""
+Recording playback.
+
+Video elements cannot send the JWT header and issue many Range requests while
+seeking, so entitlement is checked once by the playback endpoint, which hands
+out a signed, expiring stream URL. The stream endpoint trusts only the
+signature: for object storage it redirects to a presigned URL; for local files
+it either tells the front server to send the file (``X-Accel-Redirect``) or
+serves the requested byte range itself through ``FileResponse`` so WSGI servers
+can use ``sendfile``.
+"""
+
+from django.conf import settings
+from django.core import signing
+from django.http import FileResponse, HttpResponse, HttpResponseRedirect
+from django.utils.http import http_date
+from edu_platform.utility.media_storage import has_local_path, presigned_url
+from urllib.parse import quote
+import mimetypes
+import os
+import re
+
+PLAYBACK_SALT = 'edu_platform.recording_playback'
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(ValueError):
+    pass
+
+
+def get_playback_setting(name, default=None):
+    return getattr(settings, 'RECORDING_PLAYBACK_SETTINGS', {}).get(name, default)
+
+
+def make_playback_token(session, user):
+    """Signs the recording a user is entitled to; the stream endpoint needs nothing else."""
+    return signing.dumps(
+        {'s': session.id, 'u': user.id, 'f': session.recording.name},
+        salt=PLAYBACK_SALT,
+        compress=True,
+    )
+
+
+def read_playback_token(token):
+    """Returns the signed payload; raises signing.BadSignature (or SignatureExpired)."""
+    return signing.loads(token, salt=PLAYBACK_SALT, max_age=get_playback_setting('TOKEN_MAX_AGE_SECONDS', 4 * 3600))
+
+
+def parse_range(header, size):
+    """Parses a single ``bytes=`` range into inclusive (start, end).
+
+    Returns None when the whole file should be sent (no header, or a multi-range
+    request, which RFC 9110 allows a server to ignore).
+    """
+    if not header:
+        return None
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable()
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise RangeNotSatisfiable()
+    return start, end
+
+
+class FileRange:
+    """Read-limited view of an open file starting at `start`.
+
+    Keeps ``fileno`` so a WSGI ``file_wrapper`` can sendfile() from the current
+    offset for Content-Length bytes; otherwise it is read in blocks.
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        size = self.remaining if size is None or size < 0 else min(size, self.remaining)
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def accel_redirect_response(name, content_type):
+    """Lets nginx serve the file (with its own Range support) from an internal location."""
+    response = HttpResponse(content_type=content_type)
+    response['X-Accel-Redirect'] = get_playback_setting('ACCEL_REDIRECT_PREFIX').rstrip('/') + '/' + quote(name)
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def file_response(request, path, content_type):
+    """Serves the whole file or a single byte range."""
+    stat = os.stat(path)
+    size = stat.st_size
+    try:
+        byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+    except RangeNotSatisfiable:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if byte_range is None:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = FileResponse(FileRange(open(path, 'rb'), start, length), status=206, content_type=content_type)
+        response['Content-Length'] = str(length)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    return response
+
+
+def build_stream_response(request, storage, name):
+    """Chooses between a presigned object-storage redirect, X-Accel-Redirect and the in-process range response."""
+    if not has_local_path(storage):
+        return HttpResponseRedirect(presigned_url(storage, name, expire=get_playback_setting('TOKEN_MAX_AGE_SECONDS')))
+
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    if get_playback_setting('ACCEL_REDIRECT_PREFIX'):
+        response = accel_redirect_response(name, content_type)
+    else:
+        response = file_response(request, storage.path(name), content_type)
+    # Signed URLs are per user; keep them out of shared caches
+    response['Cache-Control'] = 'private, max-age=3600'
+    return response
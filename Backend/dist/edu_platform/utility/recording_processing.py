@@ -0,0 +1,309 @@
+"""
+Post-upload processing of class recordings.
+
+When a recording is attached its session is marked ``pending``. The session is
+then claimed with a conditional UPDATE that stores a claim token and a lease (so
+only one web worker, in any process, submits it) and the file is handed to a
+process pool, where a worker computes the size and a streaming SHA-256, probes
+the media and extracts poster frames through the configured transcoder. The
+worker never touches the database; its result is stored by a callback in the
+parent, only if the session still holds the same recording and claim.
+
+The claiming process renews its leases while the work runs. A periodic job
+resubmits pending sessions and reclaims ones whose lease was not renewed
+because the process holding it died.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+from django.utils import timezone
+from edu_platform.utility.transcoders import get_transcoder
+from edu_platform.utility.recording_cache import invalidate_recordings_cache
+from edu_platform.utility.media_storage import has_local_path, presigned_url
+from edu_platform.utility.media_dedup import retain_media, release_media
+from datetime import timedelta
+from functools import partial
+import hashlib
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from urllib.request import urlopen
+
+logger = logging.getLogger(__name__)
+
+POSTER_UPLOAD_DIR = 'recording_posters'
+
+_executor = None
+_executor_lock = threading.Lock()
+# {session_id: claim token} of the claims this process renews
+_leases = {}
+_lease_thread = None
+
+
+def get_processing_setting(name, default=None):
+    return getattr(settings, 'RECORDING_PROCESSING_SETTINGS', {}).get(name, default)
+
+
+def get_executor():
+    """Returns the process pool, created on first use.
+
+    Workers are spawned rather than forked so they don't inherit the web
+    process's database connections and threads.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=get_processing_setting('WORKERS', 2),
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _executor
+
+
+# --- Worker side: file work only ---
+
+def open_source(source):
+    """Opens a local path, or streams an http(s) URL (presigned object-storage GET)."""
+    if source.startswith(('http://', 'https://')):
+        return urlopen(source)
+    return open(source, 'rb')
+
+
+def sha256_file(source, buffer_size=4 * 1024 * 1024):
+    """Hashes a file in fixed-size reads into a reused buffer; returns (hexdigest, size)."""
+    hasher = hashlib.sha256()
+    buffer = bytearray(buffer_size)
+    view = memoryview(buffer)
+    size = 0
+    with open_source(source) as f:
+        while True:
+            read = f.readinto(buffer)
+            if not read:
+                break
+            hasher.update(view[:read])
+            size += read
+    return hasher.hexdigest(), size
+
+
+def poster_timestamps(duration, count):
+    """Evenly spaced frame times, avoiding the black first and last frames."""
+    if not duration:
+        return [1.0][:count]
+    return [duration * index / (count + 1) for index in range(1, count + 1)]
+
+
+def process_recording_file(path, options):
+    """Runs in a pool worker and returns everything the database needs.
+
+    `path` is a local file or a presigned URL; ffprobe/ffmpeg read URLs directly.
+    """
+    sha256, size = sha256_file(path, options['hash_buffer_size'])
+    result = {
+        'size': size,
+        'sha256': sha256,
+        'metadata': {},
+        'posters': [],
+        'poster_dir': None,
+        'errors': [],
+    }
+    transcoder = get_transcoder(options['transcoder'], options['timeout'])
+    try:
+        result['metadata'] = transcoder.probe(path)
+    except Exception as e:
+        result['errors'].append(f"probe failed: {e}")
+
+    if options['poster_count']:
+        poster_dir = tempfile.mkdtemp(prefix='recording_posters_')
+        result['poster_dir'] = poster_dir
+        try:
+            result['posters'] = transcoder.extract_posters(
+                path,
+                poster_dir,
+                poster_timestamps(result['metadata'].get('duration'), options['poster_count']),
+                options['poster_width'],
+            )
+        except Exception as e:
+            result['errors'].append(f"poster extraction failed: {e}")
+    return result
+
+
+def recording_source(field_file):
+    """Local path of a recording, or a presigned URL valid for the whole processing window."""
+    if has_local_path(field_file.storage):
+        return field_file.path
+    return presigned_url(field_file.storage, field_file.name, expire=get_processing_setting('STALE_AFTER_MINUTES', 120) * 60)
+
+
+def worker_options():
+    return {
+        'transcoder': get_processing_setting('TRANSCODER', 'auto'),
+        'timeout': get_processing_setting('COMMAND_TIMEOUT_SECONDS', 300),
+        'poster_count': get_processing_setting('POSTER_COUNT', 3),
+        'poster_width': get_processing_setting('POSTER_WIDTH', 640),
+        'hash_buffer_size': get_processing_setting('HASH_BUFFER_SIZE', 4 * 1024 * 1024),
+    }
+
+
+# --- Parent side: claiming and storing results ---
+
+def lease_until():
+    return timezone.now() + timedelta(seconds=get_processing_setting('LEASE_SECONDS', 300))
+
+
+def renew_leases():
+    """Thread loop: extends the leases of this process's claims until they are released."""
+    from django.db import connection
+    from edu_platform.models import ClassSession
+
+    while True:
+        time.sleep(get_processing_setting('LEASE_SECONDS', 300) / 3)
+        try:
+            leases = dict(_leases)
+            if leases:
+                ClassSession.objects.filter(
+                    id__in=list(leases), recording_claim__in=list(leases.values()), recording_status='processing'
+                ).update(recording_lease_until=lease_until())
+        except Exception as e:
+            logger.error(f"Failed to renew recording processing leases: {e}")
+        finally:
+            connection.close()
+
+
+def hold_lease(session_id, claim):
+    global _lease_thread
+    _leases[session_id] = claim
+    with _executor_lock:
+        if _lease_thread is None:
+            _lease_thread = threading.Thread(target=renew_leases, daemon=True, name='RecordingLeaseRenewer')
+            _lease_thread.start()
+
+
+def claim_recording(session_id, statuses=('pending',)):
+    """Marks a session's recording processing for this process; returns the claim token, or None if taken."""
+    from edu_platform.models import ClassSession
+
+    claim = uuid.uuid4().hex
+    claimed = ClassSession.objects.filter(id=session_id, recording_status__in=statuses).exclude(recording='').update(
+        recording_status='processing', recording_claim=claim, recording_lease_until=lease_until(),
+        updated_at=timezone.now()
+    )
+    if not claimed:
+        return None
+    hold_lease(session_id, claim)
+    return claim
+
+
+def release_lease(session_id):
+    _leases.pop(session_id, None)
+
+
+def store_results(session_id, recording_name, result, claim):
+    """Saves a worker result if the session still holds the processed recording and our claim."""
+    from django.core.files import File
+    from django.core.files.storage import default_storage
+    from edu_platform.models import ClassSession
+
+    try:
+        current = ClassSession.objects.filter(id=session_id).values('recording', 'recording_posters', 'recording_claim').first()
+        if not current or current['recording'] != recording_name or current['recording_claim'] != claim:
+            logger.info(f"Recording of session {session_id} changed or was reclaimed during processing; result discarded")
+            return False
+
+        posters = []
+        for poster in result['posters']:
+            with open(poster, 'rb') as f:
+                posters.append(default_storage.save(
+                    f"{POSTER_UPLOAD_DIR}/{session_id}/{os.path.basename(poster)}", File(f)
+                ))
+
+        metadata = result['metadata']
+        updated = ClassSession.objects.filter(id=session_id, recording=recording_name, recording_claim=claim).update(
+            recording_size=result['size'],
+            recording_sha256=result['sha256'],
+            recording_duration=metadata.get('duration'),
+            recording_width=metadata.get('width'),
+            recording_height=metadata.get('height'),
+            recording_posters=posters,
+            recording_status='ready',
+            recording_processed_at=timezone.now(),
+            recording_claim='',
+            recording_lease_until=None,
+            updated_at=timezone.now(),
+        )
+        if updated:
+            # Posters are kept in a list rather than FileFields, so count their references here
+            retain_media(posters)
+            release_media(current['recording_posters'] or [])
+        for name in current['recording_posters'] or []:
+            if name not in posters:
+                default_storage.delete(name)
+        for error in result['errors']:
+            logger.warning(f"Recording of session {session_id}: {error}")
+        if updated:
+            invalidate_recordings_cache()
+        return bool(updated)
+    finally:
+        if result.get('poster_dir'):
+            shutil.rmtree(result['poster_dir'], ignore_errors=True)
+
+
+def mark_failed(session_id, recording_name, error, claim):
+    from edu_platform.models import ClassSession
+
+    logger.error(f"Processing recording of session {session_id} failed: {error}")
+    ClassSession.objects.filter(id=session_id, recording=recording_name, recording_claim=claim).update(
+        recording_status='failed', recording_claim='', recording_lease_until=None, updated_at=timezone.now()
+    )
+
+
+def on_processed(session_id, recording_name, claim, future):
+    """Pool callback; runs on the executor's management thread."""
+    from django.db import connection
+
+    try:
+        store_results(session_id, recording_name, future.result(), claim)
+    except Exception as e:
+        mark_failed(session_id, recording_name, e, claim)
+    finally:
+        release_lease(session_id)
+        connection.close()
+
+
+def enqueue_recording(session_id):
+    """Claims a pending recording and submits it to the pool; returns True if submitted."""
+    from edu_platform.models import ClassSession
+
+    claim = claim_recording(session_id)
+    if claim is None:
+        return False
+
+    try:
+        session = ClassSession.objects.only('id', 'recording').get(id=session_id)
+        future = get_executor().submit(process_recording_file, recording_source(session.recording), worker_options())
+    except Exception:
+        release_lease(session_id)
+        raise
+    future.add_done_callback(partial(on_processed, session_id, session.recording.name, claim))
+    return True
+
+
+def process_pending_recordings():
+    """Periodic job: reclaims sessions whose claiming process died and submits pending ones."""
+    from django.db.models import Q
+    from edu_platform.models import ClassSession
+
+    now = timezone.now()
+    # Claims from before leases existed fall back to the age of the row
+    stale_before = now - timedelta(minutes=get_processing_setting('STALE_AFTER_MINUTES', 120))
+    ClassSession.objects.filter(recording_status='processing').filter(
+        Q(recording_lease_until__lt=now) | Q(recording_lease_until__isnull=True, updated_at__lt=stale_before)
+    ).update(recording_status='pending', recording_claim='', recording_lease_until=None, updated_at=now)
+
+    capacity = max(get_processing_setting('WORKERS', 2) * 2 - len(_leases), 0)
+    pending = list(ClassSession.objects.filter(recording_status='pending').values_list('id', flat=True)[:capacity])
+    return sum(1 for session_id in pending if enqueue_recording(session_id))
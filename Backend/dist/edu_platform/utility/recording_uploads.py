@@ -0,0 +1,190 @@
+"""
+Storage side of resumable recording uploads.
+
+Each upload owns a part file ``{TEMP_DIR}/{upload_id}.part``. Chunks are read
+from the request stream in small buffers and written at their offset, hashing as
+they go, so a chunk is never held in memory and a multi-GB recording never
+passes through Django's upload handlers. Bytes only count once the chunk's
+checksum matches and ``received_bytes`` is advanced; anything written past that
+point by a failed chunk is simply overwritten by the retry.
+"""
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from edu_platform.utility.recording_processing import enqueue_recording
+from edu_platform.utility.recording_cache import invalidate_recordings_cache
+from datetime import timedelta
+import base64
+import binascii
+import hashlib
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+CHECKSUM_ALGORITHMS = {
+    'sha256': hashlib.sha256,
+    'md5': hashlib.md5,
+}
+
+
+class ChunkError(ValueError):
+    """A chunk was rejected and ``received_bytes`` was not advanced."""
+
+
+def get_upload_setting(name, default=None):
+    return getattr(settings, 'RECORDING_UPLOAD_SETTINGS', {}).get(name, default)
+
+
+def part_path(upload_id):
+    """Returns the path of the part file for an upload."""
+    temp_dir = get_upload_setting('TEMP_DIR', os.path.join(settings.MEDIA_ROOT, 'recording_uploads'))
+    return os.path.join(temp_dir, f'{upload_id}.part')
+
+
+def parse_checksum(header):
+    """Parses an ``Upload-Checksum: <algorithm>=<hex or base64 digest>`` header.
+
+    Returns (algorithm, digest bytes), or None if no header was sent.
+    """
+    if not header:
+        return None
+    algorithm, _, encoded = header.partition('=')
+    algorithm = algorithm.strip().lower()
+    encoded = encoded.strip()
+    if algorithm not in CHECKSUM_ALGORITHMS or not encoded:
+        raise ChunkError(f"Unsupported Upload-Checksum. Use one of: {', '.join(CHECKSUM_ALGORITHMS)}.")
+    try:
+        if len(encoded) == 2 * CHECKSUM_ALGORITHMS[algorithm]().digest_size:
+            return algorithm, bytes.fromhex(encoded)
+        return algorithm, base64.b64decode(encoded, validate=True)
+    except (binascii.Error, ValueError):
+        raise ChunkError("Upload-Checksum digest must be hex or base64.")
+
+
+def write_chunk(upload_id, offset, stream, length, checksum=None):
+    """Streams `length` bytes from `stream` into the part file at `offset`.
+
+    Raises ChunkError if the body is short or the checksum does not match.
+    """
+    path = part_path(upload_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    hasher = CHECKSUM_ALGORITHMS[checksum[0]]() if checksum else None
+    buffer_size = get_upload_setting('STREAM_BUFFER_SIZE', 1024 * 1024)
+
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o640)
+    with os.fdopen(fd, 'r+b') as part:
+        part.seek(offset)
+        remaining = length
+        while remaining:
+            data = stream.read(min(buffer_size, remaining))
+            if not data:
+                break
+            part.write(data)
+            if hasher:
+                hasher.update(data)
+            remaining -= len(data)
+        part.flush()
+        os.fsync(part.fileno())
+
+    if remaining:
+        raise ChunkError(f"Chunk body ended after {length - remaining} of {length} bytes.")
+    if hasher and hasher.digest() != checksum[1]:
+        raise ChunkError("Chunk checksum does not match; resend it from the same offset.")
+
+
+class AssembledRecording(File):
+    """A completed part file.
+
+    Exposing ``temporary_file_path`` lets FileSystemStorage move the file into
+    place instead of copying it, as it does for large form uploads.
+    """
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def finalize_upload(upload):
+    """Attaches a fully received upload to its session and replaces any previous recording.
+
+    The upload is claimed ('finalizing') with a conditional UPDATE, the file is
+    stored with no transaction open (assembling, hashing or a multipart S3 upload
+    of several GB), and only the final status and path updates take row locks.
+    """
+    from edu_platform.models import ClassSession, RecordingUpload
+
+    path = part_path(upload.id)
+    claimed = RecordingUpload.objects.filter(
+        id=upload.id, status='pending', received_bytes__gte=F('total_size')
+    ).update(status='finalizing', updated_at=timezone.now())
+    if not claimed:
+        upload = RecordingUpload.objects.get(id=upload.id)
+        if upload.status != 'pending':
+            raise ChunkError(f"Upload is already {upload.status}.")
+        raise ChunkError(f"Upload is incomplete: {upload.received_bytes} of {upload.total_size} bytes received.")
+    upload = RecordingUpload.objects.get(id=upload.id)
+
+    try:
+        # Drop bytes a failed trailing chunk may have left past the end
+        os.truncate(path, upload.total_size)
+        session = ClassSession.objects.get(id=upload.session_id)
+        with open(path, 'rb') as part:
+            session.recording.save(os.path.basename(upload.filename), AssembledRecording(part), save=False)
+        stored = session.recording.name
+    except Exception:
+        RecordingUpload.objects.filter(id=upload.id, status='finalizing').update(status='pending', updated_at=timezone.now())
+        raise
+
+    with transaction.atomic():
+        session = ClassSession.objects.select_for_update().get(id=upload.session_id)
+        previous = session.recording.name if session.recording else None
+        session.recording.name = stored
+        session.recording_status = 'pending'
+        session.save(update_fields=['recording', 'recording_status', 'updated_at'])
+        RecordingUpload.objects.filter(id=upload.id, status='finalizing').update(
+            status='completed', completed_at=timezone.now(), updated_at=timezone.now()
+        )
+
+    if os.path.exists(path):
+        os.remove(path)
+    if previous and previous != session.recording.name:
+        try:
+            session.recording.storage.delete(previous)
+        except Exception as e:
+            logger.error(f"Failed to delete replaced recording {previous}: {e}")
+
+    invalidate_recordings_cache()
+    try:
+        enqueue_recording(session.id)
+    except Exception as e:
+        # The periodic job picks the session up later
+        logger.error(f"Failed to queue processing for session {session.id}: {e}")
+    return session
+
+
+def discard_part(upload_id):
+    try:
+        os.remove(part_path(upload_id))
+    except FileNotFoundError:
+        pass
+
+
+def purge_stale_uploads():
+    """Aborts pending or stuck finalizing uploads that have not received a chunk within EXPIRY_HOURS and frees their disk."""
+    from edu_platform.models import RecordingUpload
+
+    cutoff = timezone.now() - timedelta(hours=get_upload_setting('EXPIRY_HOURS', 24))
+    # A finalize whose worker died leaves the upload 'finalizing'; it is aborted the same way
+    statuses = ('pending', 'finalizing')
+    stale_ids = list(
+        RecordingUpload.objects.filter(status__in=statuses, updated_at__lt=cutoff).values_list('id', flat=True)
+    )
+    for upload_id in stale_ids:
+        discard_part(upload_id)
+    if stale_ids:
+        RecordingUpload.objects.filter(id__in=stale_ids, status__in=statuses).update(status='aborted')
+        logger.info(f"Purged {len(stale_ids)} abandoned recording uploads")
+    return len(stale_ids)
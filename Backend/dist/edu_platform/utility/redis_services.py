@@ -0,0 +1,44 @@
+"""
+Redis connection helpers shared by the classroom consumer, views and background jobs.
+
+Clients are looked up by alias in settings.REDIS_URLS ('default', 'presence',
+'cache') so each kind of traffic can live on its own Redis instance.
+"""
+
+from django.conf import settings
+import asyncio
+import redis
+import redis.asyncio as aioredis
+import logging
+
+logger = logging.getLogger(__name__)
+
+_sync_clients = {}
+_async_clients = {}
+
+
+def get_redis_url(alias='default'):
+    """Returns the URL configured for a logical Redis instance."""
+    urls = getattr(settings, 'REDIS_URLS', {})
+    return urls.get(alias) or urls.get('default') or f"redis://{settings.REDIS_HOST}:{settings.REDIS_PORT}/0"
+
+
+def get_redis(alias='default'):
+    """Returns a process-wide synchronous Redis client (connection pooled)."""
+    client = _sync_clients.get(alias)
+    if client is None:
+        client = _sync_clients[alias] = redis.Redis.from_url(get_redis_url(alias), decode_responses=True)
+    return client
+
+
+def get_async_redis(alias='default'):
+    """Returns an asyncio Redis client shared by all connections on the running event loop.
+
+    Sharing the pool avoids opening new Redis connections for every WebSocket;
+    callers must not close the returned client.
+    """
+    key = (alias, id(asyncio.get_running_loop()))
+    client = _async_clients.get(key)
+    if client is None:
+        client = _async_clients[key] = aioredis.Redis.from_url(get_redis_url(alias), decode_responses=True)
+    return client
@@ -0,0 +1,209 @@
+"""
+Daily revenue rollup.
+
+``revenue_daily`` holds one row per (day, course, payment_method, currency)
+with running counts and sums, so revenue reports read a few hundred rows
+instead of aggregating ``course_subscriptions``. It is kept current
+incrementally: every code path that moves a subscription to completed (or
+refunded) adds its delta with an ``INSERT ... ON CONFLICT DO UPDATE`` in the
+same transaction as the conditional UPDATE that made the transition, so each
+transition is counted exactly once. New gateway orders count towards
+``orders_created``, the denominator of the conversion rate.
+
+``rebuild_revenue`` recomputes a date range from the subscriptions (the
+``backfill_revenue`` command). The rebuild counts one order per subscription,
+its latest; retried checkouts counted live since then are not reconstructed,
+and refunds (which have no timestamp of their own) fall on the completion day.
+Days are in the project timezone.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+import logging
+
+logger = logging.getLogger(__name__)
+
+COUNTERS = ('orders_created', 'completed_count', 'gross_amount', 'refunded_count', 'refunded_amount')
+
+UPSERT_SQL = """
+    INSERT INTO revenue_daily (day, course_id, payment_method, currency, {columns}, updated_at)
+    VALUES {values}
+    ON CONFLICT (day, course_id, payment_method, currency) DO UPDATE SET
+        {updates},
+        updated_at = EXCLUDED.updated_at
+"""
+
+REBUILD_SQL = """
+    INSERT INTO revenue_daily (day, course_id, payment_method, currency, {columns}, updated_at)
+    SELECT day, course_id, payment_method, currency,
+           SUM(orders_created), SUM(completed_count), SUM(gross_amount), SUM(refunded_count), SUM(refunded_amount), NOW()
+    FROM (
+        SELECT (purchased_at AT TIME ZONE %(tz)s)::date AS day, course_id, payment_method, currency,
+               1 AS orders_created, 0 AS completed_count, 0 AS gross_amount, 0 AS refunded_count, 0 AS refunded_amount
+        FROM course_subscriptions WHERE order_id IS NOT NULL
+        UNION ALL
+        SELECT (payment_completed_at AT TIME ZONE %(tz)s)::date, course_id, payment_method, currency, 0, 1, amount_paid, 0, 0
+        FROM course_subscriptions WHERE payment_status IN ('completed', 'refunded') AND payment_completed_at IS NOT NULL
+        UNION ALL
+        SELECT (payment_completed_at AT TIME ZONE %(tz)s)::date, course_id, payment_method, currency, 0, 0, 0, 1, amount_paid
+        FROM course_subscriptions WHERE payment_status = 'refunded' AND payment_completed_at IS NOT NULL
+    ) entries
+    WHERE (%(start)s::date IS NULL OR day >= %(start)s::date) AND (%(end)s::date IS NULL OR day <= %(end)s::date)
+    GROUP BY day, course_id, payment_method, currency
+"""
+
+
+def revenue_day(moment):
+    return timezone.localdate(moment) if moment else timezone.localdate()
+
+
+def record_revenue(entries):
+    """Adds deltas to the rollup; entries are (day, course_id, payment_method, currency, {counter: delta})."""
+    totals = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    for day, course_id, payment_method, currency, deltas in entries:
+        row = totals[(day, course_id, payment_method, currency)]
+        for counter, delta in deltas.items():
+            row[counter] += delta
+    if not totals:
+        return
+
+    # One row per key: ON CONFLICT cannot update the same row twice in one statement
+    now = timezone.now()
+    placeholders = ', '.join(['(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)'] * len(totals))
+    params = [
+        value
+        for key, row in totals.items()
+        for value in (*key, *(row[counter] for counter in COUNTERS), now)
+    ]
+    sql = UPSERT_SQL.format(
+        columns=', '.join(COUNTERS),
+        values=placeholders,
+        updates=',\n        '.join(f"{counter} = revenue_daily.{counter} + EXCLUDED.{counter}" for counter in COUNTERS),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def record_orders(subscriptions):
+    """Counts newly created gateway orders (checkouts started)."""
+    record_revenue([
+        (revenue_day(subscription.purchased_at), subscription.course_id, subscription.payment_method,
+         subscription.currency, {'orders_created': 1})
+        for subscription in subscriptions
+    ])
+
+
+def record_completions(subscriptions, completed_at=None):
+    """Counts subscriptions that just moved to completed."""
+    record_revenue([
+        (revenue_day(completed_at or subscription.payment_completed_at), subscription.course_id,
+         subscription.payment_method, subscription.currency,
+         {'completed_count': 1, 'gross_amount': subscription.amount_paid or Decimal('0')})
+        for subscription in subscriptions
+    ])
+
+
+def record_refunds(subscriptions, refunded_at=None):
+    """Counts completed subscriptions that were just refunded."""
+    record_revenue([
+        (revenue_day(refunded_at), subscription.course_id, subscription.payment_method, subscription.currency,
+         {'refunded_count': 1, 'refunded_amount': subscription.amount_paid or Decimal('0')})
+        for subscription in subscriptions
+    ])
+
+
+def rebuild_revenue(start=None, end=None):
+    """Recomputes rollup rows for days in [start, end] (all days when open); returns rows written.
+
+    The table lock makes concurrent incremental updates wait: a transition
+    committed before the rebuild is in its aggregate, and one still in flight
+    adds its delta on top once the rebuild commits.
+    """
+    params = {'tz': settings.TIME_ZONE, 'start': start, 'end': end}
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute('LOCK TABLE revenue_daily IN SHARE ROW EXCLUSIVE MODE')
+        cursor.execute(
+            'DELETE FROM revenue_daily WHERE (%(start)s::date IS NULL OR day >= %(start)s::date) '
+            'AND (%(end)s::date IS NULL OR day <= %(end)s::date)',
+            params
+        )
+        cursor.execute(REBUILD_SQL.format(columns=', '.join(COUNTERS)), params)
+        written = cursor.rowcount
+    logger.info(f"Rebuilt revenue rollup for {start or 'start'}..{end or 'today'}: {written} rows")
+    return written
+
+
+GROUPINGS = {
+    'day': ('day',),
+    'course': ('course_id', 'course__name'),
+    'payment_method': ('payment_method',),
+    'currency': (),
+}
+
+
+def summary_row(row):
+    """Metrics of an aggregated row; amounts stay per currency, never summed across them."""
+    orders, completed = row['orders_created'] or 0, row['completed_count'] or 0
+    gross, refunded = row['gross_amount'] or Decimal('0'), row['refunded_amount'] or Decimal('0')
+    return {
+        'orders_created': orders,
+        'completed_count': completed,
+        'refunded_count': row['refunded_count'] or 0,
+        'gross_amount': gross,
+        'refunded_amount': refunded,
+        'net_amount': gross - refunded,
+        'conversion_rate': round(completed / orders, 4) if orders else None,
+    }
+
+
+def revenue_summary(start, end, group_by='day', course_id=None, currency=None):
+    """Totals per currency and a series grouped by day, course or payment method, from the rollup."""
+    from django.db.models import Sum
+    from edu_platform.models import RevenueDaily
+
+    queryset = RevenueDaily.objects.filter(day__gte=start, day__lte=end)
+    if course_id:
+        queryset = queryset.filter(course_id=course_id)
+    if currency:
+        queryset = queryset.filter(currency=currency.upper())
+    sums = {counter: Sum(counter) for counter in COUNTERS}
+
+    totals = [
+        {'currency': row['currency'], **summary_row(row)}
+        for row in queryset.values('currency').annotate(**sums).order_by('currency')
+    ]
+    keys = GROUPINGS[group_by] + ('currency',)
+    series = [
+        {**{key.replace('__', '_'): row[key] for key in keys}, **summary_row(row)}
+        for row in queryset.values(*keys).annotate(**sums).order_by(*keys)
+    ]
+    return {'totals': totals, 'series': series}
+
+
+# Subscriptions changed through save() (admin edits, refunds) rather than the payment flows
+
+def capture_payment_status(sender, instance, **kwargs):
+    instance._previous_payment_status = None
+    if instance.pk and instance.payment_status in ('completed', 'refunded'):
+        instance._previous_payment_status = (
+            sender.objects.filter(pk=instance.pk).values_list('payment_status', flat=True).first()
+        )
+
+
+def record_status_change(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_payment_status', None)
+    if instance.payment_status == 'completed' and previous != 'completed':
+        record_completions([instance])
+    elif instance.payment_status == 'refunded' and previous == 'completed':
+        record_refunds([instance])
+
+
+def connect_revenue_signals():
+    from django.db.models.signals import pre_save, post_save
+    from edu_platform.models import CourseSubscription
+
+    pre_save.connect(capture_payment_status, sender=CourseSubscription, dispatch_uid='revenue_status_pre')
+    post_save.connect(record_status_change, sender=CourseSubscription, dispatch_uid='revenue_status_post')
@@ -0,0 +1,241 @@
+"""
+Seat inventory for course batches.
+
+A batch's capacity is the sum of ``ClassSchedule.capacity`` over its
+schedules (any schedule without a capacity makes the batch unlimited). During
+checkout, seats are counted and held in Redis rather than by locking rows, so
+a launch-day rush never queues on one hot row:
+
+* ``seats:{course}:{batch}:capacity``: the capacity (-1 = unlimited);
+* ``seats:{course}:{batch}:members``: students with a paid seat (SET);
+* ``seats:{course}:{batch}:holds``: students in checkout (ZSET, scored by
+  the hold's expiry time).
+
+Every step is one Lua script, so the check and the write happen atomically.
+
+* **Reserve:** drops expired holds, then adds a hold only while
+  members + holds < capacity. A hold lasts at least as long as the order it
+  was taken for can be reused (PAYMENT_ORDER_SETTINGS['ORDER_REUSE_SECONDS']),
+  and checkout is told to time out when the hold does.
+* **Commit:** after payment verification, moves the student from the holds to
+  the members. A payment that arrives after its hold lapsed, when the seat was
+  given to someone else, is over capacity. The payment is already captured, so
+  the student is still counted (the inventory must match the enrollments), but
+  the commit is reported as an error and recorded in ``seats:overbooked`` for a
+  refund or a batch move.
+* **Release:** drops the hold. It runs when checkout fails, and a hold nobody
+  releases simply expires.
+
+The inventory is seeded lazily from the database on first use. It is rebuilt
+when a schedule changes or after INVENTORY_TTL_SECONDS. If Redis is down, the
+capacity is checked against the database instead.
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from edu_platform.utility.redis_services import get_redis
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+UNLIMITED = -1
+
+RESERVE_SCRIPT = """
+local capacity = redis.call('GET', KEYS[1])
+if not capacity then return -2 end
+redis.call('ZREMRANGEBYSCORE', KEYS[3], '-inf', ARGV[2])
+if redis.call('SISMEMBER', KEYS[2], ARGV[1]) == 1 then return 1 end
+capacity = tonumber(capacity)
+if capacity >= 0 and not redis.call('ZSCORE', KEYS[3], ARGV[1])
+   and redis.call('SCARD', KEYS[2]) + redis.call('ZCARD', KEYS[3]) >= capacity then
+    return 0
+end
+redis.call('ZADD', KEYS[3], ARGV[3], ARGV[1])
+redis.call('EXPIRE', KEYS[3], ARGV[4])
+return 1
+"""
+
+COMMIT_SCRIPT = """
+local held = tonumber(redis.call('ZSCORE', KEYS[3], ARGV[1]) or '0') > tonumber(ARGV[2])
+redis.call('ZREM', KEYS[3], ARGV[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[3], '-inf', ARGV[2])
+local capacity = redis.call('GET', KEYS[1])
+if not capacity or redis.call('SISMEMBER', KEYS[2], ARGV[1]) == 1 then return 1 end
+capacity = tonumber(capacity)
+local fits = held or capacity < 0
+    or redis.call('SCARD', KEYS[2]) + redis.call('ZCARD', KEYS[3]) < capacity
+redis.call('SADD', KEYS[2], ARGV[1])
+if fits then return 1 end
+redis.call('HSET', KEYS[4], ARGV[3], ARGV[2])
+return 0
+"""
+
+# Hash of "course:batch:student" -> time of commits that went over capacity
+OVERBOOKED_KEY = 'seats:overbooked'
+
+SEED_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then return 0 end
+redis.call('DEL', KEYS[2])
+for i = 3, #ARGV do redis.call('SADD', KEYS[2], ARGV[i]) end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[1])
+redis.call('EXPIRE', KEYS[2], ARGV[1])
+return 1
+"""
+
+
+class BatchFullError(Exception):
+    """Every seat of the batch is taken or held by another checkout."""
+
+
+def get_seat_setting(name, default=None):
+    return getattr(settings, 'SEAT_INVENTORY_SETTINGS', {}).get(name, default)
+
+
+def seat_keys(course_id, batch):
+    prefix = f"seats:{course_id}:{batch}"
+    return [f"{prefix}:capacity", f"{prefix}:members", f"{prefix}:holds"]
+
+
+def hold_seconds():
+    """How long a checkout hold lasts: never shorter than the window an order is reused (and payable) for."""
+    order_reuse = getattr(settings, 'PAYMENT_ORDER_SETTINGS', {}).get('ORDER_REUSE_SECONDS', 30 * 60)
+    return max(get_seat_setting('HOLD_SECONDS', 35 * 60), order_reuse)
+
+
+def batch_capacity(course_id, batch):
+    """Seats in the batch from its schedules; UNLIMITED when any schedule has no capacity."""
+    from edu_platform.models import ClassSchedule
+
+    totals = ClassSchedule.objects.filter(course_id=course_id, batch=batch).aggregate(
+        seats=Sum('capacity'),
+        unlimited=Count('id', filter=Q(capacity__isnull=True)),
+    )
+    if totals['unlimited'] or totals['seats'] is None:
+        return UNLIMITED
+    return totals['seats']
+
+
+def paid_students(course_id, batch):
+    from edu_platform.models import CourseEnrollment
+
+    return list(
+        CourseEnrollment.objects.filter(
+            course_id=course_id, batch=batch, subscription__payment_status='completed'
+        ).values_list('student_id', flat=True)
+    )
+
+
+_scripts = {}
+
+
+def script(name, source):
+    """Registered Lua script (EVALSHA, reloaded by redis-py if Redis restarted)."""
+    if name not in _scripts:
+        _scripts[name] = get_redis().register_script(source)
+    return _scripts[name]
+
+
+def seed_inventory(course_id, batch):
+    """Loads capacity and paid students from the database unless the inventory already exists."""
+    ttl = get_seat_setting('INVENTORY_TTL_SECONDS', 24 * 3600)
+    capacity = batch_capacity(course_id, batch)
+    students = paid_students(course_id, batch) if capacity != UNLIMITED else []
+    script('seed', SEED_SCRIPT)(keys=seat_keys(course_id, batch), args=[ttl, capacity, *students])
+
+
+def invalidate_inventory(course_id, batch):
+    """Forces a reseed on next use (capacity changed); holds in progress are kept."""
+    try:
+        get_redis().delete(seat_keys(course_id, batch)[0])
+    except Exception as e:
+        logger.error(f"Failed to reset seat inventory for course {course_id}, batch {batch}: {e}")
+
+
+def database_has_seat(course_id, batch, student_id):
+    """Fallback while Redis is unavailable: paid seats only, no holds."""
+    capacity = batch_capacity(course_id, batch)
+    if capacity == UNLIMITED:
+        return True
+    students = paid_students(course_id, batch)
+    return student_id in students or len(students) < capacity
+
+
+def reserve_seat(course_id, batch, student_id):
+    """Holds a seat for the student's checkout for hold_seconds(); raises BatchFullError.
+
+    Calling it again for the same student refreshes the hold.
+    """
+    seconds = hold_seconds()
+    now = time.time()
+    try:
+        keys = seat_keys(course_id, batch)
+        args = [student_id, now, now + seconds, seconds * 2]
+        reserved = script('reserve', RESERVE_SCRIPT)(keys=keys, args=args)
+        if reserved == -2:
+            seed_inventory(course_id, batch)
+            reserved = script('reserve', RESERVE_SCRIPT)(keys=keys, args=args)
+    except Exception as e:
+        logger.error(f"Seat inventory unavailable, checking course {course_id} batch {batch} in the database: {e}")
+        reserved = 1 if database_has_seat(course_id, batch, student_id) else 0
+    if reserved == 0:
+        raise BatchFullError()
+    # Holds in the course's other batches (a student switching batch at checkout) are no longer needed
+    for other in get_seat_setting('BATCHES', ['weekdays', 'weekends']):
+        if other != batch:
+            release_seat(course_id, other, student_id)
+
+
+def release_seat(course_id, batch, student_id):
+    """Drops the student's checkout hold; a paid seat is not affected."""
+    try:
+        get_redis().zrem(seat_keys(course_id, batch)[2], student_id)
+    except Exception as e:
+        logger.error(f"Failed to release seat hold of student {student_id} in course {course_id}, batch {batch}: {e}")
+
+
+def commit_seat(course_id, batch, student_id):
+    """Turns the student's hold into a paid seat once the surrounding transaction commits; flags over-capacity commits."""
+    def commit():
+        try:
+            fits = script('commit', COMMIT_SCRIPT)(
+                keys=[*seat_keys(course_id, batch), OVERBOOKED_KEY],
+                args=[student_id, time.time(), f"{course_id}:{batch}:{student_id}"]
+            )
+            if not fits:
+                logger.error(
+                    f"Batch {batch} of course {course_id} is over capacity: student {student_id} paid after "
+                    f"their seat hold lapsed; refund or move them (recorded in {OVERBOOKED_KEY})"
+                )
+        except Exception as e:
+            # The inventory is reseeded from the enrollments when it expires or a schedule changes
+            logger.error(f"Failed to commit seat of student {student_id} in course {course_id}, batch {batch}: {e}")
+    transaction.on_commit(commit)
+
+
+def move_seat(course_id, old_batch, new_batch, student_id):
+    """Moves a paid student to another batch if it has a free seat; raises BatchFullError."""
+    reserve_seat(course_id, new_batch, student_id)
+    commit_seat(course_id, new_batch, student_id)
+
+    def drop_old():
+        try:
+            get_redis().srem(seat_keys(course_id, old_batch)[1], student_id)
+        except Exception as e:
+            logger.error(f"Failed to free seat of student {student_id} in course {course_id}, batch {old_batch}: {e}")
+    transaction.on_commit(drop_old)
+
+
+def schedule_changed(sender, instance, **kwargs):
+    """Capacity of the schedule's batch may have changed; reseed after commit."""
+    course_id, batch = instance.course_id, instance.batch
+    transaction.on_commit(lambda: invalidate_inventory(course_id, batch))
+
+
+def connect_seat_signals():
+    from django.db.models.signals import post_save, post_delete
+    from edu_platform.models import ClassSchedule
+
+    post_save.connect(schedule_changed, sender=ClassSchedule, dispatch_uid='seat_inventory_schedule_saved')
+    post_delete.connect(schedule_changed, sender=ClassSchedule, dispatch_uid='seat_inventory_schedule_deleted')
@@ -0,0 +1,304 @@
+"""
+Transaction exports for finance: CSV, XLSX and PDF.
+
+Every format reads the same ``values_list`` query with
+``.iterator(chunk_size=CHUNK_SIZE)`` (a server-side cursor on PostgreSQL), so
+only one chunk of rows is held at a time, whatever the row count:
+
+* CSV is generated row by row into a ``StreamingHttpResponse``;
+* XLSX uses openpyxl's write-only workbook, which spools rows to a temporary
+  file, and the finished file is streamed back;
+* PDF (and XLSX on request) is rendered by a background job into a stored
+  ``TransactionExport`` file with a presigned download link.
+
+PDF is the exception to constant memory: reportlab's canvas keeps every
+finished page (compressed) until the document is saved, so its memory grows
+with the row count. PDF exports are therefore capped at PDF_MAX_ROWS (checked
+when queued, and enforced while rendering); larger exports must use XLSX or CSV.
+"""
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from datetime import datetime, time as datetime_time, timedelta
+import csv
+import logging
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FIELDS = (
+    ('Subscription ID', 'id'),
+    ('Purchased At', 'purchased_at'),
+    ('Completed At', 'payment_completed_at'),
+    ('Student Email', 'student__email'),
+    ('Student Name', 'student__username'),
+    ('Course', 'course__name'),
+    ('Amount', 'amount_paid'),
+    ('Currency', 'currency'),
+    ('Payment Method', 'payment_method'),
+    ('Status', 'payment_status'),
+    ('Order ID', 'order_id'),
+    ('Payment ID', 'payment_id'),
+)
+HEADERS = [header for header, _ in EXPORT_FIELDS]
+STATUSES = ('pending', 'completed', 'failed', 'refunded')
+XLSX_MAX_ROWS = 1048576 - 1  # Excel's sheet limit, less the header row
+
+
+def get_export_setting(name, default=None):
+    return getattr(settings, 'TRANSACTION_EXPORT_SETTINGS', {}).get(name, default)
+
+
+def parse_bound(value, end=False):
+    """Accepts a date or datetime string; a date as the end bound covers that whole day."""
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Invalid date: {value}")
+        parsed = datetime.combine(day, datetime_time.max if end else datetime_time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def clean_filters(params):
+    """Validated export filters from query or body params; raises ValueError."""
+    filters = {}
+    for key in ('start_date', 'end_date'):
+        if params.get(key):
+            parse_bound(params[key], end=key == 'end_date')
+            filters[key] = params[key]
+    if params.get('status'):
+        status_value = params['status'].lower()
+        if status_value not in STATUSES:
+            raise ValueError(f"Invalid status: {params['status']}")
+        filters['status'] = status_value
+    return filters
+
+
+class ExportTooLarge(ValueError):
+    """More rows match than the format allows (PDF_MAX_ROWS)."""
+
+
+def export_queryset(filters):
+    from edu_platform.models import CourseSubscription
+
+    queryset = CourseSubscription.objects.all()
+    if filters.get('start_date'):
+        queryset = queryset.filter(purchased_at__gte=parse_bound(filters['start_date']))
+    if filters.get('end_date'):
+        queryset = queryset.filter(purchased_at__lte=parse_bound(filters['end_date'], end=True))
+    if filters.get('status'):
+        queryset = queryset.filter(payment_status=filters['status'])
+    return queryset
+
+
+def pdf_max_rows():
+    return get_export_setting('PDF_MAX_ROWS', 50000)
+
+
+def check_pdf_size(filters):
+    """Raises ExportTooLarge when more rows match than a PDF may hold; counts at most PDF_MAX_ROWS + 1."""
+    limit = pdf_max_rows()
+    if export_queryset(filters).order_by()[:limit + 1].count() > limit:
+        raise ExportTooLarge(f"More than {limit} transactions match; export them as XLSX or CSV, or narrow the dates.")
+
+
+def export_rows(filters):
+    """Yields export rows (tuples in EXPORT_FIELDS order), one database chunk at a time."""
+    return (
+        export_queryset(filters).order_by('id')
+        .values_list(*[field for _, field in EXPORT_FIELDS])
+        .iterator(chunk_size=get_export_setting('CHUNK_SIZE', 2000))
+    )
+
+
+def local_naive(value):
+    """Datetimes in the project timezone without tzinfo (spreadsheets can't store offsets)."""
+    if isinstance(value, datetime):
+        return timezone.localtime(value).replace(tzinfo=None)
+    return value
+
+
+def text_cells(row):
+    cells = []
+    for value in row:
+        value = local_naive(value)
+        if value is None:
+            cells.append('')
+        elif isinstance(value, datetime):
+            cells.append(value.strftime('%Y-%m-%d %H:%M:%S'))
+        else:
+            cells.append(str(value))
+    return cells
+
+
+class Echo:
+    """File-like object whose write() returns the line, so csv.writer can feed a generator."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(filters, lines_per_chunk=500):
+    """Yields the CSV export in chunks of a few hundred lines."""
+    writer = csv.writer(Echo())
+    # BOM so Excel opens the file as UTF-8
+    buffer = ['\ufeff' + writer.writerow(HEADERS)]
+    for row in export_rows(filters):
+        buffer.append(writer.writerow(text_cells(row)))
+        if len(buffer) >= lines_per_chunk:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
+
+
+def write_xlsx(filters, fileobj):
+    """Writes the XLSX export to fileobj with a write-only workbook; returns the row count."""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet, sheet_rows, count = None, XLSX_MAX_ROWS, 0
+    for row in export_rows(filters):
+        if sheet_rows >= XLSX_MAX_ROWS:
+            sheet = workbook.create_sheet(f"Transactions {len(workbook.sheetnames) + 1}" if count else 'Transactions')
+            sheet.append(HEADERS)
+            sheet_rows = 0
+        sheet.append([float(value) if field == 'amount_paid' and value is not None else local_naive(value)
+                      for (_, field), value in zip(EXPORT_FIELDS, row)])
+        sheet_rows += 1
+        count += 1
+    if sheet is None:
+        workbook.create_sheet('Transactions').append(HEADERS)
+    workbook.save(fileobj)
+    return count
+
+
+# Landscape A4 column widths in points, in EXPORT_FIELDS order
+PDF_COLUMN_WIDTHS = (45, 72, 72, 110, 80, 100, 50, 35, 55, 50, 60, 60)
+PDF_FONT_SIZE = 6.5
+PDF_LINE_HEIGHT = 9
+
+
+def write_pdf(filters, fileobj):
+    """Draws the PDF export page by page on a reportlab canvas; returns the row count.
+
+    Raises ExportTooLarge past PDF_MAX_ROWS, which bounds the pages held in memory.
+    """
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.pdfgen import canvas
+
+    width, height = landscape(A4)
+    margin = 24
+    pdf = canvas.Canvas(fileobj, pagesize=(width, height), pageCompression=1)
+    pdf.setTitle('Transactions')
+    # Truncate by character count: measuring every cell with stringWidth dominates runtime
+    max_chars = [int(column / (PDF_FONT_SIZE * 0.5)) for column in PDF_COLUMN_WIDTHS]
+    page = 0
+
+    def start_page():
+        nonlocal page
+        page += 1
+        pdf.setFont('Helvetica-Bold', PDF_FONT_SIZE)
+        x = margin
+        for header, column in zip(HEADERS, PDF_COLUMN_WIDTHS):
+            pdf.drawString(x, height - margin, header)
+            x += column
+        pdf.setFont('Helvetica', PDF_FONT_SIZE)
+        pdf.drawRightString(width - margin, margin / 2, f"Page {page}")
+        return height - margin - PDF_LINE_HEIGHT * 1.5
+
+    y = start_page()
+    count, limit = 0, pdf_max_rows()
+    for row in export_rows(filters):
+        if count >= limit:
+            raise ExportTooLarge(f"More than {limit} transactions match; export them as XLSX or CSV.")
+        if y < margin:
+            pdf.showPage()
+            y = start_page()
+        x = margin
+        for cell, column, chars in zip(text_cells(row), PDF_COLUMN_WIDTHS, max_chars):
+            pdf.drawString(x, y, cell if len(cell) <= chars else cell[:chars - 1] + '…')
+            x += column
+        y -= PDF_LINE_HEIGHT
+        count += 1
+    pdf.save()
+    return count
+
+
+WRITERS = {'pdf': write_pdf, 'xlsx': write_xlsx}
+
+
+def download_url(export):
+    from edu_platform.utility.media_storage import presigned_url
+
+    if export.status != 'ready' or not export.file:
+        return None
+    return presigned_url(default_storage, export.file.name, expire=get_export_setting('LINK_EXPIRY_SECONDS', 3600))
+
+
+def run_export(export):
+    """Renders a claimed export into a temporary file and stores it."""
+    with tempfile.TemporaryFile() as output:
+        count = WRITERS[export.file_format](export.filters, output)
+        output.seek(0)
+        export.file.save(f"transactions-{export.id}.{export.file_format}", File(output), save=False)
+    export.row_count = count
+    export.status = 'ready'
+    export.completed_at = timezone.now()
+    export.save(update_fields=['file', 'row_count', 'status', 'completed_at'])
+    logger.info(f"Transaction export {export.id} ready: {count} rows as {export.file_format}")
+
+
+def claim_export():
+    """Marks the oldest pending export running; safe with several workers polling."""
+    from edu_platform.models import TransactionExport
+
+    with transaction.atomic():
+        export = (
+            TransactionExport.objects.select_for_update(skip_locked=True)
+            .filter(status='pending').order_by('created_at').first()
+        )
+        if export is None:
+            return None
+        export.status = 'running'
+        export.started_at = timezone.now()
+        export.save(update_fields=['status', 'started_at'])
+    return export
+
+
+def expire_exports():
+    """Deletes exports older than EXPIRY_HOURS together with their files."""
+    from edu_platform.models import TransactionExport
+
+    cutoff = timezone.now() - timedelta(hours=get_export_setting('EXPIRY_HOURS', 24))
+    for export in TransactionExport.objects.filter(created_at__lt=cutoff).exclude(status='running'):
+        if export.file:
+            export.file.delete(save=False)
+        export.delete()
+
+
+def process_transaction_exports():
+    """Periodic job: renders pending exports one at a time, then drops expired ones."""
+    from edu_platform.models import TransactionExport
+
+    # Exports left running by a worker that died are retried
+    stale = timezone.now() - timedelta(minutes=get_export_setting('STALE_MINUTES', 30))
+    TransactionExport.objects.filter(status='running', started_at__lt=stale).update(status='pending')
+
+    while True:
+        export = claim_export()
+        if export is None:
+            break
+        try:
+            run_export(export)
+        except Exception as e:
+            logger.error(f"Transaction export {export.id} failed: {e}")
+            TransactionExport.objects.filter(id=export.id).update(status='failed', error=str(e)[:1000])
+    expire_exports()
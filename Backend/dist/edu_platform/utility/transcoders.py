@@ -0,0 +1,93 @@
+"""
+Pluggable media backends for recording processing.
+
+A transcoder probes a media file and extracts poster frames. ``FFmpegTranscoder``
+shells out to ffprobe/ffmpeg; ``NullTranscoder`` is used when they are not
+installed and reports nothing, so the rest of the pipeline (size, checksum)
+still runs. Select one with RECORDING_PROCESSING_SETTINGS['TRANSCODER']:
+'auto', 'ffmpeg', 'null', or a dotted path to a BaseTranscoder subclass.
+"""
+
+from django.utils.module_loading import import_string
+import json
+import os
+import shutil
+import subprocess
+
+
+class BaseTranscoder:
+    """Interface used by the recording pipeline."""
+
+    def probe(self, path):
+        """Returns {'duration', 'width', 'height', 'video_codec', 'audio_codec'} (missing keys allowed)."""
+        raise NotImplementedError
+
+    def extract_posters(self, path, output_dir, timestamps, width):
+        """Writes one JPEG per timestamp (seconds) into output_dir; returns the written paths."""
+        raise NotImplementedError
+
+
+class NullTranscoder(BaseTranscoder):
+    """Used when no media tooling is available."""
+
+    def probe(self, path):
+        return {}
+
+    def extract_posters(self, path, output_dir, timestamps, width):
+        return []
+
+
+class FFmpegTranscoder(BaseTranscoder):
+    def __init__(self, ffmpeg='ffmpeg', ffprobe='ffprobe', timeout=300):
+        self.ffmpeg = ffmpeg
+        self.ffprobe = ffprobe
+        self.timeout = timeout
+
+    @staticmethod
+    def available():
+        return bool(shutil.which('ffmpeg') and shutil.which('ffprobe'))
+
+    def probe(self, path):
+        result = subprocess.run(
+            [self.ffprobe, '-v', 'error', '-print_format', 'json', '-show_format', '-show_streams', path],
+            capture_output=True, check=True, timeout=self.timeout,
+        )
+        info = json.loads(result.stdout or b'{}')
+        streams = info.get('streams', [])
+        video = next((s for s in streams if s.get('codec_type') == 'video'), {})
+        audio = next((s for s in streams if s.get('codec_type') == 'audio'), {})
+        duration = info.get('format', {}).get('duration') or video.get('duration')
+        return {
+            'duration': float(duration) if duration else None,
+            'width': video.get('width'),
+            'height': video.get('height'),
+            'video_codec': video.get('codec_name'),
+            'audio_codec': audio.get('codec_name'),
+        }
+
+    def extract_posters(self, path, output_dir, timestamps, width):
+        posters = []
+        for index, timestamp in enumerate(timestamps, start=1):
+            output = os.path.join(output_dir, f'poster_{index}.jpg')
+            # -ss before -i seeks by keyframe index instead of decoding up to the timestamp
+            subprocess.run(
+                [
+                    self.ffmpeg, '-v', 'error', '-y', '-ss', f'{timestamp:.3f}', '-i', path,
+                    '-frames:v', '1', '-vf', f'scale={width}:-2', '-q:v', '3', output,
+                ],
+                capture_output=True, check=True, timeout=self.timeout,
+            )
+            if os.path.exists(output):
+                posters.append(output)
+        return posters
+
+
+def get_transcoder(name='auto', timeout=300):
+    """Builds the configured transcoder."""
+    if name == 'auto':
+        name = 'ffmpeg' if FFmpegTranscoder.available() else 'null'
+    if name == 'ffmpeg':
+        return FFmpegTranscoder(timeout=timeout)
+    if name == 'null':
+        return NullTranscoder()
+    return import_string(name)()
@@ -4,6 +4,7 @@ from rest_framework.views import APIView
 from rest_framework.permissions import IsAdminUser
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework_simplejwt.tokens import RefreshToken
+from edu_platform.utility.jwt_tokens import RoleRefreshToken
 from rest_framework import serializers
 from django.contrib.auth import login, get_user_model
 from django.core.mail import send_mail
@@ -455,7 +456,7 @@ class LoginView(generics.GenericAPIView):
             user.last_login = timezone.now()
             user.save(update_fields=['last_login'])
             
-            refresh = RefreshToken.for_user(user)
+            refresh = RoleRefreshToken.for_user(user)
             
             response_data = {
                 'message': 'Login successful.',
@@ -831,7 +832,7 @@ class AdminRegisterView(generics.CreateAPIView):
         
         try:
             user = serializer.save()
-            refresh = RefreshToken.for_user(user)
+            refresh = RoleRefreshToken.for_user(user)
             return Response({
                 'message': 'Admin registration successful.',
                 'message_type': 'success',
@@ -1,21 +1,27 @@
-from rest_framework import status
+from rest_framework import status, generics
 from rest_framework import serializers
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.decorators import api_view, parser_classes, permission_classes
-from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.decorators import api_view, permission_classes
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from django.utils import timezone
 from datetime import timedelta, datetime
 from django.conf import settings
+from django.urls import reverse
+from django.core.files.storage import default_storage
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.db import DatabaseError
-from edu_platform.permissions.auth_permissions import IsAdmin, IsTeacher
-from edu_platform.models import User, ClassSchedule, ClassSession, Course, CourseEnrollment, CourseSubscription
-from edu_platform.serializers.class_serializers import ClassScheduleSerializer, ClassSessionSerializer, CourseSessionSerializer
-from django.db.models import Q, F, Count
+from edu_platform.permissions.auth_permissions import IsAdmin, IsTeacher, IsTeacherOrAdmin
+from edu_platform.models import User, ClassSchedule, ClassSession, Course, CourseEnrollment, CourseSubscription, ClassChatMessage
+from edu_platform.serializers.class_serializers import ClassScheduleSerializer, ClassSessionSerializer, CourseSessionSerializer, ClassChatMessageSerializer
+from edu_platform.utility.classroom_presence import get_active_class_ids, get_live_counts
+from edu_platform.utility.recording_cache import recordings_cache_key, get_cache_timeout
+from edu_platform.utility.playback_progress import get_resume_positions
+from django.db.models import Q, F, Count, Sum, Min, Max, Exists, OuterRef, Prefetch
+from django.db.models.functions import Coalesce
 import logging
 
 logger = logging.getLogger(__name__)
@@ -964,31 +970,6 @@ class ClassSessionUpdateView(APIView):
             )
 
 
-@api_view(['POST'])
-@parser_classes([MultiPartParser, FormParser])
-def upload_class_recording(request, class_id):
-    """
-    Upload a class recording (video file) and attach it to ClassSession
-    """
-    try:
-        session = ClassSession.objects.get(id=class_id)
-    except ClassSession.DoesNotExist:
-        return api_response(message= "Class session not found", message_type=error, status=status.HTTP_404_NOT_FOUND)
-
-    file_obj = request.FILES.get("recording")
-
-    if not file_obj:
-        return api_response(message= "No file uploaded", message_type=error, status=status.HTTP_404_NOT_FOUND)
-
-    session.recording = file_obj
-    session.save()
-
-    return api_response(
-        message= "Recording uploaded successfully",
-        message_type= "'success'",
-        status_code=status.HTTP_200_OK)
-
-
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def get_recordings(request):
@@ -1000,6 +981,11 @@ def get_recordings(request):
         - Admin: all courses.
     - With course_id: Returns detailed response with all batches for the course, including batch_name, batch dates, and recordings.
     - With additional query params (batch_name, batch_start_date, batch_end_date): Further filters batches for the course(s).
+
+    Role filtering happens in SQL: the summary is one grouped query and the detailed
+    response is one schedule query plus one prefetch of recorded sessions. Results
+    are cached per (user, filters) until a recording is uploaded or processed; each
+    recording's resume position for the requesting user is added on every request.
     """
 
     # Check if user is authenticated
@@ -1039,156 +1025,140 @@ def get_recordings(request):
     batch_start_date = request.query_params.get('batch_start_date')
     batch_end_date = request.query_params.get('batch_end_date')
 
-    try:
-        # Base queryset → all courses with annotated recording count for simplified response
-        courses_qs = Course.objects.annotate(
-            recording_count=Count(
-                "class_schedules__sessions",
-                filter=Q(class_schedules__sessions__recording__isnull=False),
-                distinct=True,
-            )
-        )
-
-        # Apply course_id filter if provided
-        if course_id:
-            try:
-                courses_qs = courses_qs.filter(id=course_id)
-                if not courses_qs.exists():
-                    return api_response(
-                        message=f"Course with ID {course_id} not found.",
-                        message_type="error",
-                        status_code=404
-                    )
-            except ValueError:
-                return api_response(
-                    message="Invalid course_id provided.",
-                    message_type="error",
-                    status_code=400
-                )
-
-        # Apply role-based filtering
-        if user.is_student:
-            # Get courses where user has a completed subscription and matching batch enrollment
-            courses_qs = courses_qs.filter(
-                subscriptions__student=user,
-                subscriptions__payment_status='completed',
-                enrollments__student=user,
-                enrollments__batch=F('class_schedules__batch')
-            )
-        elif user.is_teacher:
-            # Get courses assigned to teacher through class schedules
-            courses_qs = courses_qs.filter(
-                class_schedules__teacher=user
-            )
-        # Admin sees all courses, no additional filter needed
-
-        # Check if any courses are found
-        if not courses_qs.exists():
+    # Validate all filters before touching the database
+    if course_id:
+        try:
+            course_id = int(course_id)
+        except ValueError:
             return api_response(
-                message="No courses found for the given criteria.",
+                message="Invalid course_id provided.",
                 message_type="error",
-                status_code=404
+                status_code=400
             )
+    if batch_name and batch_name not in ['weekdays', 'weekends']:
+        return api_response(
+            message=f"Invalid batch_name: {batch_name}. Must be 'weekdays' or 'weekends'.",
+            message_type="error",
+            status_code=400
+        )
+    try:
+        start_date = datetime.strptime(batch_start_date, '%Y-%m-%d').date() if batch_start_date else None
+    except ValueError:
+        return api_response(
+            message="Invalid batch_start_date format. Use YYYY-MM-DD.",
+            message_type="error",
+            status_code=400
+        )
+    try:
+        end_date = datetime.strptime(batch_end_date, '%Y-%m-%d').date() if batch_end_date else None
+    except ValueError:
+        return api_response(
+            message="Invalid batch_end_date format. Use YYYY-MM-DD.",
+            message_type="error",
+            status_code=400
+        )
 
-
-        # Build response data
-        data = []
-
-        # If no query parameters, return simplified response
-        if not (course_id or batch_name or batch_start_date or batch_end_date):
-            data = [
-                {
-                    "course_id": course.id,
-                    "course_name": course.name,
-                    "thumbnail": str(course.thumbnail) if course.thumbnail else None,
-                    "recording_count": course.recording_count,
-                }
-                for course in courses_qs.distinct()
-            ]
-        else:
-            # Handle detailed response with batch and recording information
-            for course in courses_qs.distinct():
-                # Filter schedules based on query parameters
-                schedules = ClassSchedule.objects.filter(course=course)
-
+    try:
+        cache_key = recordings_cache_key(user, request.query_params.dict(), request.get_host())
+        data = cache.get(cache_key)
+        if data is None:
+            # Schedules (batches) visible to this user, expressed as a subquery
+            schedules = ClassSchedule.objects.all()
+            if user.is_student:
+                schedules = schedules.filter(Exists(CourseEnrollment.objects.filter(
+                    student=user,
+                    course=OuterRef('course'),
+                    batch=OuterRef('batch'),
+                    subscription__payment_status='completed'
+                )))
+            elif user.is_teacher:
+                schedules = schedules.filter(teacher=user)
+            # Admin sees all schedules, no additional filter needed
+
+            has_recording = Q(recording__isnull=False) & ~Q(recording='')
+
+            # If no query parameters, return simplified response
+            if not (course_id or batch_name or batch_start_date or batch_end_date):
+                courses = Course.objects.all()
+                if not user.is_admin:
+                    courses = courses.filter(id__in=schedules.values('course_id'))
+                courses = courses.annotate(
+                    recording_count=Count(
+                        'class_schedules__sessions',
+                        filter=Q(class_schedules__in=schedules.values('id'))
+                        & Q(class_schedules__sessions__recording__isnull=False)
+                        & ~Q(class_schedules__sessions__recording=''),
+                        distinct=True,
+                    )
+                ).order_by('id')
+                data = [
+                    {
+                        "course_id": course['id'],
+                        "course_name": course['name'],
+                        "thumbnail": course['thumbnail'] or None,
+                        "recording_count": course['recording_count'],
+                    }
+                    for course in courses.values('id', 'name', 'thumbnail', 'recording_count')
+                ]
+            else:
+                # Handle detailed response with batch and recording information
+                if course_id:
+                    schedules = schedules.filter(course_id=course_id)
                 if batch_name:
-                    if batch_name not in ['weekdays', 'weekends']:
-                        return api_response(
-                            message=f"Invalid batch_name: {batch_name}. Must be 'weekdays' or 'weekends'.",
-                            message_type="error",
-                            status_code=400
-                        )
                     schedules = schedules.filter(batch=batch_name)
-
-                if batch_start_date:
-                    try:
-                        start_date = datetime.strptime(batch_start_date, '%Y-%m-%d').date()
-                        schedules = schedules.filter(batch_start_date__gte=start_date)
-                    except ValueError:
-                        return api_response(
-                            message="Invalid batch_start_date format. Use YYYY-MM-DD.",
-                            message_type="error",
-                            status_code=400
-                        )
-
-                if batch_end_date:
-                    try:
-                        end_date = datetime.strptime(batch_end_date, '%Y-%m-%d').date()
-                        schedules = schedules.filter(batch_end_date__lte=end_date)
-                    except ValueError:
-                        return api_response(
-                            message="Invalid batch_end_date format. Use YYYY-MM-DD.",
-                            message_type="error",
-                            status_code=400
-                        )
-
-                # Apply role-specific schedule filtering
-                if user.is_student:
-                    # Only include schedules matching enrolled batches
-                    enrollments = CourseEnrollment.objects.filter(
-                        student=user,
-                        course=course,
-                        subscription__payment_status='completed'
-                    )
-                    enrolled_batches = enrollments.values_list('batch', flat=True)
-                    schedules = schedules.filter(batch__in=enrolled_batches)
-                elif user.is_teacher:
-                    # Only include schedules assigned to the teacher
-                    schedules = schedules.filter(teacher=user)
-                # Admin sees all schedules, no additional filter needed
-
-                # If no schedules match after filtering, skip this course
-                if not schedules.exists():
-                    continue
-
-                for schedule in schedules:
-                    # Get recordings for this batch and count them
-                    recordings = ClassSession.objects.filter(
-                        schedule=schedule,
-                        recording__isnull=False
+                if start_date:
+                    schedules = schedules.filter(batch_start_date__gte=start_date)
+                if end_date:
+                    schedules = schedules.filter(batch_end_date__lte=end_date)
+
+                schedules = schedules.select_related('course').order_by('course_id', 'batch_start_date', 'id').prefetch_related(
+                    Prefetch(
+                        'sessions',
+                        queryset=ClassSession.objects.filter(has_recording).order_by('session_date', 'start_time'),
+                        to_attr='recorded_sessions'
                     )
+                )
 
-                    batch_recordings = [
-                        {
-                            "class_id": rec.id,
-                            "recording": rec.recording.path if rec.recording else None,
-                            "session_date": rec.session_date,
-                            "start_time": rec.start_time,
-                            "end_time": rec.end_time
-                        }
-                        for rec in recordings
-                    ]
-
-
-                    data.append({
-                        "course_id": course.id,
-                        "course_name": course.name,
-                        "recording_count": recordings.count(),
+                data = [
+                    {
+                        "course_id": schedule.course_id,
+                        "course_name": schedule.course.name,
+                        "recording_count": len(schedule.recorded_sessions),
                         "batch_name": schedule.batch,
                         "batch_start_date": schedule.batch_start_date,
                         "batch_end_date": schedule.batch_end_date,
-                        "batch_recordings": batch_recordings
-                    })
+                        "batch_recordings": [
+                            {
+                                "class_id": rec.id,
+                                "recording": request.build_absolute_uri(
+                                    reverse('recording-playback', args=[rec.id])
+                                ),
+                                "session_date": rec.session_date,
+                                "start_time": rec.start_time,
+                                "end_time": rec.end_time,
+                                "processing_status": rec.recording_status or None,
+                                "size": rec.recording_size,
+                                "duration": rec.recording_duration,
+                                "width": rec.recording_width,
+                                "height": rec.recording_height,
+                                "posters": [default_storage.url(name) for name in rec.recording_posters]
+                            }
+                            for rec in schedule.recorded_sessions
+                        ]
+                    }
+                    for schedule in schedules
+                ]
+
+            cache.set(cache_key, data, get_cache_timeout())
+
+        # Resume positions change every few seconds, so they are added after the cache
+        if data and 'batch_recordings' in data[0]:
+            positions = get_resume_positions(
+                user.id, [rec['class_id'] for batch in data for rec in batch['batch_recordings']]
+            )
+            for batch in data:
+                for rec in batch['batch_recordings']:
+                    rec['resume'] = positions.get(rec['class_id'])
 
         # Check if any data was generated
         if not data:
@@ -1216,4 +1186,426 @@ def get_recordings(request):
             message=f"An unexpected error occurred: {str(e)}",
             message_type="error",
             status_code=500
-        )
\ No newline at end of file
+        )
+
+
+def user_can_access_session(user, session):
+    """Checks whether a user may see a class session's content (admin, its teacher, or a paid student)."""
+    if user.is_admin:
+        return True
+    if user.is_teacher:
+        return session.schedule.teacher_id == user.id
+    if user.is_student:
+        return CourseSubscription.objects.filter(
+            student=user,
+            course_id=session.schedule.course_id,
+            payment_status='completed',
+            is_active=True
+        ).exists()
+    return False
+
+
+class ClassChatHistoryView(generics.ListAPIView):
+    """Lists the archived chat history of a class session, paginated.
+
+    Events of a class that is still live are kept in its Redis Stream and are
+    delivered over the classroom WebSocket ('replay' message) until archived.
+    """
+    serializer_class = ClassChatMessageSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return ClassChatMessage.objects.filter(session_id=self.kwargs['session_id']).order_by('sent_at', 'id')
+
+    @swagger_auto_schema(
+        operation_description="List archived chat messages of a class session (admin, assigned teacher, or enrolled student)",
+        responses={
+            200: openapi.Response(
+                description="Chat history retrieved successfully",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'message': openapi.Schema(type=openapi.TYPE_STRING, description="Response message"),
+                        'message_type': openapi.Schema(type=openapi.TYPE_STRING, enum=['success', 'error'], description="Type of message"),
+                        'data': openapi.Schema(
+                            type=openapi.TYPE_OBJECT,
+                            properties={
+                                'count': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                'next': openapi.Schema(type=openapi.TYPE_STRING, nullable=True),
+                                'previous': openapi.Schema(type=openapi.TYPE_STRING, nullable=True),
+                                'results': openapi.Schema(
+                                    type=openapi.TYPE_ARRAY,
+                                    items=openapi.Schema(
+                                        type=openapi.TYPE_OBJECT,
+                                        properties={
+                                            'seq': openapi.Schema(type=openapi.TYPE_STRING, description="Event sequence number"),
+                                            'sender': openapi.Schema(type=openapi.TYPE_STRING),
+                                            'message': openapi.Schema(type=openapi.TYPE_STRING),
+                                            'is_emoji': openapi.Schema(type=openapi.TYPE_BOOLEAN),
+                                            'is_system': openapi.Schema(type=openapi.TYPE_BOOLEAN),
+                                            'sent_at': openapi.Schema(type=openapi.TYPE_STRING, format='date-time')
+                                        }
+                                    )
+                                )
+                            }
+                        )
+                    }
+                )
+            ),
+            403: openapi.Response(
+                description="Permission denied",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'message': openapi.Schema(type=openapi.TYPE_STRING, description="Error message"),
+                        'message_type': openapi.Schema(type=openapi.TYPE_STRING, enum=['success', 'error'], description="Type of message")
+                    }
+                )
+            ),
+            404: openapi.Response(
+                description="Class session not found",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'message': openapi.Schema(type=openapi.TYPE_STRING, description="Error message"),
+                        'message_type': openapi.Schema(type=openapi.TYPE_STRING, enum=['success', 'error'], description="Type of message")
+                    }
+                )
+            )
+        }
+    )
+    def list(self, request, *args, **kwargs):
+        try:
+            session = ClassSession.objects.select_related('schedule').get(id=kwargs['session_id'])
+            if not user_can_access_session(request.user, session):
+                return api_response(
+                    message='You do not have permission to view this class chat.',
+                    message_type='error',
+                    status_code=status.HTTP_403_FORBIDDEN
+                )
+
+            response = super().list(request, *args, **kwargs)
+            return api_response(
+                message='Chat history retrieved successfully.',
+                message_type='success',
+                data=response.data,
+                status_code=status.HTTP_200_OK
+            )
+        except ClassSession.DoesNotExist:
+            return api_response(
+                message='Class session not found.',
+                message_type='error',
+                status_code=status.HTTP_404_NOT_FOUND
+            )
+        except Exception as e:
+            logger.error(f"Error retrieving chat history: {str(e)}")
+            return api_response(
+                message='Failed to retrieve chat history. Please try again.',
+                message_type='error',
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class LiveParticipantCountView(APIView):
+    """Returns live participant counts for classes that currently have connected users."""
+    permission_classes = [IsAuthenticated, IsTeacherOrAdmin]
+
+    @swagger_auto_schema(
+        operation_description="Live participant counts per class from heartbeat presence (admin: all classes; teacher: own classes)",
+        responses={
+            200: openapi.Response(
+                description="Live participant counts retrieved successfully",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'message': openapi.Schema(type=openapi.TYPE_STRING, description="Response message"),
+                        'message_type': openapi.Schema(type=openapi.TYPE_STRING, enum=['success', 'error'], description="Type of message"),
+                        'data': openapi.Schema(
+                            type=openapi.TYPE_ARRAY,
+                            items=openapi.Schema(
+                                type=openapi.TYPE_OBJECT,
+                                properties={
+                                    'session_id': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                    'class_id': openapi.Schema(type=openapi.TYPE_STRING, format='uuid'),
+                                    'course_name': openapi.Schema(type=openapi.TYPE_STRING),
+                                    'batch': openapi.Schema(type=openapi.TYPE_STRING),
+                                    'participants': openapi.Schema(type=openapi.TYPE_INTEGER)
+                                }
+                            )
+                        )
+                    }
+                )
+            ),
+            500: openapi.Response(
+                description="Server error",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'message': openapi.Schema(type=openapi.TYPE_STRING, description="Error message"),
+                        'message_type': openapi.Schema(type=openapi.TYPE_STRING, enum=['success', 'error'], description="Type of message")
+                    }
+                )
+            )
+        }
+    )
+    def get(self, request, *args, **kwargs):
+        """Reads counts from Redis; the database is only used to scope classes to the user."""
+        try:
+            active_ids = get_active_class_ids()
+            sessions = ClassSession.objects.filter(class_id__in=active_ids)
+            if request.user.is_teacher:
+                sessions = sessions.filter(schedule__teacher=request.user)
+            sessions = list(sessions.values('id', 'class_id', 'schedule__course__name', 'schedule__batch'))
+
+            counts = get_live_counts(s['class_id'] for s in sessions)
+            data = [
+                {
+                    'session_id': s['id'],
+                    'class_id': str(s['class_id']),
+                    'course_name': s['schedule__course__name'],
+                    'batch': s['schedule__batch'],
+                    'participants': counts.get(str(s['class_id']), 0),
+                }
+                for s in sessions
+            ]
+            return api_response(
+                message='Live participant counts retrieved successfully.',
+                message_type='success',
+                data=data,
+                status_code=status.HTTP_200_OK
+            )
+        except Exception as e:
+            logger.error(f"Error retrieving live participant counts: {str(e)}")
+            return api_response(
+                message='Failed to retrieve live participant counts. Please try again.',
+                message_type='error',
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+def attendance_error_schema(description):
+    return openapi.Response(
+        description=description,
+        schema=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'message': openapi.Schema(type=openapi.TYPE_STRING, description="Error message"),
+                'message_type': openapi.Schema(type=openapi.TYPE_STRING, enum=['success', 'error'], description="Type of message")
+            }
+        )
+    )
+
+
+def enrolled_students(schedule):
+    """Paid enrollments of a schedule's course and batch (one row per student)."""
+    return CourseEnrollment.objects.filter(
+        course_id=schedule.course_id,
+        batch=schedule.batch,
+        subscription__payment_status='completed'
+    )
+
+
+class SessionAttendanceReportView(APIView):
+    """Attendance of every enrolled student in one class session."""
+    permission_classes = [IsAuthenticated, IsTeacherOrAdmin]
+
+    @swagger_auto_schema(
+        operation_description="Attendance report for a class session (admin or the assigned teacher). Absent students are listed with zero time.",
+        responses={
+            200: openapi.Response(
+                description="Attendance report retrieved successfully",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'message': openapi.Schema(type=openapi.TYPE_STRING, description="Response message"),
+                        'message_type': openapi.Schema(type=openapi.TYPE_STRING, enum=['success', 'error'], description="Type of message"),
+                        'data': openapi.Schema(
+                            type=openapi.TYPE_OBJECT,
+                            properties={
+                                'session_id': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                'enrolled': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                'present': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                'average_seconds': openapi.Schema(type=openapi.TYPE_INTEGER, description="Average time of present students"),
+                                'students': openapi.Schema(
+                                    type=openapi.TYPE_ARRAY,
+                                    items=openapi.Schema(
+                                        type=openapi.TYPE_OBJECT,
+                                        properties={
+                                            'student_id': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                            'email': openapi.Schema(type=openapi.TYPE_STRING),
+                                            'first_joined_at': openapi.Schema(type=openapi.TYPE_STRING, format='date-time', nullable=True),
+                                            'last_left_at': openapi.Schema(type=openapi.TYPE_STRING, format='date-time', nullable=True),
+                                            'total_seconds': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                            'join_count': openapi.Schema(type=openapi.TYPE_INTEGER)
+                                        }
+                                    )
+                                )
+                            }
+                        )
+                    }
+                )
+            ),
+            403: attendance_error_schema("Permission denied"),
+            404: attendance_error_schema("Class session not found")
+        }
+    )
+    def get(self, request, session_id):
+        """Aggregates in one grouped query over enrollments left-joined to attendance."""
+        try:
+            session = ClassSession.objects.select_related('schedule').get(id=session_id)
+            if request.user.is_teacher and session.schedule.teacher_id != request.user.id:
+                return api_response(
+                    message='You can only view attendance for your own classes.',
+                    message_type='error',
+                    status_code=status.HTTP_403_FORBIDDEN
+                )
+
+            in_session = Q(student__class_attendance__session_id=session.id)
+            rows = list(
+                enrolled_students(session.schedule)
+                .values('student_id', 'student__email')
+                .annotate(
+                    first_joined_at=Min('student__class_attendance__first_joined_at', filter=in_session),
+                    last_left_at=Max('student__class_attendance__last_left_at', filter=in_session),
+                    total_seconds=Coalesce(Sum('student__class_attendance__total_seconds', filter=in_session), 0),
+                    join_count=Coalesce(Sum('student__class_attendance__join_count', filter=in_session), 0),
+                )
+                .order_by('student__email')
+            )
+
+            present = [row for row in rows if row['join_count']]
+            data = {
+                'session_id': session.id,
+                'enrolled': len(rows),
+                'present': len(present),
+                'average_seconds': sum(row['total_seconds'] for row in present) // len(present) if present else 0,
+                'students': [
+                    {
+                        'student_id': row['student_id'],
+                        'email': row['student__email'],
+                        'first_joined_at': row['first_joined_at'],
+                        'last_left_at': row['last_left_at'],
+                        'total_seconds': row['total_seconds'],
+                        'join_count': row['join_count'],
+                    }
+                    for row in rows
+                ]
+            }
+            return api_response(
+                message='Attendance report retrieved successfully.',
+                message_type='success',
+                data=data,
+                status_code=status.HTTP_200_OK
+            )
+        except ClassSession.DoesNotExist:
+            return api_response(
+                message='Class session not found.',
+                message_type='error',
+                status_code=status.HTTP_404_NOT_FOUND
+            )
+        except Exception as e:
+            logger.error(f"Error retrieving session attendance: {str(e)}")
+            return api_response(
+                message='Failed to retrieve attendance report. Please try again.',
+                message_type='error',
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class BatchAttendanceReportView(APIView):
+    """Attendance of every enrolled student across all sessions of a class schedule (batch)."""
+    permission_classes = [IsAuthenticated, IsTeacherOrAdmin]
+
+    @swagger_auto_schema(
+        operation_description="Attendance report for a batch: sessions attended and total time per enrolled student (admin or the assigned teacher)",
+        responses={
+            200: openapi.Response(
+                description="Attendance report retrieved successfully",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'message': openapi.Schema(type=openapi.TYPE_STRING, description="Response message"),
+                        'message_type': openapi.Schema(type=openapi.TYPE_STRING, enum=['success', 'error'], description="Type of message"),
+                        'data': openapi.Schema(
+                            type=openapi.TYPE_OBJECT,
+                            properties={
+                                'schedule_id': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                'total_sessions': openapi.Schema(type=openapi.TYPE_INTEGER, description="Sessions held so far"),
+                                'students': openapi.Schema(
+                                    type=openapi.TYPE_ARRAY,
+                                    items=openapi.Schema(
+                                        type=openapi.TYPE_OBJECT,
+                                        properties={
+                                            'student_id': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                            'email': openapi.Schema(type=openapi.TYPE_STRING),
+                                            'sessions_attended': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                            'total_seconds': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                            'attendance_percent': openapi.Schema(type=openapi.TYPE_NUMBER)
+                                        }
+                                    )
+                                )
+                            }
+                        )
+                    }
+                )
+            ),
+            403: attendance_error_schema("Permission denied"),
+            404: attendance_error_schema("Class schedule not found")
+        }
+    )
+    def get(self, request, schedule_id):
+        """Aggregates in one grouped query over enrollments left-joined to attendance."""
+        try:
+            schedule = ClassSchedule.objects.get(id=schedule_id)
+            if request.user.is_teacher and schedule.teacher_id != request.user.id:
+                return api_response(
+                    message='You can only view attendance for your own classes.',
+                    message_type='error',
+                    status_code=status.HTTP_403_FORBIDDEN
+                )
+
+            total_sessions = schedule.sessions.filter(start_time__lte=timezone.now()).count()
+            in_schedule = Q(student__class_attendance__session__schedule_id=schedule.id)
+            rows = (
+                enrolled_students(schedule)
+                .values('student_id', 'student__email')
+                .annotate(
+                    sessions_attended=Count('student__class_attendance__session', filter=in_schedule, distinct=True),
+                    total_seconds=Coalesce(Sum('student__class_attendance__total_seconds', filter=in_schedule), 0),
+                )
+                .order_by('student__email')
+            )
+
+            data = {
+                'schedule_id': schedule.id,
+                'total_sessions': total_sessions,
+                'students': [
+                    {
+                        'student_id': row['student_id'],
+                        'email': row['student__email'],
+                        'sessions_attended': row['sessions_attended'],
+                        'total_seconds': row['total_seconds'],
+                        'attendance_percent': round(100 * row['sessions_attended'] / total_sessions, 1) if total_sessions else 0,
+                    }
+                    for row in rows
+                ]
+            }
+            return api_response(
+                message='Attendance report retrieved successfully.',
+                message_type='success',
+                data=data,
+                status_code=status.HTTP_200_OK
+            )
+        except ClassSchedule.DoesNotExist:
+            return api_response(
+                message='Class schedule not found.',
+                message_type='error',
+                status_code=status.HTTP_404_NOT_FOUND
+            )
+        except Exception as e:
+            logger.error(f"Error retrieving batch attendance: {str(e)}")
+            return api_response(
+                message='Failed to retrieve attendance report. Please try again.',
+                message_type='error',
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
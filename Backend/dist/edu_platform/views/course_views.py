@@ -4,13 +4,14 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
-from django.db.models import Q, Count
+from django.db.models import Q, Count, OuterRef, Subquery
 from rest_framework import serializers
-from edu_platform.models import Course, CourseSubscription, ClassSchedule, CoursePricing
+from edu_platform.models import Course, CourseSubscription, CourseEnrollment, ClassSchedule, CoursePricing
 from edu_platform.serializers.course_serializers import CourseSerializer, PurchasedCoursesSerializer, CourseStudentCountSerializer, MyCoursesSerializer, PaymentRecordSerializer, CoursePricingSerializer
 from edu_platform.permissions.auth_permissions import IsTeacher, IsStudent, IsTeacherOrAdmin, IsAdmin
 from django_filters.rest_framework import DjangoFilterBackend
 from django_filters import rest_framework as filters
+from edu_platform.utility.pagination import KeysetPagination
 from datetime import date
 import logging
 
@@ -109,8 +110,11 @@ class CourseListView(generics.ListAPIView):
                                     'category': openapi.Schema(type=openapi.TYPE_STRING),
                                     'level': openapi.Schema(type=openapi.TYPE_STRING),
                                     'thumbnail': openapi.Schema(type=openapi.TYPE_STRING, nullable=True),
+                                    'thumbnail_srcset': openapi.Schema(type=openapi.TYPE_OBJECT, nullable=True, description='Resized thumbnail URLs: {format: {width: url}}'),
                                     'duration_hours': openapi.Schema(type=openapi.TYPE_INTEGER),
                                     'base_price': openapi.Schema(type=openapi.TYPE_NUMBER),
+                                    'effective_price': openapi.Schema(type=openapi.TYPE_NUMBER, description="Latest course pricing, else base_price"),
+                                    'discount_percent': openapi.Schema(type=openapi.TYPE_NUMBER, nullable=True),
                                     'advantages': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Items(type=openapi.TYPE_STRING)),
                                     'batches': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Items(type=openapi.TYPE_STRING)),
                                     'schedule': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Items(type=openapi.TYPE_OBJECT)),
@@ -416,8 +420,11 @@ class MyCoursesView(generics.ListAPIView):
                                             'category': openapi.Schema(type=openapi.TYPE_STRING),
                                             'level': openapi.Schema(type=openapi.TYPE_STRING),
                                             'thumbnail': openapi.Schema(type=openapi.TYPE_STRING, nullable=True),
+                                            'thumbnail_srcset': openapi.Schema(type=openapi.TYPE_OBJECT, nullable=True, description='Resized thumbnail URLs: {format: {width: url}}'),
                                             'duration_hours': openapi.Schema(type=openapi.TYPE_INTEGER),
                                             'base_price': openapi.Schema(type=openapi.TYPE_NUMBER),
+                                            'effective_price': openapi.Schema(type=openapi.TYPE_NUMBER, description="Latest course pricing, else base_price"),
+                                            'discount_percent': openapi.Schema(type=openapi.TYPE_NUMBER, nullable=True),
                                             'advantages': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Items(type=openapi.TYPE_STRING)),
                                             'batches': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Items(type=openapi.TYPE_STRING)),
                                             'schedule': openapi.Schema(
@@ -577,21 +584,44 @@ class PaymentFilter(filters.FilterSet):
     start_date = filters.DateTimeFilter(field_name='payment_completed_at', lookup_expr='gte')
     end_date = filters.DateTimeFilter(field_name='payment_completed_at', lookup_expr='lte')
     course = filters.CharFilter(field_name='course__name', lookup_expr='icontains')
-    status = filters.CharFilter(field_name='payment_status', lookup_expr='iexact')
+    status = filters.CharFilter(method='filter_status')
 
     class Meta:
         model = CourseSubscription
         fields = ['start_date', 'end_date', 'course', 'status']
 
+    def filter_status(self, queryset, name, value):
+        # Statuses are stored lowercase; an exact match (unlike iexact's UPPER()) can use the status index
+        return queryset.filter(payment_status=value.lower())
+
 class AllPaymentRecordsAPIView(generics.ListAPIView):
-    queryset = CourseSubscription.objects.all().order_by('-payment_completed_at')
     serializer_class = PaymentRecordSerializer
     permission_classes = [IsAuthenticated, IsAdmin]
     filter_backends = [DjangoFilterBackend]
     filterset_class = PaymentFilter
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        """One query per page: student and course joined, batch as a correlated subquery."""
+        first_batch = CourseEnrollment.objects.filter(subscription=OuterRef('pk')).order_by('id').values('batch')[:1]
+        return (
+            CourseSubscription.objects
+            .select_related('student', 'course')
+            .only(
+                'id', 'purchased_at', 'payment_method', 'amount_paid', 'payment_completed_at', 'payment_status',
+                'student__username', 'student__email', 'student__phone_number', 'course__name'
+            )
+            .annotate(enrollment_batch=Subquery(first_batch))
+        )
 
     @swagger_auto_schema(
-        operation_description="List all payment records with filtering (Admin only)",
+        operation_description="List all payment records with filtering (Admin only). Ordered by completion time, "
+                              "newest first (pending first); pages are fetched with the opaque `cursor` from "
+                              "`next`/`previous`, and `count` is only returned on the first page.",
+        manual_parameters=[
+            openapi.Parameter('cursor', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=False),
+            openapi.Parameter('page_size', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, required=False)
+        ],
         responses={
             200: openapi.Response(
                 description="Payment records retrieved successfully",
@@ -603,7 +633,7 @@ class AllPaymentRecordsAPIView(generics.ListAPIView):
                         'data': openapi.Schema(
                             type=openapi.TYPE_OBJECT,
                             properties={
-                                'count': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                'count': openapi.Schema(type=openapi.TYPE_INTEGER, nullable=True),
                                 'next': openapi.Schema(type=openapi.TYPE_STRING, nullable=True),
                                 'previous': openapi.Schema(type=openapi.TYPE_STRING, nullable=True),
                                 'results': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Items(type=openapi.TYPE_OBJECT))
@@ -6,6 +6,7 @@ from drf_yasg import openapi
 from edu_platform.models import CourseEnrollment
 from edu_platform.serializers.enrollment_serializers import CourseEnrollmentSerializer
 from edu_platform.permissions.auth_permissions import IsStudent
+from edu_platform.utility.seat_inventory import BatchFullError
 import logging
 
 logger = logging.getLogger(__name__)
@@ -111,6 +112,17 @@ class UpdateEnrollmentView(views.APIView):
                     }
                 )
             ),
+            409: openapi.Response(
+                description="Batch is full",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'message': openapi.Schema(type=openapi.TYPE_STRING),
+                        'message_type': openapi.Schema(type=openapi.TYPE_STRING, enum=['success', 'error']),
+                        'status': openapi.Schema(type=openapi.TYPE_INTEGER)
+                    }
+                )
+            ),
             500: openapi.Response(
                 description="Server error",
                 schema=openapi.Schema(
@@ -148,6 +160,12 @@ class UpdateEnrollmentView(views.APIView):
                 'message_type': 'success',
                 'data': serializer.data
             }, status=status.HTTP_200_OK)
+        except BatchFullError:
+            return Response({
+                'message': 'This batch is full. Please choose another batch.',
+                'message_type': 'error',
+                'status': status.HTTP_409_CONFLICT
+            }, status=status.HTTP_409_CONFLICT)
         except CourseEnrollment.DoesNotExist:
             return Response({
                 'message': 'Enrollment not found or subscription is inactive.',
@@ -1,31 +1,45 @@
 from rest_framework import views, status, generics
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from django.conf import settings
+from django.utils import timezone
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
-from django.utils import timezone
 from rest_framework import serializers
-from edu_platform.models import Course, CourseSubscription, CourseEnrollment
+from edu_platform.models import Course, CourseSubscription, TransactionExport
 from edu_platform.permissions.auth_permissions import IsStudent
-from edu_platform.serializers.payment_serializers import CreateOrderSerializer, VerifyPaymentSerializer, TransactionReportSerializer
-from io import BytesIO
-from django.http import HttpResponse
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet
+from edu_platform.serializers.payment_serializers import CreateOrderSerializer, VerifyPaymentSerializer, TransactionReportSerializer, TransactionExportSerializer
+from edu_platform.utility.idempotency import idempotent
+from edu_platform.utility.payment_orders import (
+    open_order, verify_order, AlreadySubscribedError, OrderConflictError, SubscriptionNotFoundError,
+    InvalidSignatureError
+)
+from edu_platform.utility.payment_webhooks import verify_signature, store_event
+from edu_platform.utility.payment_gateway import get_gateway, GatewayUnavailable
+from edu_platform.utility.course_pricing import effective_price
+from edu_platform.utility.seat_inventory import reserve_seat, release_seat, hold_seconds, BatchFullError
+from edu_platform.utility.transaction_exports import clean_filters, stream_csv, write_xlsx, download_url
+from edu_platform.utility.revenue_rollup import revenue_summary, GROUPINGS
+from django.utils.dateparse import parse_date
+from datetime import timedelta
+from django.http import StreamingHttpResponse, FileResponse
+import tempfile
 import razorpay
+import json
 import logging
-import pandas as pd
-
-# Initialize Razorpay client
-client = razorpay.Client(auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET))
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
+idempotency_key_parameter = openapi.Parameter(
+    'Idempotency-Key',
+    openapi.IN_HEADER,
+    description="Optional unique key; retries with the same key return the first response instead of repeating the request",
+    type=openapi.TYPE_STRING,
+    required=False
+)
+
 def get_error_message(errors):
     """Extracts a specific error message from serializer errors."""
     if isinstance(errors, dict):
@@ -74,6 +88,7 @@ class CreateOrderView(BaseAPIView):
 
     @swagger_auto_schema(
         request_body=CreateOrderSerializer,
+        manual_parameters=[idempotency_key_parameter],
         responses={
             200: openapi.Response(
                 description="Order created successfully",
@@ -90,7 +105,9 @@ class CreateOrderView(BaseAPIView):
                                 'currency': openapi.Schema(type=openapi.TYPE_STRING),
                                 'key': openapi.Schema(type=openapi.TYPE_STRING),
                                 'subscription_id': openapi.Schema(type=openapi.TYPE_INTEGER),
-                                'batch': openapi.Schema(type=openapi.TYPE_STRING)
+                                'batch': openapi.Schema(type=openapi.TYPE_STRING),
+                                'reused': openapi.Schema(type=openapi.TYPE_BOOLEAN, description="True if an open order for the same purchase was returned"),
+                                'checkout_timeout': openapi.Schema(type=openapi.TYPE_INTEGER, description="Seconds the seat is held; pass as the Razorpay checkout 'timeout' option")
                             }
                         )
                     }
@@ -129,6 +146,17 @@ class CreateOrderView(BaseAPIView):
                     }
                 )
             ),
+            409: openapi.Response(
+                description="Batch is full, or a concurrent checkout replaced the order",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'message': openapi.Schema(type=openapi.TYPE_STRING),
+                        'message_type': openapi.Schema(type=openapi.TYPE_STRING, enum=['success', 'error']),
+                        'status': openapi.Schema(type=openapi.TYPE_INTEGER)
+                    }
+                )
+            ),
             500: openapi.Response(
                 description="Server error",
                 schema=openapi.Schema(
@@ -142,75 +170,28 @@ class CreateOrderView(BaseAPIView):
             )
         }
     )
+    @idempotent
     def post(self, request):
-        """Generates Razorpay order and creates/updates subscription and enrollment."""
+        """Returns the open Razorpay order for this purchase, creating one only when none is reusable."""
         try:
             serializer = self.validate_serializer(CreateOrderSerializer, request.data)
             course_id = serializer.validated_data['course_id']
             batch = serializer.validated_data['batch']
             course = Course.objects.get(id=course_id, is_active=True)
 
-            # Check for existing pending subscription
+            # Hold a seat for the checkout first; a full batch never reaches the gateway
+            reserve_seat(course.id, batch, request.user.id)
+            gateway = get_gateway()
             try:
-                subscription = CourseSubscription.objects.get(
-                    student=request.user,
-                    course=course,
-                    payment_status='pending'
-                )
-                logger.info(f"Reusing existing pending subscription {subscription.id} for user {request.user.id}, course {course.id}")
-            except CourseSubscription.DoesNotExist:
-                subscription = None
-
-            # Create Razorpay order
-            amount = int(course.base_price * 100)
-            order_data = {
-                'amount': amount,
-                'currency': 'INR',
-                'payment_capture': '1',
-                'notes': {
-                    'course_id': str(course.id),
-                    'student_id': str(request.user.id),
-                    'student_email': request.user.email,
-                    'batch': batch
-                }
-            }
-            order = client.order.create(data=order_data)
-
-            # Update or create subscription
-            if subscription:
-                subscription.order_id = order['id']
-                subscription.purchased_at = timezone.now()
-                subscription.save(update_fields=['order_id', 'purchased_at'])
-                logger.info(f"Updated subscription {subscription.id} with new order_id {order['id']}")
-            else:
-                subscription = CourseSubscription.objects.create(
-                    student=request.user,
-                    course=course,
-                    amount_paid=course.base_price,
-                    order_id=order['id'],
-                    payment_method='razorpay',
-                    payment_status='pending',
-                    currency='INR'
+                subscription, order, reused = open_order(
+                    gateway.create_order, request.user, course, batch, effective_price(course)
                 )
-                logger.info(f"Created new subscription {subscription.id} for user {request.user.id}, course {course.id}")
-
-            try:
-                enrollment = CourseEnrollment.objects.get(
-                    student=request.user,
-                    course=course,
-                    subscription=subscription
-                )
-                enrollment.batch = batch
-                enrollment.save(update_fields=['batch'])
-                logger.info(f"Updated enrollment for subscription {subscription.id} with batch {batch}")
-            except CourseEnrollment.DoesNotExist:
-                enrollment = CourseEnrollment.objects.create(
-                    student=request.user,
-                    course=course,
-                    batch=batch,
-                    subscription=subscription
-                )
-                logger.info(f"Created new enrollment for subscription {subscription.id} with batch {batch}")
+            except OrderConflictError:
+                # The hold belongs to the concurrent checkout that won
+                raise
+            except Exception:
+                release_seat(course.id, batch, request.user.id)
+                raise
 
             return Response({
                 'message': 'Order created successfully.',
@@ -219,9 +200,11 @@ class CreateOrderView(BaseAPIView):
                     'order_id': order['id'],
                     'amount': order['amount'],
                     'currency': order['currency'],
-                    'key': settings.RAZORPAY_KEY_ID,
+                    'key': gateway.key_id,
                     'subscription_id': subscription.id,
-                    'batch': batch
+                    'batch': batch,
+                    'reused': reused,
+                    'checkout_timeout': hold_seconds()
                 }
             }, status=status.HTTP_200_OK)
 
@@ -231,12 +214,37 @@ class CreateOrderView(BaseAPIView):
                 'message_type': 'error',
                 'status': e.detail.get('status', status.HTTP_400_BAD_REQUEST)
             }, status=status.HTTP_400_BAD_REQUEST)
+        except BatchFullError:
+            return Response({
+                'message': 'This batch is full. Please choose another batch.',
+                'message_type': 'error',
+                'status': status.HTTP_409_CONFLICT
+            }, status=status.HTTP_409_CONFLICT)
+        except OrderConflictError:
+            return Response({
+                'message': 'Another checkout for this course is in progress. Please try again.',
+                'message_type': 'error',
+                'status': status.HTTP_409_CONFLICT
+            }, status=status.HTTP_409_CONFLICT)
+        except AlreadySubscribedError:
+            return Response({
+                'message': 'You are already subscribed to this course.',
+                'message_type': 'error',
+                'status': status.HTTP_400_BAD_REQUEST
+            }, status=status.HTTP_400_BAD_REQUEST)
         except Course.DoesNotExist:
             return Response({
                 'message': 'Course not found or inactive.',
                 'message_type': 'error',
                 'status': status.HTTP_400_BAD_REQUEST
             }, status=status.HTTP_400_BAD_REQUEST)
+        except GatewayUnavailable as e:
+            logger.error(f"Payment gateway unavailable creating order: {str(e)}")
+            return Response({
+                'message': 'Payment gateway is temporarily unavailable. Please try again shortly.',
+                'message_type': 'error',
+                'status': status.HTTP_503_SERVICE_UNAVAILABLE
+            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
         except razorpay.errors.BadRequestError as e:
             logger.error(f"Razorpay error creating order: {str(e)}")
             return Response({
@@ -258,6 +266,7 @@ class VerifyPaymentView(BaseAPIView):
 
     @swagger_auto_schema(
         request_body=VerifyPaymentSerializer,
+        manual_parameters=[idempotency_key_parameter],
         responses={
             200: openapi.Response(
                 description="Payment verified successfully",
@@ -323,6 +332,7 @@ class VerifyPaymentView(BaseAPIView):
             )
         }
     )
+    @idempotent
     def post(self, request):
         """Verifies payment signature and updates subscription and enrollment status."""
         try:
@@ -330,23 +340,9 @@ class VerifyPaymentView(BaseAPIView):
             payment_id = serializer.validated_data['razorpay_payment_id']
             order_id = serializer.validated_data['razorpay_order_id']
             signature = serializer.validated_data['razorpay_signature']
-            subscription = serializer.validated_data['subscription']
+            subscription_id = serializer.validated_data['subscription_id']
 
-            # Handle idempotency for completed payments
-            if subscription.payment_status == 'completed':
-                enrollment = CourseEnrollment.objects.get(subscription=subscription)
-                logger.info(f"Payment already verified for subscription {subscription.id}, user {request.user.id}")
-                return Response({
-                    'message': 'Payment already verified.',
-                    'message_type': 'success',
-                    'data': {
-                        'subscription_id': subscription.id,
-                        'course_name': subscription.course.name,
-                        'batch': enrollment.batch
-                    }
-                }, status=status.HTTP_200_OK)
-
-            # Verify payment signature
+            # Verify payment signature (a local HMAC check, so it stays outside the transaction)
             params_dict = {
                 'razorpay_order_id': order_id,
                 'razorpay_payment_id': payment_id,
@@ -354,32 +350,24 @@ class VerifyPaymentView(BaseAPIView):
             }
 
             if settings.DEBUG and settings.RAZORPAY_KEY_SECRET == 'fake_secret_for_testing':
-                logger.info(f"Skipping signature verification for subscription {subscription.id} in test mode")
+                logger.info(f"Skipping signature verification for subscription {subscription_id} in test mode")
+                signature_valid = True
+            else:
+                signature_valid = get_gateway().verify_payment_signature(order_id, payment_id, signature)
+
+            enrollment, already_verified = verify_order(
+                request.user, subscription_id, order_id, payment_id, params_dict, signature_valid
+            )
+            subscription = enrollment.subscription
+
+            if already_verified:
+                logger.info(f"Payment already verified for subscription {subscription.id}, user {request.user.id}")
+                message = 'Payment already verified.'
             else:
-                try:
-                    client.utility.verify_payment_signature(params_dict)
-                except razorpay.errors.SignatureVerificationError as e:
-                    logger.error(f"Signature verification failed for subscription {subscription.id}, user {request.user.id}: {str(e)}")
-                    subscription.payment_status = 'failed'
-                    subscription.save()
-                    return Response({
-                        'message': 'Invalid payment signature.',
-                        'message_type': 'error',
-                        'status': status.HTTP_400_BAD_REQUEST
-                    }, status=status.HTTP_400_BAD_REQUEST)
-
-            # Update subscription details
-            subscription.payment_id = payment_id
-            subscription.payment_status = 'completed'
-            subscription.payment_response = params_dict
-            subscription.payment_completed_at = timezone.now()
-            subscription.save()
-            
-            enrollment = CourseEnrollment.objects.get(subscription=subscription)
-            
-            logger.info(f"Payment verified for subscription {subscription.id}, user {request.user.id}, course {subscription.course.name}, batch {enrollment.batch}")
+                logger.info(f"Payment verified for subscription {subscription.id}, user {request.user.id}, course {subscription.course.name}, batch {enrollment.batch}")
+                message = 'Payment verified successfully.'
             return Response({
-                'message': 'Payment verified successfully.',
+                'message': message,
                 'message_type': 'success',
                 'data': {
                     'subscription_id': subscription.id,
@@ -388,26 +376,103 @@ class VerifyPaymentView(BaseAPIView):
                 }
             }, status=status.HTTP_200_OK)
 
+        except SubscriptionNotFoundError:
+            return Response({
+                'message': 'Subscription not found or already processed.',
+                'message_type': 'error',
+                'status': status.HTTP_400_BAD_REQUEST
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except InvalidSignatureError:
+            logger.error(f"Signature verification failed for subscription {subscription_id}, user {request.user.id}")
+            return Response({
+                'message': 'Invalid payment signature.',
+                'message_type': 'error',
+                'status': status.HTTP_400_BAD_REQUEST
+            }, status=status.HTTP_400_BAD_REQUEST)
         except serializers.ValidationError as e:
             return Response({
                 'message': e.detail.get('message', 'Invalid input data.'),
                 'message_type': 'error',
                 'status': e.detail.get('status', status.HTTP_400_BAD_REQUEST)
             }, status=status.HTTP_400_BAD_REQUEST)
-        except CourseEnrollment.DoesNotExist:
-            logger.error(f"No enrollment found for subscription {subscription.id if 'subscription' in locals() else 'unknown'}")
+        except Exception as e:
+            logger.error(f"Error updating subscription {subscription_id if 'subscription_id' in locals() else 'unknown'} for user {request.user.id}: {str(e)}")
             return Response({
-                'message': 'No enrollment found for this subscription.',
+                'message': 'Failed to verify payment. Please try again.',
+                'message_type': 'error',
+                'status': status.HTTP_500_INTERNAL_SERVER_ERROR
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+class RazorpayWebhookView(APIView):
+    """Receives Razorpay webhooks: verifies the signature, stores the event and returns immediately."""
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    @swagger_auto_schema(
+        operation_description="Razorpay webhook endpoint (payment.captured, order.paid, payment.failed). "
+                              "Events are verified with X-Razorpay-Signature, stored in an inbox and applied in the background.",
+        manual_parameters=[
+            openapi.Parameter('X-Razorpay-Signature', openapi.IN_HEADER, type=openapi.TYPE_STRING, required=True),
+            openapi.Parameter('X-Razorpay-Event-Id', openapi.IN_HEADER, type=openapi.TYPE_STRING, required=False)
+        ],
+        responses={
+            200: openapi.Response(
+                description="Event accepted",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'message': openapi.Schema(type=openapi.TYPE_STRING),
+                        'message_type': openapi.Schema(type=openapi.TYPE_STRING, enum=['success', 'error'])
+                    }
+                )
+            ),
+            400: openapi.Response(
+                description="Invalid signature or payload",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'message': openapi.Schema(type=openapi.TYPE_STRING),
+                        'message_type': openapi.Schema(type=openapi.TYPE_STRING, enum=['success', 'error']),
+                        'status': openapi.Schema(type=openapi.TYPE_INTEGER)
+                    }
+                )
+            )
+        }
+    )
+    def post(self, request):
+        """Stores a verified event in the webhook inbox with a single INSERT."""
+        # The signature covers the exact bytes sent, so verify before parsing
+        body = request.body
+        if not verify_signature(body, request.META.get('HTTP_X_RAZORPAY_SIGNATURE')):
+            logger.warning("Rejected Razorpay webhook with an invalid signature")
+            return Response({
+                'message': 'Invalid webhook signature.',
                 'message_type': 'error',
                 'status': status.HTTP_400_BAD_REQUEST
             }, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return Response({
+                'message': 'Invalid webhook payload.',
+                'message_type': 'error',
+                'status': status.HTTP_400_BAD_REQUEST
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            store_event(request.META.get('HTTP_X_RAZORPAY_EVENT_ID'), payload)
         except Exception as e:
-            logger.error(f"Error updating subscription {subscription.id if 'subscription' in locals() else 'unknown'} for user {request.user.id}: {str(e)}")
+            # Non-2xx makes Razorpay redeliver the event later
+            logger.error(f"Failed to store Razorpay webhook: {str(e)}")
             return Response({
-                'message': 'Failed to verify payment. Please try again.',
+                'message': 'Failed to store webhook event.',
                 'message_type': 'error',
                 'status': status.HTTP_500_INTERNAL_SERVER_ERROR
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response({
+            'message': 'Webhook received.',
+            'message_type': 'success'
+        }, status=status.HTTP_200_OK)
 
 class TransactionReportView(APIView):
     permission_classes = [IsAuthenticated, IsAdminUser]
@@ -479,4 +544,278 @@ class TransactionReportView(APIView):
                 'message': f'Failed to retrieve transactions: {str(e)}',
                 'message_type': 'error',
                 'status': status.HTTP_500_INTERNAL_SERVER_ERROR
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+error_response_schema = openapi.Schema(
+    type=openapi.TYPE_OBJECT,
+    properties={
+        'message': openapi.Schema(type=openapi.TYPE_STRING),
+        'message_type': openapi.Schema(type=openapi.TYPE_STRING, enum=['success', 'error']),
+        'status': openapi.Schema(type=openapi.TYPE_INTEGER)
+    }
+)
+
+export_filter_parameters = [
+    openapi.Parameter('start_date', openapi.IN_QUERY, description="Date or datetime; purchases on or after it", type=openapi.TYPE_STRING, required=False),
+    openapi.Parameter('end_date', openapi.IN_QUERY, description="Date or datetime; a date includes the whole day", type=openapi.TYPE_STRING, required=False),
+    openapi.Parameter('status', openapi.IN_QUERY, description="pending, completed, failed or refunded", type=openapi.TYPE_STRING, required=False)
+]
+
+def export_data(export):
+    """Status payload of a background export."""
+    return {
+        'export_id': str(export.id),
+        'file_format': export.file_format,
+        'status': export.status,
+        'row_count': export.row_count,
+        'download_url': download_url(export),
+        'error': export.error or None,
+        'created_at': export.created_at,
+        'completed_at': export.completed_at
+    }
+
+export_data_schema = openapi.Schema(
+    type=openapi.TYPE_OBJECT,
+    properties={
+        'export_id': openapi.Schema(type=openapi.TYPE_STRING, format='uuid'),
+        'file_format': openapi.Schema(type=openapi.TYPE_STRING, enum=['pdf', 'xlsx']),
+        'status': openapi.Schema(type=openapi.TYPE_STRING, enum=['pending', 'running', 'ready', 'failed']),
+        'row_count': openapi.Schema(type=openapi.TYPE_INTEGER),
+        'download_url': openapi.Schema(type=openapi.TYPE_STRING, nullable=True),
+        'error': openapi.Schema(type=openapi.TYPE_STRING, nullable=True),
+        'created_at': openapi.Schema(type=openapi.TYPE_STRING, format='date-time'),
+        'completed_at': openapi.Schema(type=openapi.TYPE_STRING, format='date-time', nullable=True)
+    }
+)
+
+class TransactionExportView(APIView):
+    """Streams all matching transactions as CSV or XLSX with constant memory."""
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_description="Download all transactions as CSV (streamed) or XLSX (Admin only). "
+                              "For large PDF or XLSX files use the background export endpoint.",
+        manual_parameters=export_filter_parameters,
+        responses={
+            200: openapi.Response(description="File download"),
+            400: openapi.Response(description="Invalid filters or format", schema=error_response_schema),
+            401: openapi.Response(description="Unauthorized", schema=error_response_schema),
+            403: openapi.Response(description="Forbidden", schema=error_response_schema)
+        }
+    )
+    def get(self, request, file_format):
+        try:
+            filters = clean_filters(request.query_params)
+        except ValueError as e:
+            return Response({
+                'message': str(e),
+                'message_type': 'error',
+                'status': status.HTTP_400_BAD_REQUEST
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        filename = f"transactions-{timezone.now():%Y%m%d-%H%M%S}"
+        if file_format == 'csv':
+            response = StreamingHttpResponse(stream_csv(filters), content_type='text/csv; charset=utf-8')
+            response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+            return response
+        if file_format == 'xlsx':
+            # The write-only workbook spools to disk; the finished file is streamed and then removed
+            output = tempfile.TemporaryFile()
+            try:
+                write_xlsx(filters, output)
+            except Exception as e:
+                output.close()
+                logger.error(f"Transaction XLSX export error: {str(e)}")
+                return Response({
+                    'message': 'Failed to export transactions.',
+                    'message_type': 'error',
+                    'status': status.HTTP_500_INTERNAL_SERVER_ERROR
+                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            output.seek(0)
+            return FileResponse(
+                output,
+                as_attachment=True,
+                filename=f"{filename}.xlsx",
+                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            )
+        return Response({
+            'message': 'Unsupported format; use csv or xlsx, or request a background export for pdf.',
+            'message_type': 'error',
+            'status': status.HTTP_400_BAD_REQUEST
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+class TransactionExportJobView(BaseAPIView):
+    """Queues a background PDF/XLSX export of transactions."""
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_description="Queue a transaction export rendered in the background (Admin only). "
+                              "Poll the returned export for its download link. PDF exports are limited to "
+                              "PDF_MAX_ROWS transactions; use xlsx for larger ones.",
+        request_body=TransactionExportSerializer,
+        responses={
+            202: openapi.Response(
+                description="Export queued",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'message': openapi.Schema(type=openapi.TYPE_STRING),
+                        'message_type': openapi.Schema(type=openapi.TYPE_STRING, enum=['success', 'error']),
+                        'data': export_data_schema
+                    }
+                )
+            ),
+            400: openapi.Response(description="Invalid input", schema=error_response_schema),
+            401: openapi.Response(description="Unauthorized", schema=error_response_schema),
+            403: openapi.Response(description="Forbidden", schema=error_response_schema)
+        }
+    )
+    def post(self, request):
+        try:
+            serializer = self.validate_serializer(TransactionExportSerializer, request.data)
+        except serializers.ValidationError as e:
+            return Response({
+                'message': e.detail.get('message', 'Invalid input data.'),
+                'message_type': 'error',
+                'status': status.HTTP_400_BAD_REQUEST
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        export = TransactionExport.objects.create(
+            requested_by=request.user,
+            file_format=serializer.validated_data['file_format'],
+            filters=serializer.validated_data['filters']
+        )
+        logger.info(f"Queued {export.file_format} transaction export {export.id} for user {request.user.id}")
+        return Response({
+            'message': 'Export queued.',
+            'message_type': 'success',
+            'data': export_data(export)
+        }, status=status.HTTP_202_ACCEPTED)
+
+class TransactionExportStatusView(APIView):
+    """Reports a background export's progress and, once ready, its download link."""
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_description="Status of a background transaction export (Admin only)",
+        responses={
+            200: openapi.Response(
+                description="Export status",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'message': openapi.Schema(type=openapi.TYPE_STRING),
+                        'message_type': openapi.Schema(type=openapi.TYPE_STRING, enum=['success', 'error']),
+                        'data': export_data_schema
+                    }
+                )
+            ),
+            404: openapi.Response(description="Export not found or expired", schema=error_response_schema)
+        }
+    )
+    def get(self, request, export_id):
+        export = TransactionExport.objects.filter(id=export_id).first()
+        if export is None:
+            return Response({
+                'message': 'Export not found or expired.',
+                'message_type': 'error',
+                'status': status.HTTP_404_NOT_FOUND
+            }, status=status.HTTP_404_NOT_FOUND)
+        return Response({
+            'message': 'Export status retrieved successfully.',
+            'message_type': 'success',
+            'data': export_data(export)
+        }, status=status.HTTP_200_OK)
+
+revenue_metrics_properties = {
+    'orders_created': openapi.Schema(type=openapi.TYPE_INTEGER),
+    'completed_count': openapi.Schema(type=openapi.TYPE_INTEGER),
+    'refunded_count': openapi.Schema(type=openapi.TYPE_INTEGER),
+    'gross_amount': openapi.Schema(type=openapi.TYPE_STRING, format='decimal'),
+    'refunded_amount': openapi.Schema(type=openapi.TYPE_STRING, format='decimal'),
+    'net_amount': openapi.Schema(type=openapi.TYPE_STRING, format='decimal'),
+    'conversion_rate': openapi.Schema(type=openapi.TYPE_NUMBER, nullable=True, description="completed_count / orders_created")
+}
+
+class RevenueAnalyticsView(APIView):
+    """Revenue, order counts and conversion for a date range, read from the daily rollup."""
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_description="Revenue analytics (Admin only). Totals per currency plus a series grouped by "
+                              "day, course, payment method or currency. Defaults to the last 30 days.",
+        manual_parameters=[
+            openapi.Parameter('start_date', openapi.IN_QUERY, description="YYYY-MM-DD, inclusive", type=openapi.TYPE_STRING, required=False),
+            openapi.Parameter('end_date', openapi.IN_QUERY, description="YYYY-MM-DD, inclusive", type=openapi.TYPE_STRING, required=False),
+            openapi.Parameter('group_by', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=list(GROUPINGS), required=False),
+            openapi.Parameter('course_id', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, required=False),
+            openapi.Parameter('currency', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=False)
+        ],
+        responses={
+            200: openapi.Response(
+                description="Revenue analytics retrieved successfully",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'message': openapi.Schema(type=openapi.TYPE_STRING),
+                        'message_type': openapi.Schema(type=openapi.TYPE_STRING, enum=['success', 'error']),
+                        'data': openapi.Schema(
+                            type=openapi.TYPE_OBJECT,
+                            properties={
+                                'start_date': openapi.Schema(type=openapi.TYPE_STRING, format='date'),
+                                'end_date': openapi.Schema(type=openapi.TYPE_STRING, format='date'),
+                                'group_by': openapi.Schema(type=openapi.TYPE_STRING),
+                                'totals': openapi.Schema(
+                                    type=openapi.TYPE_ARRAY,
+                                    items=openapi.Schema(
+                                        type=openapi.TYPE_OBJECT,
+                                        properties={'currency': openapi.Schema(type=openapi.TYPE_STRING), **revenue_metrics_properties}
+                                    )
+                                ),
+                                'series': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Items(type=openapi.TYPE_OBJECT))
+                            }
+                        )
+                    }
+                )
+            ),
+            400: openapi.Response(description="Invalid parameters", schema=error_response_schema),
+            401: openapi.Response(description="Unauthorized", schema=error_response_schema),
+            403: openapi.Response(description="Forbidden", schema=error_response_schema)
+        }
+    )
+    def get(self, request):
+        params = request.query_params
+        try:
+            end = parse_date(params['end_date']) if params.get('end_date') else timezone.localdate()
+            start = parse_date(params['start_date']) if params.get('start_date') else (end and end - timedelta(days=29))
+        except ValueError:
+            start = end = None
+        group_by = params.get('group_by', 'day')
+        course_id = params.get('course_id')
+        if not start or not end or start > end:
+            message = 'start_date and end_date must be YYYY-MM-DD dates with start_date <= end_date.'
+        elif group_by not in GROUPINGS:
+            message = f"group_by must be one of: {', '.join(GROUPINGS)}."
+        elif course_id and not course_id.isdigit():
+            message = 'course_id must be an integer.'
+        else:
+            message = None
+        if message:
+            return Response({
+                'message': message,
+                'message_type': 'error',
+                'status': status.HTTP_400_BAD_REQUEST
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        summary = revenue_summary(start, end, group_by=group_by, course_id=course_id, currency=params.get('currency'))
+        return Response({
+            'message': 'Revenue analytics retrieved successfully.',
+            'message_type': 'success',
+            'data': {
+                'start_date': start,
+                'end_date': end,
+                'group_by': group_by,
+                **summary
+            }
+        }, status=status.HTTP_200_OK)
@@ -0,0 +1,598 @@
+from rest_framework import status
+from rest_framework.views import APIView
+from rest_framework.permissions import IsAuthenticated, AllowAny
+from drf_yasg.utils import swagger_auto_schema
+from drf_yasg import openapi
+from django.core import signing
+from django.http import Http404
+from django.urls import reverse
+from django.utils import timezone
+from edu_platform.permissions.auth_permissions import IsTeacherOrAdmin
+from edu_platform.models import ClassSession, RecordingUpload
+from edu_platform.serializers.recording_serializers import (
+    RecordingUploadInitSerializer, RecordingUploadSerializer, PlaybackProgressSerializer
+)
+from edu_platform.utility.recording_uploads import (
+    ChunkError, get_upload_setting, parse_checksum, write_chunk, finalize_upload, discard_part
+)
+from edu_platform.utility.recording_playback import (
+    make_playback_token, read_playback_token, build_stream_response, get_playback_setting
+)
+from edu_platform.utility.media_storage import has_local_path, presigned_url
+from edu_platform.utility.playback_progress import grant_progress, record_progress, get_resume_positions
+from edu_platform.views.class_views import api_response, get_serializer_error_message, user_can_access_session
+import logging
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_OFFSET_HEADER = 'HTTP_UPLOAD_OFFSET'
+UPLOAD_CHECKSUM_HEADER = 'HTTP_UPLOAD_CHECKSUM'
+
+upload_state_schema = openapi.Schema(
+    type=openapi.TYPE_OBJECT,
+    properties={
+        'upload_id': openapi.Schema(type=openapi.TYPE_STRING, format='uuid'),
+        'session_id': openapi.Schema(type=openapi.TYPE_INTEGER),
+        'filename': openapi.Schema(type=openapi.TYPE_STRING),
+        'total_size': openapi.Schema(type=openapi.TYPE_INTEGER),
+        'received_bytes': openapi.Schema(type=openapi.TYPE_INTEGER, description="Offset of the next chunk"),
+        'status': openapi.Schema(type=openapi.TYPE_STRING, enum=['pending', 'finalizing', 'completed', 'aborted']),
+        'chunk_size': openapi.Schema(type=openapi.TYPE_INTEGER, description="Suggested chunk size"),
+        'max_chunk_size': openapi.Schema(type=openapi.TYPE_INTEGER),
+        'created_at': openapi.Schema(type=openapi.TYPE_STRING, format='date-time'),
+        'completed_at': openapi.Schema(type=openapi.TYPE_STRING, format='date-time', nullable=True)
+    }
+)
+
+
+def upload_response(description):
+    return openapi.Response(
+        description=description,
+        schema=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'message': openapi.Schema(type=openapi.TYPE_STRING, description="Response message"),
+                'message_type': openapi.Schema(type=openapi.TYPE_STRING, enum=['success', 'error'], description="Type of message"),
+                'data': upload_state_schema
+            }
+        )
+    )
+
+
+def error_response(description):
+    return openapi.Response(
+        description=description,
+        schema=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'message': openapi.Schema(type=openapi.TYPE_STRING, description="Error message"),
+                'message_type': openapi.Schema(type=openapi.TYPE_STRING, enum=['success', 'error'], description="Type of message")
+            }
+        )
+    )
+
+
+def user_can_manage_session(user, session):
+    """Recordings are uploaded by admins or the session's own teacher."""
+    return user.is_admin or session.schedule.teacher_id == user.id
+
+
+class RecordingUploadMixin:
+    """Loads an upload the requesting user may write to."""
+
+    def get_upload(self, request, upload_id):
+        upload = RecordingUpload.objects.select_related('session__schedule').get(id=upload_id)
+        if not user_can_manage_session(request.user, upload.session):
+            return upload, api_response(
+                message='You can only upload recordings for your own classes.',
+                message_type='error',
+                status_code=status.HTTP_403_FORBIDDEN
+            )
+        return upload, None
+
+
+class RecordingUploadInitView(APIView):
+    """Starts (or resumes) a chunked recording upload for a class session."""
+    permission_classes = [IsAuthenticated, IsTeacherOrAdmin]
+
+    @swagger_auto_schema(
+        operation_description="Start a resumable recording upload. Calling it again with the same filename and size "
+                              "returns the pending upload so the client can resume from received_bytes.",
+        request_body=RecordingUploadInitSerializer,
+        responses={
+            201: upload_response("Upload started"),
+            200: upload_response("Pending upload resumed"),
+            400: error_response("Invalid input"),
+            403: error_response("Permission denied"),
+            404: error_response("Class session not found")
+        }
+    )
+    def post(self, request, session_id):
+        try:
+            session = ClassSession.objects.select_related('schedule').get(id=session_id)
+            if not user_can_manage_session(request.user, session):
+                return api_response(
+                    message='You can only upload recordings for your own classes.',
+                    message_type='error',
+                    status_code=status.HTTP_403_FORBIDDEN
+                )
+
+            serializer = RecordingUploadInitSerializer(data=request.data)
+            if not serializer.is_valid():
+                error = get_serializer_error_message(serializer.errors)
+                return api_response(
+                    message=error['message'],
+                    message_type='error',
+                    status_code=status.HTTP_400_BAD_REQUEST
+                )
+
+            upload = RecordingUpload.objects.filter(
+                session=session,
+                uploaded_by=request.user,
+                status='pending',
+                **serializer.validated_data
+            ).order_by('-created_at').first()
+            created = upload is None
+            if created:
+                upload = RecordingUpload.objects.create(
+                    session=session,
+                    uploaded_by=request.user,
+                    **serializer.validated_data
+                )
+
+            return api_response(
+                message='Upload started.' if created else 'Resuming pending upload.',
+                message_type='success',
+                data=RecordingUploadSerializer(upload).data,
+                status_code=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+            )
+        except ClassSession.DoesNotExist:
+            return api_response(
+                message='Class session not found.',
+                message_type='error',
+                status_code=status.HTTP_404_NOT_FOUND
+            )
+        except Exception as e:
+            logger.error(f"Error starting recording upload: {str(e)}")
+            return api_response(
+                message='Failed to start upload. Please try again.',
+                message_type='error',
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class RecordingUploadChunkView(RecordingUploadMixin, APIView):
+    """Reports upload progress, accepts chunks and aborts uploads.
+
+    A chunk is the raw request body of a PUT, sent with ``Upload-Offset`` (must
+    equal received_bytes) and optionally ``Upload-Checksum: sha256=<digest>``.
+    The body is streamed to disk and never parsed by DRF.
+    """
+    permission_classes = [IsAuthenticated, IsTeacherOrAdmin]
+
+    @swagger_auto_schema(
+        operation_description="Get upload progress; resume by sending the next chunk at received_bytes",
+        responses={
+            200: upload_response("Upload state retrieved"),
+            403: error_response("Permission denied"),
+            404: error_response("Upload not found")
+        }
+    )
+    def get(self, request, upload_id):
+        try:
+            upload, denied = self.get_upload(request, upload_id)
+            if denied:
+                return denied
+            return api_response(
+                message='Upload state retrieved successfully.',
+                message_type='success',
+                data=RecordingUploadSerializer(upload).data,
+                status_code=status.HTTP_200_OK
+            )
+        except RecordingUpload.DoesNotExist:
+            return api_response(
+                message='Upload not found.',
+                message_type='error',
+                status_code=status.HTTP_404_NOT_FOUND
+            )
+
+    @swagger_auto_schema(
+        operation_description="Upload one chunk as the raw request body",
+        manual_parameters=[
+            openapi.Parameter('Upload-Offset', openapi.IN_HEADER, type=openapi.TYPE_INTEGER, required=True,
+                              description="Byte offset of this chunk; must equal received_bytes"),
+            openapi.Parameter('Upload-Checksum', openapi.IN_HEADER, type=openapi.TYPE_STRING,
+                              description="'sha256=<hex|base64>' or 'md5=<hex|base64>' of this chunk"),
+        ],
+        responses={
+            200: upload_response("Chunk stored"),
+            400: error_response("Chunk rejected (checksum mismatch, short body, bad headers)"),
+            403: error_response("Permission denied"),
+            404: error_response("Upload not found"),
+            409: upload_response("Offset does not match received_bytes, or upload is not pending"),
+            411: error_response("Content-Length required"),
+            413: error_response("Chunk too large")
+        }
+    )
+    def put(self, request, upload_id):
+        try:
+            upload, denied = self.get_upload(request, upload_id)
+            if denied:
+                return denied
+            if upload.status != 'pending':
+                return api_response(
+                    message=f'Upload is already {upload.status}.',
+                    message_type='error',
+                    data=RecordingUploadSerializer(upload).data,
+                    status_code=status.HTTP_409_CONFLICT
+                )
+
+            try:
+                length = int(request.META.get('CONTENT_LENGTH') or 0)
+                offset = int(request.META[UPLOAD_OFFSET_HEADER])
+            except KeyError:
+                return api_response(
+                    message='Upload-Offset header is required.',
+                    message_type='error',
+                    status_code=status.HTTP_400_BAD_REQUEST
+                )
+            except ValueError:
+                return api_response(
+                    message='Upload-Offset and Content-Length must be integers.',
+                    message_type='error',
+                    status_code=status.HTTP_400_BAD_REQUEST
+                )
+            if length <= 0:
+                return api_response(
+                    message='Content-Length is required.',
+                    message_type='error',
+                    status_code=status.HTTP_411_LENGTH_REQUIRED
+                )
+            if length > get_upload_setting('MAX_CHUNK_SIZE') or offset + length > upload.total_size:
+                return api_response(
+                    message='Chunk is larger than allowed or extends past the end of the file.',
+                    message_type='error',
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+                )
+            if offset != upload.received_bytes:
+                return api_response(
+                    message=f'Expected offset {upload.received_bytes}.',
+                    message_type='error',
+                    data=RecordingUploadSerializer(upload).data,
+                    status_code=status.HTTP_409_CONFLICT
+                )
+
+            checksum = parse_checksum(request.META.get(UPLOAD_CHECKSUM_HEADER))
+            write_chunk(upload.id, offset, request.stream, length, checksum)
+
+            # Only the request that still sees the expected offset advances it
+            advanced = RecordingUpload.objects.filter(
+                id=upload.id, status='pending', received_bytes=offset
+            ).update(received_bytes=offset + length, updated_at=timezone.now())
+            upload.refresh_from_db()
+            if not advanced:
+                return api_response(
+                    message=f'Another chunk was stored concurrently. Expected offset {upload.received_bytes}.',
+                    message_type='error',
+                    data=RecordingUploadSerializer(upload).data,
+                    status_code=status.HTTP_409_CONFLICT
+                )
+
+            return api_response(
+                message='Chunk stored.',
+                message_type='success',
+                data=RecordingUploadSerializer(upload).data,
+                status_code=status.HTTP_200_OK
+            )
+        except RecordingUpload.DoesNotExist:
+            return api_response(
+                message='Upload not found.',
+                message_type='error',
+                status_code=status.HTTP_404_NOT_FOUND
+            )
+        except ChunkError as e:
+            return api_response(
+                message=str(e),
+                message_type='error',
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            logger.error(f"Error storing recording chunk: {str(e)}")
+            return api_response(
+                message='Failed to store chunk. Please retry from the same offset.',
+                message_type='error',
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    @swagger_auto_schema(
+        operation_description="Abort a pending upload and delete its partial data",
+        responses={
+            200: error_response("Upload aborted"),
+            403: error_response("Permission denied"),
+            404: error_response("Upload not found")
+        }
+    )
+    def delete(self, request, upload_id):
+        try:
+            upload, denied = self.get_upload(request, upload_id)
+            if denied:
+                return denied
+            if RecordingUpload.objects.filter(id=upload.id, status='pending').update(
+                status='aborted', updated_at=timezone.now()
+            ):
+                discard_part(upload.id)
+            return api_response(
+                message='Upload aborted.',
+                message_type='success',
+                status_code=status.HTTP_200_OK
+            )
+        except RecordingUpload.DoesNotExist:
+            return api_response(
+                message='Upload not found.',
+                message_type='error',
+                status_code=status.HTTP_404_NOT_FOUND
+            )
+
+
+class RecordingUploadFinalizeView(RecordingUploadMixin, APIView):
+    """Completes an upload and attaches the file to the class session."""
+    permission_classes = [IsAuthenticated, IsTeacherOrAdmin]
+
+    @swagger_auto_schema(
+        operation_description="Finalize a fully uploaded recording and attach it to the class session",
+        responses={
+            200: upload_response("Recording uploaded"),
+            403: error_response("Permission denied"),
+            404: error_response("Upload not found"),
+            409: error_response("Upload incomplete or not pending")
+        }
+    )
+    def post(self, request, upload_id):
+        try:
+            upload, denied = self.get_upload(request, upload_id)
+            if denied:
+                return denied
+            finalize_upload(upload)
+            upload.refresh_from_db()
+            return api_response(
+                message='Recording uploaded successfully.',
+                message_type='success',
+                data=RecordingUploadSerializer(upload).data,
+                status_code=status.HTTP_200_OK
+            )
+        except RecordingUpload.DoesNotExist:
+            return api_response(
+                message='Upload not found.',
+                message_type='error',
+                status_code=status.HTTP_404_NOT_FOUND
+            )
+        except ChunkError as e:
+            return api_response(
+                message=str(e),
+                message_type='error',
+                status_code=status.HTTP_409_CONFLICT
+            )
+        except Exception as e:
+            logger.error(f"Error finalizing recording upload: {str(e)}")
+            return api_response(
+                message='Failed to finalize upload. Please try again.',
+                message_type='error',
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class RecordingPlaybackView(APIView):
+    """Checks entitlement to a session recording and returns a signed stream URL for the player."""
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description="Get a short-lived stream URL for a class recording (admin, assigned teacher, or paid student). "
+                              "Use it directly as the <video> source; it supports HTTP Range requests.",
+        responses={
+            200: openapi.Response(
+                description="Playback URL issued",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'message': openapi.Schema(type=openapi.TYPE_STRING, description="Response message"),
+                        'message_type': openapi.Schema(type=openapi.TYPE_STRING, enum=['success', 'error'], description="Type of message"),
+                        'data': openapi.Schema(
+                            type=openapi.TYPE_OBJECT,
+                            properties={
+                                'url': openapi.Schema(type=openapi.TYPE_STRING, format='uri'),
+                                'expires_in': openapi.Schema(type=openapi.TYPE_INTEGER, description="Seconds the URL stays valid")
+                            }
+                        )
+                    }
+                )
+            ),
+            403: error_response("Permission denied"),
+            404: error_response("Class session or recording not found")
+        }
+    )
+    def get(self, request, session_id):
+        try:
+            session = ClassSession.objects.select_related('schedule').get(id=session_id)
+            if not user_can_access_session(request.user, session):
+                return api_response(
+                    message='You do not have access to this recording.',
+                    message_type='error',
+                    status_code=status.HTTP_403_FORBIDDEN
+                )
+            if not session.recording:
+                return api_response(
+                    message='This class has no recording yet.',
+                    message_type='error',
+                    status_code=status.HTTP_404_NOT_FOUND
+                )
+
+            expires_in = get_playback_setting('TOKEN_MAX_AGE_SECONDS')
+            storage = session.recording.storage
+            if has_local_path(storage):
+                url = request.build_absolute_uri(
+                    reverse('recording-stream', args=[make_playback_token(session, request.user)])
+                )
+            else:
+                # Object storage serves Range requests itself
+                url = presigned_url(storage, session.recording.name, expire=expires_in)
+            try:
+                grant_progress(request.user.id, session.id, expires_in)
+            except Exception as e:
+                logger.error(f"Failed to grant playback progress for session {session.id}: {e}")
+            return api_response(
+                message='Playback URL issued.',
+                message_type='success',
+                data={
+                    'url': url,
+                    'expires_in': expires_in,
+                },
+                status_code=status.HTTP_200_OK
+            )
+        except ClassSession.DoesNotExist:
+            return api_response(
+                message='Class session not found.',
+                message_type='error',
+                status_code=status.HTTP_404_NOT_FOUND
+            )
+
+
+class RecordingStreamView(APIView):
+    """Streams a recording to the player; access is granted by the signed token alone."""
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    @swagger_auto_schema(
+        operation_description="Recording bytes for a signed playback URL. Supports single Range requests (206).",
+        responses={200: "Full file", 206: "Requested byte range", 403: "Invalid or expired link", 404: "Recording not found", 416: "Range not satisfiable"}
+    )
+    def get(self, request, token):
+        try:
+            payload = read_playback_token(token)
+        except signing.SignatureExpired:
+            return api_response(
+                message='Playback link has expired. Request a new one.',
+                message_type='error',
+                status_code=status.HTTP_403_FORBIDDEN
+            )
+        except signing.BadSignature:
+            return api_response(
+                message='Invalid playback link.',
+                message_type='error',
+                status_code=status.HTTP_403_FORBIDDEN
+            )
+
+        storage = ClassSession._meta.get_field('recording').storage
+        try:
+            return build_stream_response(request, storage, payload['f'])
+        except FileNotFoundError:
+            raise Http404('Recording not found.')
+
+
+resume_schema = openapi.Schema(
+    type=openapi.TYPE_OBJECT,
+    nullable=True,
+    properties={
+        'position': openapi.Schema(type=openapi.TYPE_NUMBER, description="Seconds into the recording"),
+        'duration': openapi.Schema(type=openapi.TYPE_NUMBER, nullable=True),
+        'completed': openapi.Schema(type=openapi.TYPE_BOOLEAN),
+        'updated_at': openapi.Schema(type=openapi.TYPE_STRING, format='date-time')
+    }
+)
+
+
+class RecordingProgressView(APIView):
+    """Playback progress heartbeat; positions are buffered in Redis and flushed to the database in bulk."""
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description="Get the requesting user's resume position for a class recording.",
+        responses={
+            200: openapi.Response(
+                description="Resume position (null if never watched)",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'message': openapi.Schema(type=openapi.TYPE_STRING, description="Response message"),
+                        'message_type': openapi.Schema(type=openapi.TYPE_STRING, enum=['success', 'error'], description="Type of message"),
+                        'data': resume_schema
+                    }
+                )
+            ),
+            500: error_response("Failed to fetch progress")
+        }
+    )
+    def get(self, request, session_id):
+        try:
+            positions = get_resume_positions(request.user.id, [session_id])
+        except Exception as e:
+            logger.error(f"Failed to fetch playback progress for session {session_id}: {e}")
+            return api_response(
+                message='Failed to fetch playback progress.',
+                message_type='error',
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        return api_response(
+            message='Playback progress fetched.',
+            message_type='success',
+            data=positions.get(session_id),
+            status_code=status.HTTP_200_OK
+        )
+
+    @swagger_auto_schema(
+        operation_description="Report the current playback position (send every few seconds while playing and on pause). "
+                              "Requires a playback URL issued for the session first.",
+        request_body=PlaybackProgressSerializer,
+        responses={
+            200: openapi.Response(
+                description="Position recorded",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'message': openapi.Schema(type=openapi.TYPE_STRING, description="Response message"),
+                        'message_type': openapi.Schema(type=openapi.TYPE_STRING, enum=['success', 'error'], description="Type of message"),
+                        'data': openapi.Schema(
+                            type=openapi.TYPE_OBJECT,
+                            properties={'position': openapi.Schema(type=openapi.TYPE_NUMBER)}
+                        )
+                    }
+                )
+            ),
+            400: error_response("Invalid position"),
+            403: error_response("No active playback for this session"),
+            500: error_response("Failed to record progress")
+        }
+    )
+    def post(self, request, session_id):
+        serializer = PlaybackProgressSerializer(data=request.data)
+        if not serializer.is_valid():
+            error = get_serializer_error_message(serializer.errors)
+            return api_response(
+                message=error['message'],
+                message_type='error',
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+
+        position = serializer.validated_data['position']
+        try:
+            recorded = record_progress(
+                request.user.id, session_id, position, serializer.validated_data.get('duration')
+            )
+        except Exception as e:
+            logger.error(f"Failed to record playback progress for session {session_id}: {e}")
+            return api_response(
+                message='Failed to record playback progress.',
+                message_type='error',
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        if not recorded:
+            return api_response(
+                message='No active playback for this recording. Request a playback URL first.',
+                message_type='error',
+                status_code=status.HTTP_403_FORBIDDEN
+            )
+        return api_response(
+            message='Playback progress recorded.',
+            message_type='success',
+            data={'position': position},
+            status_code=status.HTTP_200_OK
+        )
@@ -9,7 +9,6 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 
 import os
 
-from channels.auth import AuthMiddlewareStack
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.security.websocket import AllowedHostsOriginValidator
 from django.core.asgi import get_asgi_application
@@ -19,11 +18,12 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'edustream.settings')
 django_asgi_app = get_asgi_application()
 
 from edu_platform import routing
+from edu_platform.middleware.websocket_auth import JWTAuthMiddlewareStack
 
 application = ProtocolTypeRouter({
     "http": django_asgi_app,
     "websocket": AllowedHostsOriginValidator(
-        AuthMiddlewareStack(
+        JWTAuthMiddlewareStack(
             URLRouter(
                 routing.websocket_urlpatterns
             )
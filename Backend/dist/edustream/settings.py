@@ -88,16 +88,51 @@ TEMPLATES = [
 WSGI_APPLICATION = 'edustream.wsgi.application'
 DOCKERIZED = os.environ.get("DOCKERIZED", "False") == "True"
 
+# Redis
+REDIS_HOST = os.environ.get('REDIS_HOST', 'localhost')
+REDIS_PORT = int(os.environ.get('REDIS_PORT', 6379))
+
+# Logical Redis instances, so presence and cache traffic can be moved off the
+# instance used for Celery and classroom event streams. Each can point at its
+# own server; by default they are separate databases on REDIS_HOST.
+REDIS_URLS = {
+    'default': os.environ.get('REDIS_URL', f"redis://{REDIS_HOST}:{REDIS_PORT}/0"),
+    'presence': os.environ.get('PRESENCE_REDIS_URL', f"redis://{REDIS_HOST}:{REDIS_PORT}/1"),
+    'cache': os.environ.get('CACHE_REDIS_URL', f"redis://{REDIS_HOST}:{REDIS_PORT}/2"),
+}
+
+
+def get_channel_redis_hosts():
+    """Parses CHANNEL_REDIS_HOSTS="host1:6379,host2:6379" into channel layer shards."""
+    hosts = os.environ.get('CHANNEL_REDIS_HOSTS', '')
+    if not hosts:
+        return [(REDIS_HOST, REDIS_PORT)]
+    shards = []
+    for host in hosts.split(','):
+        name, _, port = host.strip().partition(':')
+        shards.append((name, int(port or 6379)))
+    return shards
+
+
 if DOCKERIZED:
     ASGI_APPLICATION = "edustream.asgi.application"
     CHANNEL_LAYERS = {
         "default": {
             "BACKEND": "channels_redis.core.RedisChannelLayer",
             "CONFIG": {
-                "hosts": [(os.environ.get("REDIS_HOST", "localhost"), 6379)],
+                # With several hosts, channels_redis hashes group names and channel
+                # names onto shards independently: load spreads across them, but a
+                # class's group and its members' channels may live on different shards
+                "hosts": get_channel_redis_hosts(),
             },
         }
     }
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URLS['cache'],
+        }
+    }
 else:
     # Local dev: point to WSGI app so Daphne still sees something
     ASGI_APPLICATION = "edustream.wsgi.application"
@@ -169,6 +204,143 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Media storage: 'local' keeps uploads under MEDIA_ROOT; 's3' stores them in an
+# S3-compatible bucket (AWS, MinIO, or moto_server for local testing via
+# AWS_S3_ENDPOINT_URL). Large files go up as parallel multipart uploads and are
+# served with presigned GET URLs.
+MEDIA_STORAGE = os.environ.get('MEDIA_STORAGE', 'local')
+
+AWS_ACCESS_KEY_ID = os.environ.get('AWS_ACCESS_KEY_ID')
+AWS_SECRET_ACCESS_KEY = os.environ.get('AWS_SECRET_ACCESS_KEY')
+AWS_STORAGE_BUCKET_NAME = os.environ.get('AWS_STORAGE_BUCKET_NAME')
+AWS_S3_REGION_NAME = os.environ.get('AWS_S3_REGION_NAME')
+AWS_S3_ENDPOINT_URL = os.environ.get('AWS_S3_ENDPOINT_URL') or None
+AWS_LOCATION = os.environ.get('AWS_LOCATION', 'media')
+AWS_DEFAULT_ACL = None  # Objects stay private; access is through presigned URLs
+AWS_S3_FILE_OVERWRITE = False
+AWS_QUERYSTRING_AUTH = True
+AWS_QUERYSTRING_EXPIRE = int(os.environ.get('AWS_QUERYSTRING_EXPIRE', '3600'))
+AWS_S3_SIGNATURE_VERSION = 's3v4'
+
+MEDIA_S3_TRANSFER = {
+    'MULTIPART_THRESHOLD': 64 * 1024 * 1024,  # Files above this are uploaded in parts
+    'MULTIPART_CHUNKSIZE': 16 * 1024 * 1024,
+    'MAX_CONCURRENCY': int(os.environ.get('MEDIA_S3_MAX_CONCURRENCY', '8')),  # Parts in flight per upload
+}
+
+# Content-addressed media: each file is stored once under its SHA-256 and
+# shared by every field referring to it. Unreferenced blobs are removed after
+# MEDIA_BLOB_GC_GRACE_HOURS by the MediaBlobCollector job (or gc_media_blobs).
+# Opt-in: enabling it changes the names new files are stored under.
+MEDIA_DEDUP = os.environ.get('MEDIA_DEDUP', 'False') == 'True'
+MEDIA_BLOB_GC_GRACE_HOURS = int(os.environ.get('MEDIA_BLOB_GC_GRACE_HOURS', '24'))
+MEDIA_BLOB_GC_INTERVAL_SECONDS = 6 * 3600
+
+STORAGES = {
+    'default': {
+        'BACKEND': {
+            ('s3', True): 'edu_platform.utility.media_storage.DeduplicatingS3Storage',
+            ('s3', False): 'edu_platform.utility.media_storage.MediaS3Storage',
+            ('local', True): 'edu_platform.utility.media_storage.DeduplicatingFileSystemStorage',
+        }.get((MEDIA_STORAGE, MEDIA_DEDUP), 'django.core.files.storage.FileSystemStorage'),
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
+# Hash uploaded files while the request body is received so deduplicated
+# storage does not have to read them again
+if MEDIA_DEDUP:
+    FILE_UPLOAD_HANDLERS = [
+        'edu_platform.utility.media_dedup.HashingMemoryFileUploadHandler',
+        'edu_platform.utility.media_dedup.HashingTemporaryFileUploadHandler',
+    ]
+
+# Resumable recording uploads: chunks are written straight to a part file under
+# TEMP_DIR (on the same filesystem as MEDIA_ROOT so finalize is a rename)
+RECORDING_UPLOAD_SETTINGS = {
+    'TEMP_DIR': os.environ.get('RECORDING_UPLOAD_TEMP_DIR', os.path.join(MEDIA_ROOT, 'recording_uploads')),
+    'CHUNK_SIZE': int(os.environ.get('RECORDING_UPLOAD_CHUNK_SIZE', str(8 * 1024 * 1024))),  # Suggested to clients
+    'MAX_CHUNK_SIZE': int(os.environ.get('RECORDING_UPLOAD_MAX_CHUNK_SIZE', str(64 * 1024 * 1024))),
+    'MAX_FILE_SIZE': int(os.environ.get('RECORDING_UPLOAD_MAX_FILE_SIZE', str(10 * 1024 ** 3))),
+    'STREAM_BUFFER_SIZE': 1024 * 1024,  # Bytes read from the request per write
+    'EXPIRY_HOURS': int(os.environ.get('RECORDING_UPLOAD_EXPIRY_HOURS', '24')),  # Abandoned uploads are purged
+}
+
+# Recording playback: set RECORDING_ACCEL_REDIRECT_PREFIX to an nginx `internal`
+# location aliased to MEDIA_ROOT to let nginx send the bytes; otherwise Django
+# serves Range requests itself
+RECORDING_PLAYBACK_SETTINGS = {
+    'ACCEL_REDIRECT_PREFIX': os.environ.get('RECORDING_ACCEL_REDIRECT_PREFIX', ''),
+    'TOKEN_MAX_AGE_SECONDS': int(os.environ.get('RECORDING_PLAYBACK_TOKEN_MAX_AGE_SECONDS', str(4 * 3600))),
+    # Progress heartbeats are buffered in Redis and flushed to playback_progress
+    'PROGRESS_FLUSH_INTERVAL_SECONDS': 30,
+    'PROGRESS_FLUSH_BATCH_SIZE': 1000,
+    'PROGRESS_TTL_SECONDS': 7 * 24 * 3600,
+    'COMPLETED_RATIO': 0.95,  # Position/duration at which a recording counts as watched
+}
+
+# Per-user cache of the recordings listing; uploads and processing invalidate it
+RECORDING_LIST_CACHE_SECONDS = int(os.environ.get('RECORDING_LIST_CACHE_SECONDS', '300'))
+
+# Post-upload recording processing (checksum, media probe, poster frames) in a
+# process pool. TRANSCODER: 'auto' (ffmpeg if installed), 'ffmpeg', 'null' or a
+# dotted path to a BaseTranscoder subclass
+RECORDING_PROCESSING_SETTINGS = {
+    'TRANSCODER': os.environ.get('RECORDING_TRANSCODER', 'auto'),
+    'WORKERS': int(os.environ.get('RECORDING_PROCESSING_WORKERS', '2')),
+    'POSTER_COUNT': int(os.environ.get('RECORDING_POSTER_COUNT', '3')),
+    'POSTER_WIDTH': 640,
+    'HASH_BUFFER_SIZE': 4 * 1024 * 1024,
+    'COMMAND_TIMEOUT_SECONDS': 300,  # Per ffprobe/ffmpeg call
+    'SWEEP_INTERVAL_SECONDS': 60,
+    'STALE_AFTER_MINUTES': 120,  # Presigned source URLs stay valid this long
+    'LEASE_SECONDS': 300,  # A claim its process stopped renewing (it died) is retried after this
+}
+
+# Resized copies of course thumbnails and profile pictures, rendered on the
+# RECORDING_PROCESSING_SETTINGS pool after the image is saved
+IMAGE_DERIVATIVE_SETTINGS = {
+    'WIDTHS': [64, 256, 1024],
+    'FORMATS': ['webp', 'jpeg'],
+    'QUALITY': 80,
+}
+
+# Payments: open gateway orders are reused for identical purchase attempts, and
+# POSTs carrying an Idempotency-Key header are replayed instead of re-run
+PAYMENT_ORDER_SETTINGS = {
+    'ORDER_REUSE_SECONDS': 30 * 60,
+}
+IDEMPOTENCY_SETTINGS = {
+    'TTL_SECONDS': 24 * 3600,  # How long a stored response can be replayed
+    'LOCK_SECONDS': 60,  # How long an unfinished request holds its key
+    'MAX_KEY_LENGTH': 255,
+}
+
+# Payment gateway adapter ('razorpay', or 'fake' for tests, benchmarks and local runs)
+PAYMENT_GATEWAY_SETTINGS = {
+    'BACKEND': os.environ.get('PAYMENT_GATEWAY', 'razorpay'),
+    'CONNECT_TIMEOUT_SECONDS': 3.05,
+    'READ_TIMEOUT_SECONDS': 10,
+    'POOL_CONNECTIONS': 4,
+    'POOL_MAXSIZE': 20,  # Keep-alive connections per host, per process
+    'MAX_RETRIES': 2,  # Idempotent calls only
+    'RETRY_BACKOFF_SECONDS': 0.25,
+    'RETRY_BACKOFF_MAX_SECONDS': 2.0,
+    'BREAKER_FAILURE_THRESHOLD': 5,  # Consecutive failures before failing fast
+    'BREAKER_RESET_SECONDS': 30,
+    'FAKE_LATENCY_SECONDS': 0.0,
+}
+
+# Pending subscriptions are cross-checked against the gateway in chunks
+PAYMENT_RECONCILIATION_SETTINGS = {
+    'INTERVAL_SECONDS': 900,
+    'CHUNK_SIZE': 200,
+    'CONCURRENCY': 8,  # Gateway requests in flight
+    'OLDER_THAN_MINUTES': 30,  # Leave recent orders to VerifyPayment and webhooks
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -233,6 +405,33 @@ CORS_ALLOW_ALL_ORIGINS = True
 # Razorpay settings
 RAZORPAY_KEY_ID = os.environ.get('RAZORPAY_KEY_ID', '')
 RAZORPAY_KEY_SECRET = os.environ.get('RAZORPAY_KEY_SECRET', '')
+RAZORPAY_WEBHOOK_SECRET = os.environ.get('RAZORPAY_WEBHOOK_SECRET', '')
+
+# Webhooks are stored in an inbox table by the endpoint and applied in batches
+PAYMENT_WEBHOOK_SETTINGS = {
+    'PROCESS_INTERVAL_SECONDS': 5,
+    'BATCH_SIZE': 200,
+    'MAX_ATTEMPTS': 5,  # Batches failing this often are marked failed for inspection
+}
+
+# Batch seats are counted and held in Redis during checkout (utility/seat_inventory.py)
+SEAT_INVENTORY_SETTINGS = {
+    # How long a checkout keeps its seat without paying; never shorter than ORDER_REUSE_SECONDS,
+    # so a seat is not given away while the student's order can still be paid
+    'HOLD_SECONDS': 35 * 60,
+    'INVENTORY_TTL_SECONDS': 24 * 3600,  # Counts are reseeded from the database at least this often
+    'BATCHES': ['weekdays', 'weekends'],
+}
+
+# Finance exports read subscriptions in chunks; PDF/XLSX files are rendered in the background
+TRANSACTION_EXPORT_SETTINGS = {
+    'CHUNK_SIZE': 2000,
+    'PROCESS_INTERVAL_SECONDS': 10,
+    'STALE_MINUTES': 30,  # Running exports older than this are retried
+    'EXPIRY_HOURS': 24,
+    'LINK_EXPIRY_SECONDS': 3600,
+    'PDF_MAX_ROWS': 50000,  # reportlab holds every page until save; larger exports use XLSX/CSV
+}
 
 # Email settings (SMTP for Gmail)
 EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
@@ -249,8 +448,8 @@ TWILIO_AUTH_TOKEN = os.environ.get('TWILIO_AUTH_TOKEN', '')
 TWILIO_PHONE_NUMBER = os.environ.get('TWILIO_PHONE_NUMBER', '')
 
 # Celery Configuration
-CELERY_BROKER_URL = f"redis://{os.environ.get('REDIS_HOST', 'localhost')}:6379/0"
-CELERY_RESULT_BACKEND = f"redis://{os.environ.get('REDIS_HOST', 'localhost')}:6379/0"
+CELERY_BROKER_URL = REDIS_URLS['default']
+CELERY_RESULT_BACKEND = REDIS_URLS['default']
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
@@ -265,4 +464,32 @@ TRIAL_SETTINGS = {
 }
 
 # email and phone number otp expiry time 
-OTP_EXPIRY_MINUTES = int(os.environ.get('OTP_EXPIRY_MINUTES', 5))
\ No newline at end of file
+OTP_EXPIRY_MINUTES = int(os.environ.get('OTP_EXPIRY_MINUTES', 5))
+
+# Classroom live event log (Redis Streams) and archiving
+CLASSROOM_SETTINGS = {
+    'STREAM_MAXLEN': int(os.environ.get('CLASSROOM_STREAM_MAXLEN', '5000')),  # Approximate cap per class stream
+    'REPLAY_BATCH_SIZE': int(os.environ.get('CLASSROOM_REPLAY_BATCH_SIZE', '200')),
+    'ARCHIVE_BATCH_SIZE': int(os.environ.get('CLASSROOM_ARCHIVE_BATCH_SIZE', '1000')),
+    'ARCHIVE_INTERVAL_SECONDS': int(os.environ.get('CLASSROOM_ARCHIVE_INTERVAL_SECONDS', '300')),
+    'ARCHIVE_GRACE_MINUTES': int(os.environ.get('CLASSROOM_ARCHIVE_GRACE_MINUTES', '15')),  # Keep streams after class end for late reconnects
+    'HEARTBEAT_TIMEOUT_SECONDS': int(os.environ.get('CLASSROOM_HEARTBEAT_TIMEOUT_SECONDS', '45')),  # Clients ping every ~15 seconds
+    'PRESENCE_SWEEP_INTERVAL_SECONDS': int(os.environ.get('CLASSROOM_PRESENCE_SWEEP_INTERVAL_SECONDS', '15')),
+    # Inbound budgets per connection: message type -> (tokens per second, burst)
+    'RATE_LIMITS': {
+        'chat': (1, 5),
+        'emoji': (2, 10),
+        'signaling': (50, 200),
+        'ping': (1, 5),
+        'replay': (0.2, 3),
+        'default': (5, 20),
+    },
+    'MAX_DROPPED_MESSAGES': int(os.environ.get('CLASSROOM_MAX_DROPPED_MESSAGES', '500')),  # Close the socket after this many throttled messages in a window
+    'DROPPED_MESSAGES_WINDOW_SECONDS': 60,
+    # Outbound backpressure for low-priority events (emoji, join/leave), used only while sends to a client are slow
+    'SLOW_SEND_MS': int(os.environ.get('CLASSROOM_SLOW_SEND_MS', '50')),
+    'LOW_PRIORITY_FLUSH_MS': int(os.environ.get('CLASSROOM_LOW_PRIORITY_FLUSH_MS', '250')),
+    'LOW_PRIORITY_QUEUE_LIMIT': int(os.environ.get('CLASSROOM_LOW_PRIORITY_QUEUE_LIMIT', '50')),
+    'TOKEN_CACHE_SIZE': int(os.environ.get('CLASSROOM_TOKEN_CACHE_SIZE', '1024')),  # Recently verified WebSocket JWTs
+    'ATTENDANCE_FLUSH_INTERVAL_SECONDS': int(os.environ.get('CLASSROOM_ATTENDANCE_FLUSH_INTERVAL_SECONDS', '60')),
+}
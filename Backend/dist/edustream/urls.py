@@ -31,7 +31,7 @@ urlpatterns = [
     path('api/classes/', include('edu_platform.urls.class_urls')),
     #path('api/users/', include('edu_platform.urls.user.urls')),
     path('api/payments/', include('edu_platform.urls.payment_urls')),
-    # path('api/recordings/', include('edu_platform.urls.recordings_urls')),
+    path('api/recordings/', include('edu_platform.urls.recordings_urls')),
     
     # API documentation
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),